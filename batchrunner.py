@@ -0,0 +1,189 @@
+"""
+Runs many (program, input, expected output) test cases in parallel across a pool of worker processes and streams
+the results as JSON Lines.
+
+usage: python batchrunner.py cases.jsonl [-j WORKERS] [--timeout SECONDS] [--memory-mb MB] [-o results.jsonl]
+
+Each line of the cases file is a JSON object with the keys
+- "id": any JSON value identifying the case (defaults to the case's line number)
+- "program": the program source, as a list of lines or a single string; or "program_file": a path to it
+- "input": list of input lines (optional)
+- "expected": expected output lines (optional)
+- "expected_error": [error type name, line number] if the program is expected to end with an error (optional)
+- "version": interpreter version, 1, 2 or 3 (optional, defaults to 3)
+
+Each result line holds the case's id, a status ("pass", "fail", "ok" if nothing was expected, "timeout",
+"memory_limit" or "crash"), the output, the error type name and line (if any), and the elapsed time in seconds.
+Results are written in completion order.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from intio import LineInputProvider
+from worker import LoadError, ProgramCache, RunTimeout, limit_memory, time_limit
+
+# state of each worker process, set up by _init_worker
+_worker_programs = None
+_worker_timeout = None
+
+
+def _init_worker(timeout, memory_limit_mb):
+    global _worker_programs, _worker_timeout
+    # warm up: import every interpreter version once, so cases don't pay for it
+    _worker_programs = ProgramCache()
+    _worker_timeout = timeout
+    limit_memory(memory_limit_mb)
+
+
+def _run_case(case):
+    result = {"id": case["id"]}
+    start = time.perf_counter()
+    try:
+        with time_limit(_worker_timeout):
+            program = _worker_programs.get(case["version"], case["program"])
+            # as in rundaemon.py, an input provider returns None once the inputs run out, even if there are none,
+            # instead of reading from the keyboard
+            run_result = program.run(LineInputProvider(case.get("input") or []))
+    except RunTimeout:
+        result["status"] = "timeout"
+    except MemoryError:
+        result["status"] = "memory_limit"
+    except LoadError as err:
+        # errors reported while loading the program (e.g., syntax errors) aren't caught by Program.run()
+        result.update(_check(case, [], [err.error_type.name, err.error_line]))
+    except Exception as err:  # pylint: disable=broad-except
+        # including RuntimeErrors the interpreter didn't report, e.g., a RecursionError (Program.run() re-raises
+        # those)
+        result["status"] = "crash"
+        result["message"] = f"{type(err).__name__}: {err}"
+    else:
+        error = None
+        if run_result.error_type is not None:
+            error = [run_result.error_type.name, run_result.error_line]
+        result.update(_check(case, list(run_result.output), error))
+    result["elapsed"] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def _check(case, output, error):
+    result = {"output": output, "error": error}
+    if "expected" not in case and "expected_error" not in case:
+        result["status"] = "ok"
+    elif output == case.get("expected", output) and error == case.get("expected_error"):
+        result["status"] = "pass"
+    else:
+        result["status"] = "fail"
+    return result
+
+
+def read_cases(path):
+    """Yields the cases in a JSON Lines file, normalized for run_cases()."""
+    base_dir = os.path.dirname(os.path.abspath(path))
+    with open(path) as file:
+        for line_num, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            case = json.loads(line)
+            case.setdefault("id", line_num)
+            case.setdefault("version", 3)
+            if "program_file" in case:
+                with open(os.path.join(base_dir, case.pop("program_file"))) as src:
+                    case["program"] = src.read()
+            if isinstance(case["program"], str):
+                case["program"] = case["program"].split("\n")
+            yield case
+
+
+def run_cases(cases, workers=None, timeout=None, memory_limit_mb=None):
+    """
+    Runs cases (an iterable of dicts, see read_cases()) on a pool of worker processes, yielding a result dict for
+    each case as soon as it completes. At most a few cases per worker are queued at a time, so cases can be
+    streamed from a large file.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 4
+    cases = iter(cases)
+    pending = {}  # future -> case
+    executor = _start_pool(workers, timeout, memory_limit_mb)
+    try:
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_in_flight:
+                case = next(cases, None)
+                if case is None:
+                    exhausted = True
+                    break
+                pending[executor.submit(_run_case, case)] = case
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            pool_broken = False
+            for future in done:
+                case = pending.pop(future)
+                try:
+                    yield future.result()
+                except BrokenProcessPool:
+                    # a worker died (e.g., killed by the OS); that takes the whole pool down with it
+                    pool_broken = True
+                    yield {
+                        "id": case["id"],
+                        "status": "crash",
+                        "message": "worker died",
+                    }
+            if pool_broken:
+                for case in pending.values():
+                    yield {
+                        "id": case["id"],
+                        "status": "crash",
+                        "message": "worker died",
+                    }
+                pending.clear()
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = _start_pool(workers, timeout, memory_limit_mb)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _start_pool(workers, timeout, memory_limit_mb):
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(timeout, memory_limit_mb),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Brewin test cases in parallel.")
+    parser.add_argument("cases", help="JSON Lines file of test cases")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=None, help="seconds per case")
+    parser.add_argument("--memory-mb", type=int, default=None, help="per worker")
+    parser.add_argument("-o", "--output", default=None, help="defaults to stdout")
+    args = parser.parse_args()
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    counts = {}
+    start = time.perf_counter()
+    try:
+        for result in run_cases(
+            read_cases(args.cases), args.workers, args.timeout, args.memory_mb
+        ):
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"{sum(counts.values())} cases in {elapsed:.2f}s: {summary}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
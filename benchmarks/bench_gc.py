@@ -0,0 +1,139 @@
+"""
+Measures the garbage collector's pauses while the version 3 interpreter runs allocation-heavy programs, with and
+without freezing the loaded program (Interpreter(freeze_program=True)).
+
+usage: python benchmarks/bench_gc.py [-k NAME] [--repeat N] [-o results.json]
+
+The programs are benchmarks from benchmarks/programs, and one that creates many short-lived objects. Each program is
+loaded into a fresh interpreter, after a large generated program (see generate_program.py) has been loaded to stand
+for the long-lived state of a service, and then run. Pauses are timed with gc.callbacks; the report shows, for the
+median of --repeat runs (default 3) by total pause, the run time, the number of collections of each generation, and
+the total and longest pause.
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROGRAMS_DIR = os.path.join(BENCHMARKS_DIR, "programs")
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, ".."))
+
+from generate_program import generate  # noqa: E402
+from interpreterv3 import Interpreter  # noqa: E402
+
+PROGRAMS = ("linked", "templates", "dispatch", "temporaries")
+
+# a program that creates many short-lived objects (with a superclass part), beside the benchmarks/programs ones
+TEMPORARIES = [
+    "(class shape (field int sides 0) (method int get_sides () (return sides)))",
+    "(class square inherits shape (field int size 0)",
+    "  (method int area ((int s)) (begin (set size s) (return (* size size)))))",
+    "(class main",
+    "  (method void main ()",
+    "    (let ((int i 0) (int total 0) (square sq null))",
+    "      (while (< i 5000)",
+    "        (begin (set sq (new square)) (set total (+ total (call sq area i))) (set i (+ i 1))))",
+    "      (print total))))",
+]
+RESIDENT_PROGRAM = {"classes": 400, "methods": 8, "body_size": 8, "loop_trips": 1}
+
+
+class PauseTimer:
+    """Times each garbage collection while installed in gc.callbacks."""
+
+    def __init__(self):
+        self.pauses = []  # (generation, seconds)
+        self.__start = None
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self.__start = time.perf_counter()
+        else:
+            self.pauses.append((info["generation"], time.perf_counter() - self.__start))
+
+    def __enter__(self):
+        gc.callbacks.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        gc.callbacks.remove(self)
+
+
+def read_benchmark(name):
+    if name == "temporaries":
+        return TEMPORARIES, []
+    folder = os.path.join(PROGRAMS_DIR, name)
+    with open(os.path.join(folder, "v3.brewin")) as file:
+        source = file.read().splitlines()
+    with open(os.path.join(folder, "input.txt")) as file:
+        inputs = file.read().splitlines()
+    return source, inputs
+
+
+def measure(source, inputs, freeze_program):
+    gc.unfreeze()
+    gc.collect()
+    resident = Interpreter(console_output=False)
+    resident.load(generate(3, **RESIDENT_PROGRAM))
+    interpreter = Interpreter(
+        console_output=False, inp=inputs, freeze_program=freeze_program
+    )
+    interpreter.load(source)
+    with PauseTimer() as timer:
+        start = time.perf_counter()
+        interpreter.run_main()
+        elapsed = time.perf_counter() - start
+    gc.unfreeze()
+    collections = [0, 0, 0]
+    for generation, _ in timer.pauses:
+        collections[generation] += 1
+    pauses = [seconds for _, seconds in timer.pauses]
+    return {
+        "run": elapsed,
+        "collections": collections,
+        "total_pause": sum(pauses),
+        "max_pause": max(pauses, default=0.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure garbage collection pauses of the v3 interpreter."
+    )
+    parser.add_argument(
+        "-k", dest="name_filter", help="only run programs whose name contains this"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    print(
+        f"{'program':24} {'run ms':>9} {'gen0/1/2':>12} {'total pause ms':>15} {'max pause ms':>13}"
+    )
+    for name in PROGRAMS:
+        if args.name_filter and args.name_filter not in name:
+            continue
+        source, inputs = read_benchmark(name)
+        for freeze_program in (False, True):
+            runs = [measure(source, inputs, freeze_program) for _ in range(args.repeat)]
+            result = sorted(runs, key=lambda run: run["total_pause"])[len(runs) // 2]
+            key = f"{name}{' (frozen)' if freeze_program else ''}"
+            results[key] = result
+            collections = "/".join(map(str, result["collections"]))
+            print(
+                f"{key:24} {result['run'] * 1000:9.2f} {collections:>12} "
+                f"{result['total_pause'] * 1000:15.2f} {result['max_pause'] * 1000:13.2f}"
+            )
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
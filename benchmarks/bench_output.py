@@ -0,0 +1,82 @@
+"""
+Measures how many lines per second a Brewin program can print with the different output configurations.
+
+usage: python benchmarks/bench_output.py [num_lines]
+
+num_lines defaults to 200000.
+
+Console output is redirected to /dev/null while measuring, so the numbers reflect interpreter and I/O overhead
+rather than terminal speed.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from interpreterv3 import Interpreter  # noqa: E402
+from intio import BufferedOutputSink, NullOutputSink  # noqa: E402
+
+PROGRAM = """
+(class main
+  (method void main ()
+    (let ((int i 0) (int n 0))
+      (inputi n)
+      (while (< i n) (begin (print "line " i) (set i (+ i 1))))
+    )
+  )
+)
+""".splitlines()
+
+CONFIGURATIONS = [
+    ("print() + output_log", lambda: {}),
+    ("print(), output_log off", lambda: {"output_log_limit": 0}),
+    ("buffered fd sink + output_log", lambda: {"output_sink": BufferedOutputSink()}),
+    (
+        "buffered fd sink, output_log off",
+        lambda: {"output_sink": BufferedOutputSink(), "output_log_limit": 0},
+    ),
+    (
+        "null sink, output_log off",
+        lambda: {"output_sink": NullOutputSink(), "output_log_limit": 0},
+    ),
+]
+
+
+def measure(num_lines, options):
+    interpreter = Interpreter(inp=[str(num_lines)], **options)
+    start = time.perf_counter()
+    interpreter.run(PROGRAM)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the lines per second of each output configuration."
+    )
+    parser.add_argument("num_lines", type=int, nargs="?", default=200000)
+    num_lines = parser.parse_args().num_lines
+    results = []
+    saved_stdout = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        sys.stdout.flush()
+        os.dup2(devnull, 1)
+        for name, make_options in CONFIGURATIONS:
+            elapsed = measure(num_lines, make_options())
+            sys.stdout.flush()
+            results.append((name, elapsed))
+    finally:
+        os.dup2(saved_stdout, 1)
+        os.close(devnull)
+        os.close(saved_stdout)
+
+    print(f"{num_lines} lines")
+    for name, elapsed in results:
+        print(f"{name:35} {num_lines / elapsed:12,.0f} lines/s  ({elapsed:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Micro-benchmarks of the version 3 interpreter's hot primitives, each timed in isolation so that an optimization of one
+layer can be validated on its own.
+
+usage: python benchmarks/bench_primitives.py [-k NAME] [--repeat N] [-o results.json]
+
+Each benchmark reports its cost per operation: the best of --repeat timings (default 5), each of a loop long enough
+(per timeit's autorange) to make timer resolution and loop overhead negligible.
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bparser import BParser  # noqa: E402
+from env_v2 import EnvironmentManager  # noqa: E402
+from interpreterv3 import Interpreter  # noqa: E402
+from intbase import InterpreterBase  # noqa: E402
+from type_valuev3 import Type, create_value  # noqa: E402
+
+INHERITANCE_DEPTH = 8
+
+
+# a program with a chain of classes c0 <- c1 <- ... <- c<INHERITANCE_DEPTH>, classes with many fields, and a
+# templated class
+def make_program():
+    lines = [
+        "(class c0",
+        "  (field int f0 0)",
+        "  (method int base_method ((int x)) (return x))",
+        "  (method int own_method ((int x)) (return x))",
+        ")",
+    ]
+    for depth in range(1, INHERITANCE_DEPTH + 1):
+        lines += [
+            f"(class c{depth} inherits c{depth - 1}",
+            f"  (field int f{depth} 0)",
+            "  (method int own_method ((int x)) (return x))",
+            ")",
+        ]
+    for num_fields in (1, 10, 50):
+        lines.append(f"(class fields{num_fields}")
+        lines += [f"  (field int f{i} {i})" for i in range(num_fields)]
+        lines.append(")")
+    lines += [
+        "(tclass pair (K V)",
+        "  (field K key)",
+        "  (field V value)",
+        "  (method void set ((K k) (V v)) (begin (set key k) (set value v)))",
+        "  (method K get_key () (return key))",
+        ")",
+        "(class main (method void main () (print 0)))",
+    ]
+    return lines
+
+
+def make_benchmarks():
+    """Returns [(name, function to time)]."""
+    program = make_program()
+    interpreter = Interpreter(console_output=False)
+    interpreter.load(program)
+    type_manager = interpreter.type_manager
+    deepest = f"c{INHERITANCE_DEPTH}"
+    benchmarks = [
+        (f"BParser.parse ({len(program)} lines)", lambda: BParser.parse(program)),
+        ("create_value int", lambda: create_value("12345")),
+        ("create_value string", lambda: create_value('"hello"')),
+        ("create_value bool", lambda: create_value(InterpreterBase.TRUE_DEF)),
+        ("create_value null", lambda: create_value(InterpreterBase.NULL_DEF)),
+    ]
+
+    for depth in (1, 4, 16):
+        env = EnvironmentManager()
+        env.create_new_symbol("outer")
+        for _ in range(depth - 1):
+            env.block_nest()
+        env.create_new_symbol("inner")
+        benchmarks.append(
+            (f"EnvironmentManager.get depth {depth}", lambda env=env: env.get("outer"))
+        )
+        benchmarks.append(
+            (
+                f"EnvironmentManager.get depth {depth} (miss)",
+                lambda env=env: env.get("nope"),
+            )
+        )
+
+    check = type_manager.check_type_compatibility
+    for description, typea, typeb in (
+        ("int, int", Type("int"), Type("int")),
+        ("same class", Type("c0"), Type("c0")),
+        (f"c0, {deepest} ({INHERITANCE_DEPTH} levels)", Type("c0"), Type(deepest)),
+        (f"{deepest}, c0 (incompatible)", Type(deepest), Type("c0")),
+        ("c0, null", Type("c0"), Type(InterpreterBase.NULL_DEF)),
+        ("pair@int@string, same", Type("pair@int@string"), Type("pair@int@string")),
+        (
+            "pair@int@string, pair@int@int",
+            Type("pair@int@string"),
+            Type("pair@int@int"),
+        ),
+    ):
+        benchmarks.append(
+            (
+                f"check_type_compatibility {description}",
+                lambda typea=typea, typeb=typeb: check(typea, typeb, True),
+            )
+        )
+
+    for class_name in ("fields1", "fields10", "fields50", "c0", "c4", deepest):
+        benchmarks.append(
+            (
+                f"ObjectDef init {class_name}",
+                lambda class_name=class_name: interpreter.instantiate(class_name, None),
+            )
+        )
+
+    obj = interpreter.instantiate(deepest, None)
+    args = [create_value("1")]
+    benchmarks += [
+        (
+            "call_method own method",
+            lambda: obj.call_method("own_method", args, False, None),
+        ),
+        (
+            f"call_method inherited ({INHERITANCE_DEPTH} levels up)",
+            lambda: obj.call_method("base_method", args, False, None),
+        ),
+    ]
+
+    template = interpreter.class_index["pair"]
+
+    def specialize():
+        template.specializations.clear()
+        template.specialize_class("pair@int@string")
+
+    benchmarks += [
+        ("ClassDef.specialize_class (build)", specialize),
+        (
+            "ClassDef.specialize_class (cached)",
+            lambda: template.specialize_class("pair@int@string"),
+        ),
+    ]
+    return benchmarks
+
+
+def time_per_op(function, repeat):
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the interpreter micro-benchmarks."
+    )
+    parser.add_argument(
+        "-k", dest="name_filter", help="only run benchmarks whose name contains this"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="write the results (seconds per operation) to this JSON file",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for name, function in make_benchmarks():
+        if args.name_filter and args.name_filter not in name:
+            continue
+        results[name] = time_per_op(function, args.repeat)
+        print(f"{name:55} {results[name] * 1e9:12,.0f} ns/op")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Measures how long short programs wait behind long-running ones when many version 3 programs share a thread, run one
+after the other or time-sliced by a scheduler.Scheduler.
+
+usage: python benchmarks/bench_scheduler.py [--short N] [--long N] [--slice-steps STEPS] [-o results.json]
+
+The workload is --long (default 4) programs that each loop 50000 times, submitted first, and --short (default 100)
+programs that print a greeting after a few calls. Each program is compiled once, up front. The report shows the total
+run time of the workload and the median and worst latency of a short program (from the start of the run to the end
+of the program): once when the programs are run to completion in the order they were submitted, and once for each of
+a few slice sizes (or --slice-steps) when the scheduler runs them. The long programs get priority 1 and the short
+ones priority 2.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, ".."))
+
+import interpreterv3  # noqa: E402
+from scheduler import Scheduler  # noqa: E402
+
+LONG = [
+    "(class main",
+    "  (method void main ()",
+    "    (let ((int i 0) (int total 0))",
+    "      (while (< i 50000) (begin (set total (+ total (% i 7))) (set i (+ i 1))))",
+    "      (print total))))",
+]
+SHORT = [
+    "(class main",
+    "  (method string greet ((string name) (int n))",
+    '    (if (== n 0) (return (+ "hello " name)) (return (call me greet name (- n 1)))))',
+    '  (method void main () (print (call me greet "world" 10))))',
+]
+SLICE_STEPS = (100, 500, 2000)
+
+
+def compile_workload(long_count, short_count):
+    programs = [(interpreterv3.compile(LONG), 1) for _ in range(long_count)]
+    programs += [(interpreterv3.compile(SHORT), 2) for _ in range(short_count)]
+    return programs
+
+
+# returns (total seconds, latencies of the short programs)
+def run_sequentially(programs):
+    latencies = []
+    start = time.perf_counter()
+    for program, priority in programs:
+        program.run()
+        if priority == 2:
+            latencies.append(time.perf_counter() - start)
+    return time.perf_counter() - start, latencies
+
+
+def run_scheduled(programs, slice_steps):
+    scheduler = Scheduler(slice_steps)
+    tasks = [
+        scheduler.submit(program, priority=priority) for program, priority in programs
+    ]
+    latencies = []
+    start = time.perf_counter()
+    while scheduler.tasks:
+        for task in scheduler.run_round():
+            if task.priority == 2:
+                latencies.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - start
+    if any(task.result.error_type is not None for task in tasks):
+        raise RuntimeError("a program of the workload ended with an error")
+    return elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the latency of short programs run by a Scheduler."
+    )
+    parser.add_argument("--short", type=int, default=100)
+    parser.add_argument("--long", type=int, default=4)
+    parser.add_argument("--slice-steps", type=int, action="append")
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    programs = compile_workload(args.long, args.short)
+    runs = {"sequential": run_sequentially(programs)}
+    for slice_steps in args.slice_steps or SLICE_STEPS:
+        runs[f"scheduled ({slice_steps} steps)"] = run_scheduled(programs, slice_steps)
+
+    results = {}
+    print(
+        f"{'schedule':26} {'total ms':>10} {'median latency ms':>18} {'max latency ms':>15}"
+    )
+    for name, (elapsed, latencies) in runs.items():
+        results[name] = {
+            "total": elapsed,
+            "median_latency": statistics.median(latencies),
+            "max_latency": max(latencies),
+        }
+        print(
+            f"{name:26} {elapsed * 1000:10.1f} {statistics.median(latencies) * 1000:18.2f} "
+            f"{max(latencies) * 1000:15.2f}"
+        )
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Measures how much of a warm start a snapshot saves (see snapshot.py): the cold start of a version 3 program that
+builds a large object graph before it answers its first query, against restoring an interpreter from a snapshot taken
+after that run.
+
+usage: python benchmarks/bench_snapshot.py [--nodes N] [--classes N] [--repeat N] [-o results.json]
+
+The program is a large generated program (--classes classes, see generate_program.py) with a main class whose first
+run builds a binary search tree of --nodes (default 20000) nodes, and whose every run then looks up one key read from
+its input. The report shows, for the median of --repeat runs (default 3): the cold start (parsing and loading the
+program, and the run that builds the tree and answers the first query), the time to take the snapshot and its size,
+and the warm start (restoring the snapshot, and a run that only answers a query, on the restored main object), and
+checks that the query's answer is the same after a restore.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, ".."))
+
+import snapshot  # noqa: E402
+from generate_program import generate  # noqa: E402
+from interpreterv3 import Interpreter  # noqa: E402
+
+# the main class; NODES is replaced with the tree size
+TREE_PROGRAM = """
+(class tree_node
+  (field int key 0)
+  (field tree_node left null)
+  (field tree_node right null)
+  (method void init ((int k)) (set key k))
+  (method bool contains ((int k))
+    (if (== k key) (return true)
+      (if (< k key)
+        (if (== left null) (return false) (return (call left contains k)))
+        (if (== right null) (return false) (return (call right contains k))))))
+  (method void insert ((int k))
+    (if (< k key)
+      (if (== left null) (begin (set left (new tree_node)) (call left init k)) (call left insert k))
+      (if (== right null) (begin (set right (new tree_node)) (call right init k)) (call right insert k)))))
+(class main
+  (field tree_node root null)
+  (method void build ()
+    (let ((int i 1) (int k 0))
+      (set root (new tree_node))
+      (call root init 50000)
+      (while (< i NODES)
+        (begin (set k (% (* i 7919) 100003)) (call root insert k) (set i (+ i 1))))))
+  (method void main ()
+    (let ((int k 0))
+      (if (== root null) (call me build))
+      (inputi k)
+      (print (call root contains k)))))
+"""
+
+
+def program_source(nodes, classes):
+    source = generate(3, classes=classes, methods=4, body_size=4, loop_trips=1)
+    # the generated program's main class comes last, and is replaced
+    source = source[: source.index("(class main")]
+    return source + TREE_PROGRAM.replace("NODES", str(nodes)).split("\n")
+
+
+def measure(source):
+    inputs = ["7919", "15838"]
+    start = time.perf_counter()
+    interpreter = Interpreter(console_output=False, inp=inputs)
+    interpreter.run(source)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data = snapshot.dumps(interpreter)
+    dump = time.perf_counter() - start
+    interpreter.run_main(keep_main_object=True)
+    expected = interpreter.get_output()
+
+    start = time.perf_counter()
+    restored = snapshot.loads(data, console_output=False, inp=inputs)
+    restore = time.perf_counter() - start
+    restored.run_main(keep_main_object=True)
+    warm = time.perf_counter() - start
+    if restored.get_output() != expected:
+        raise RuntimeError("the restored interpreter answered differently")
+    return {
+        "cold": cold,
+        "dump": dump,
+        "size": len(data),
+        "restore": restore,
+        "warm": warm,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the warm start of a restored snapshot."
+    )
+    parser.add_argument("--nodes", type=int, default=20000)
+    parser.add_argument("--classes", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    source = program_source(args.nodes, args.classes)
+    runs = [measure(source) for _ in range(args.repeat)]
+    result = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+    print(
+        f"{'cold start ms':>14} {'snapshot ms':>12} {'snapshot KiB':>13} {'restore ms':>11} {'warm start ms':>14}"
+    )
+    print(
+        f"{result['cold'] * 1000:14.1f} {result['dump'] * 1000:12.1f} {result['size'] / 1024:13.1f} "
+        f"{result['restore'] * 1000:11.1f} {result['warm'] * 1000:14.1f}"
+    )
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(result, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Measures the cold start of the command-line entry point (python -m brewin) for each language version, and checks it
+against a time budget.
+
+usage: python benchmarks/bench_startup.py [--repeat N] [--budget-ms MS] [-o results.json]
+
+Each version runs a program that prints one line, in a new process, --repeat times (default 20) after a warmup run
+(which also writes the bytecode caches, as they would be after installation, even if PYTHONDONTWRITEBYTECODE is set
+here). The report shows the median wall time of a run, the bare start of Python (python -c pass) it includes, and
+the startup overhead: the difference of the two. A version is over budget if its overhead exceeds --budget-ms
+(default STARTUP_BUDGET_MS), or if a run imports modules it shouldn't need (argparse, or another version's
+interpreter), as reported by python -X importtime; the script then exits with status 1.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.join(BENCHMARKS_DIR, "..")
+
+# startup overhead over a bare Python, in ms; about 17 ms per version were measured when this budget was set
+STARTUP_BUDGET_MS = 25
+
+HELLO = {
+    1: '(class main (method main () (print "hello")))',
+    2: '(class main (method void main () (print "hello")))',
+    3: '(class main (method void main () (print "hello")))',
+}
+
+# modules that aren't needed to run version `version`
+VERSION_MODULES = ("interpreterv", "classv", "objectv", "type_valuev")
+V3_ONLY_MODULES = ("evalstackv3", "limits", "instrumentation")
+
+
+def unneeded_module(name, version):
+    if name == "argparse":
+        return True
+    if name in V3_ONLY_MODULES and version != 3:
+        return True
+    for prefix in VERSION_MODULES:
+        if name.startswith(prefix) and name != f"{prefix}{version}":
+            return True
+    return False
+
+
+def child_env():
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [REPO_DIR] + [path for path in [env.get("PYTHONPATH")] if path]
+    )
+    return env
+
+
+def time_runs(command, env, repeat):
+    """Returns the wall time of each of repeat runs of command, after a warmup run."""
+    subprocess.run(command, env=env, stdin=subprocess.DEVNULL, capture_output=True)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            command, env=env, stdin=subprocess.DEVNULL, capture_output=True, check=True
+        )
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def imported_modules(command, env):
+    """Returns the names of the modules imported by a run of command, from python -X importtime."""
+    command = [command[0], "-X", "importtime"] + command[1:]
+    result = subprocess.run(
+        command, env=env, stdin=subprocess.DEVNULL, capture_output=True, text=True
+    )
+    names = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            if name != "imported package":
+                names.append(name)
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the cold start of python -m brewin."
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    env = child_env()
+    bare = statistics.median(
+        time_runs([sys.executable, "-c", "pass"], env, args.repeat)
+    )
+    results = {"bare": bare, "versions": {}}
+    over_budget = False
+    print(
+        f"{'version':8} {'run ms':>9} {'bare ms':>9} {'overhead ms':>12}  unneeded modules"
+    )
+    with tempfile.TemporaryDirectory() as folder:
+        for version, source in HELLO.items():
+            path = os.path.join(folder, f"hello{version}.brewin")
+            with open(path, "w") as file:
+                file.write(source + "\n")
+            command = [sys.executable, "-m", "brewin", path, "-v", str(version)]
+            run = statistics.median(time_runs(command, env, args.repeat))
+            unneeded = [
+                name
+                for name in imported_modules(command, env)
+                if unneeded_module(name, version)
+            ]
+            overhead = run - bare
+            if overhead * 1000 > args.budget_ms or unneeded:
+                over_budget = True
+            results["versions"][version] = {
+                "run": run,
+                "overhead": overhead,
+                "unneeded_modules": unneeded,
+            }
+            mark = "!" if overhead * 1000 > args.budget_ms else " "
+            print(
+                f"{version:<8} {run * 1000:9.2f} {bare * 1000:9.2f} {overhead * 1000:11.2f}{mark}  "
+                f"{', '.join(unneeded) or '-'}"
+            )
+    print(f"budget: {args.budget_ms:g} ms of overhead per version")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Generates large, valid Brewin programs for scaling tests.
+
+usage: python benchmarks/generate_program.py [--version N] [--classes N] [--inheritance-depth N] [--methods N]
+                                             [--overloads N] [--templates N] [--template-nesting N]
+                                             [--body-size N] [--loop-trips N] > program.brewin
+
+The classes are split into inheritance chains of inheritance_depth classes (version 1 has no inheritance, so each
+class is its own chain). Every class has methods methods, each made of body_size statements, and its own field. main
+creates the most derived object of each chain and, loop_trips times, calls every method of every class of the chain
+on it, so calls to the methods of base classes walk up the superclass chain.
+
+With overloads > 0 (versions 2 and 3), the last overloads classes of each chain also define an "ov" method taking one
+more parameter than their superclass's, and main calls each of them.
+
+With templates > 0 (version 3), the program defines templates families of templated classes: family j is a chain
+of template_nesting classes t<j>_0 (T) ... in which each holds a field of the next one's type, e.g. t0_1@T, so using
+t0_0@int specializes the whole family for int. main uses each family with int and string.
+
+The program prints one line: the sum of what the methods returned.
+"""
+
+import argparse
+import sys
+
+DEFAULTS = {
+    "classes": 8,
+    "inheritance_depth": 4,
+    "methods": 4,
+    "overloads": 0,
+    "templates": 0,
+    "template_nesting": 1,
+    "body_size": 4,
+    "loop_trips": 10,
+}
+
+
+def generate(version=3, **params):
+    """Returns the lines of a program; params are the keys of DEFAULTS."""
+    unknown = set(params) - set(DEFAULTS)
+    if unknown:
+        raise TypeError(f"unknown parameters: {', '.join(sorted(unknown))}")
+    params = {**DEFAULTS, **params}
+    if version == 1:
+        params["inheritance_depth"] = 1
+    if version < 2:
+        params["overloads"] = 0
+    if version < 3:
+        params["templates"] = 0
+    params["overloads"] = min(params["overloads"], params["inheritance_depth"])
+    return _Generator(version, params).generate()
+
+
+class _Generator:
+    def __init__(self, version, params):
+        self.version = version
+        self.typed = version >= 2
+        self.params = params
+        self.lines = []
+        depth = params["inheritance_depth"]
+        classes = params["classes"]
+        # each chain is a list of class numbers, from base to most derived
+        self.chains = [
+            list(range(start, min(start + depth, classes)))
+            for start in range(0, classes, depth)
+        ]
+
+    def generate(self):
+        for chain in self.chains:
+            for pos, class_num in enumerate(chain):
+                self.__add_class(chain, pos, class_num)
+        for family in range(self.params["templates"]):
+            for level in range(self.params["template_nesting"]):
+                self.__add_template(family, level)
+        self.__add_main()
+        return self.lines
+
+    # e.g. "int x" -> "(int x)" in versions 2 and 3, "x" in version 1
+    def __param(self, type_name, name):
+        return f"({type_name} {name})" if self.typed else name
+
+    def __method(self, return_type, name, params, body):
+        params = " ".join(params)
+        if self.typed:
+            return f"  (method {return_type} {name} ({params}) {body})"
+        return f"  (method {name} ({params}) {body})"
+
+    def __field(self, type_name, name, value):
+        if self.typed:
+            return f"  (field {type_name} {name} {value})"
+        return f"  (field {name} {value})"
+
+    def __add_class(self, chain, pos, class_num):
+        header = f"(class c{class_num}"
+        if pos > 0:
+            header += f" inherits c{chain[pos - 1]}"
+        self.lines.append(header)
+        field = f"a{class_num}"
+        self.lines.append(self.__field("int", field, 0))
+        for method_num in range(self.params["methods"]):
+            statements = [
+                f"(set {field} (+ {field} (* x {(method_num + i) % 7 + 1})))"
+                for i in range(self.params["body_size"])
+            ]
+            statements.append(f"(return (% {field} 1000))")
+            body = f"(begin {' '.join(statements)})"
+            self.lines.append(
+                self.__method(
+                    "int",
+                    f"m{class_num}_{method_num}",
+                    [self.__param("int", "x")],
+                    body,
+                )
+            )
+        overload_pos = pos - (len(chain) - self.params["overloads"])
+        if overload_pos >= 0:
+            params = [self.__param("int", f"p{i}") for i in range(overload_pos + 1)]
+            self.lines.append(
+                self.__method("int", "ov", params, f"(return {overload_pos + 1})")
+            )
+        self.lines.append(")")
+
+    def __add_template(self, family, level):
+        name = f"t{family}_{level}"
+        self.lines.append(f"(tclass {name} (T)")
+        self.lines.append("  (field T value)")
+        if level + 1 < self.params["template_nesting"]:
+            self.lines.append(f"  (field t{family}_{level + 1}@T inner null)")
+        self.lines.append("  (method void put ((T v)) (set value v))")
+        self.lines.append("  (method T get () (return value))")
+        self.lines.append(")")
+
+    def __add_main(self):
+        chain_objects = [f"o{num}" for num in range(len(self.chains))]
+        template_vars = []
+        for family in range(self.params["templates"]):
+            for type_name, value in (("int", "1"), ("string", '"s"')):
+                template_vars.append(
+                    (f"t{family}_0@{type_name}", f"v{family}{type_name}", value)
+                )
+
+        setup = []
+        for obj, chain in zip(chain_objects, self.chains):
+            setup.append(f"(set {obj} (new c{chain[-1]}))")
+        for type_name, var, _ in template_vars:
+            setup.append(f"(set {var} (new {type_name}))")
+
+        calls = []
+        for obj, chain in zip(chain_objects, self.chains):
+            for class_num in chain:
+                for method_num in range(self.params["methods"]):
+                    calls.append(
+                        f"(set total (+ total (call {obj} m{class_num}_{method_num} i)))"
+                    )
+            for num_params in range(1, self.params["overloads"] + 1):
+                args = " ".join(["i"] * num_params)
+                calls.append(f"(set total (+ total (call {obj} ov {args})))")
+        for _, var, value in template_vars:
+            calls.append(f"(call {var} put {value})")
+            calls.append(f"(call {var} get)")
+        calls.append("(set i (+ i 1))")
+
+        loop = f"(while (< i {self.params['loop_trips']}) (begin {' '.join(calls)}))"
+        statements = setup + [loop, "(print total)"]
+
+        if self.typed:
+            local_defs = ["(int i 0)", "(int total 0)"]
+            local_defs += [
+                f"(c{chain[-1]} {obj} null)"
+                for obj, chain in zip(chain_objects, self.chains)
+            ]
+            local_defs += [
+                f"({type_name} {var} null)" for type_name, var, _ in template_vars
+            ]
+            self.lines.append("(class main")
+            self.lines.append("  (method void main ()")
+            self.lines.append(f"    (let ({' '.join(local_defs)})")
+        else:
+            self.lines.append("(class main")
+            for name in ["i", "total"]:
+                self.lines.append(self.__field("int", name, 0))
+            for obj in chain_objects:
+                self.lines.append(self.__field(None, obj, "null"))
+            self.lines.append("  (method main ()")
+            self.lines.append("    (begin")
+        self.lines += [f"      {statement}" for statement in statements]
+        self.lines += ["    )", "  )", ")"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a large Brewin program.")
+    parser.add_argument("--version", type=int, default=3, choices=(1, 2, 3))
+    for name, default in DEFAULTS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default)
+    args = vars(parser.parse_args())
+    version = args.pop("version")
+    sys.stdout.write("\n".join(generate(version, **args)) + "\n")
+
+
+if __name__ == "__main__":
+    main()
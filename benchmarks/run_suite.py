@@ -0,0 +1,152 @@
+"""
+Runs the Brewin benchmark suite against each interpreter version and reports the timings, optionally comparing them
+to a saved baseline.
+
+usage: python benchmarks/run_suite.py [-k NAME] [--versions 1,2,3] [--warmup N] [--repeat N] [-o results.json]
+                                      [--baseline baseline.json] [--threshold FRACTION]
+
+Each folder in benchmarks/programs is a benchmark: it holds a v1.brewin, v2.brewin and/or v3.brewin variant of the
+same program (for the versions of the language that can express it) and the input.txt they all read. A run includes
+parsing and loading the program, like Interpreter.run() does; output is only collected, not printed.
+
+Results are written as JSON, keyed by "benchmark/vN". With --baseline, a benchmark whose median time grew by more
+than the threshold (default 10%) over the baseline's is reported as a regression, and the exit status is 1.
+"""
+
+import argparse
+import gc
+import importlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROGRAMS_DIR = os.path.join(BENCHMARKS_DIR, "programs")
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, ".."))
+
+VERSIONS = (1, 2, 3)
+
+
+def find_benchmarks(name_filter=None):
+    """Returns [(name, version, source lines, input lines)], sorted by name and version."""
+    benchmarks = []
+    for name in sorted(os.listdir(PROGRAMS_DIR)):
+        folder = os.path.join(PROGRAMS_DIR, name)
+        if not os.path.isdir(folder) or (name_filter and name_filter not in name):
+            continue
+        inputs = []
+        input_path = os.path.join(folder, "input.txt")
+        if os.path.exists(input_path):
+            with open(input_path) as file:
+                inputs = file.read().splitlines()
+        for version in VERSIONS:
+            path = os.path.join(folder, f"v{version}.brewin")
+            if os.path.exists(path):
+                with open(path) as file:
+                    benchmarks.append((name, version, file.read().splitlines(), inputs))
+    return benchmarks
+
+
+def time_run(interpreter_class, source, inputs):
+    """Runs the program once; returns (seconds, output lines)."""
+    interpreter = interpreter_class(console_output=False, inp=inputs)
+    gc.collect()
+    start = time.perf_counter()
+    interpreter.run(source)
+    elapsed = time.perf_counter() - start
+    return elapsed, interpreter.get_output()
+
+
+def run_benchmark(interpreter_class, source, inputs, warmup, repeat):
+    output = None
+    for _ in range(warmup):
+        _, output = time_run(interpreter_class, source, inputs)
+    times = []
+    for _ in range(repeat):
+        elapsed, output = time_run(interpreter_class, source, inputs)
+        times.append(elapsed)
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "times": times,
+    }, output
+
+
+def compare(results, baseline, threshold):
+    """Returns [(key, baseline median, median)] of the benchmarks that got slower by more than threshold."""
+    regressions = []
+    for key, result in results["benchmarks"].items():
+        old = baseline["benchmarks"].get(key)
+        if old is not None and result["median"] > old["median"] * (1 + threshold):
+            regressions.append((key, old["median"], result["median"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Brewin benchmark suite.")
+    parser.add_argument(
+        "-k", dest="name_filter", help="only run benchmarks whose name contains this"
+    )
+    parser.add_argument("--versions", default="1,2,3", help="comma-separated versions")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="results JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    versions = {int(version) for version in args.versions.split(",")}
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "warmup": args.warmup,
+        "repeat": args.repeat,
+        "benchmarks": {},
+    }
+    # benchmark name -> (version, output) of the first version run, to check the others against
+    outputs = {}
+    for name, version, source, inputs in find_benchmarks(args.name_filter):
+        if version not in versions:
+            continue
+        interpreter_class = importlib.import_module(
+            f"interpreterv{version}"
+        ).Interpreter
+        result, output = run_benchmark(
+            interpreter_class, source, inputs, args.warmup, args.repeat
+        )
+        key = f"{name}/v{version}"
+        results["benchmarks"][key] = result
+        print(
+            f"{key:20} median {result['median'] * 1000:9.2f} ms  "
+            f"min {result['min'] * 1000:9.2f} ms  stdev {result['stdev'] * 1000:7.2f} ms"
+        )
+        first_version, first_output = outputs.setdefault(name, (version, output))
+        if output != first_output:
+            print(f"  warning: output differs from {name}/v{first_version}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        for key, old, new in regressions:
+            print(
+                f"REGRESSION {key}: median {old * 1000:.2f} ms -> {new * 1000:.2f} ms "
+                f"(+{(new / old - 1) * 100:.0f}%)"
+            )
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions over {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Reports how parse, load and run time and peak memory grow as each dimension of a generated program grows, to expose
+superlinear behavior in parsing, type and class setup, or execution.
+
+usage: python benchmarks/scaling_report.py [-k DIMENSION] [--versions 1,2,3] [--steps N] [--repeat N]
+                                           [-o results.json]
+
+For each dimension of generate_program.generate() (classes, inheritance depth, methods per class, overloads,
+templates, template nesting, body size, loop trips), the program is regenerated with that dimension doubled --steps
+times (default 4) while the others keep their base values, and run with each version of the interpreter that can
+express the dimension. Timings are the best of --repeat runs (default 3): parse is BParser.parse(), load is
+Interpreter.load() (which parses, then builds the type and class metadata) and run is Interpreter.run_main(). Peak
+memory is measured over a separate load and run with tracemalloc.
+
+Each column ends with its growth exponent over the last doubling (the log2 of the ratio of its last two values): about
+1 means linear growth, and exponents above SUPERLINEAR are marked with "!".
+"""
+
+import argparse
+import gc
+import importlib
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, ".."))
+
+from bparser import BParser  # noqa: E402
+from generate_program import generate  # noqa: E402
+
+# the values the dimensions keep while another one grows
+BASE = {
+    "classes": 16,
+    "inheritance_depth": 4,
+    "methods": 4,
+    "overloads": 0,
+    "templates": 0,
+    "template_nesting": 1,
+    "body_size": 4,
+    "loop_trips": 5,
+}
+
+# dimension -> (first value, overrides of BASE, versions that can express the dimension)
+DIMENSIONS = {
+    "classes": (8, {}, (1, 2, 3)),
+    "inheritance_depth": (1, {}, (2, 3)),
+    "methods": (2, {}, (1, 2, 3)),
+    "overloads": (1, {"inheritance_depth": 16}, (2, 3)),
+    "templates": (1, {}, (3,)),
+    "template_nesting": (1, {"templates": 2}, (3,)),
+    "body_size": (2, {}, (1, 2, 3)),
+    "loop_trips": (5, {}, (1, 2, 3)),
+}
+
+COLUMNS = ("parse", "load", "run", "peak_kib")
+SUPERLINEAR = 1.3
+
+
+def measure(interpreter_class, program, repeat):
+    """Returns {column: value} for one program."""
+    best = {"parse": math.inf, "load": math.inf, "run": math.inf}
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        BParser.parse(program)
+        best["parse"] = min(best["parse"], time.perf_counter() - start)
+
+        interpreter = interpreter_class(console_output=False)
+        gc.collect()
+        start = time.perf_counter()
+        interpreter.load(program)
+        loaded = time.perf_counter()
+        interpreter.run_main()
+        best["load"] = min(best["load"], loaded - start)
+        best["run"] = min(best["run"], time.perf_counter() - loaded)
+
+    interpreter = interpreter_class(console_output=False)
+    gc.collect()
+    tracemalloc.start()
+    interpreter.load(program)
+    interpreter.run_main()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    best["peak_kib"] = peak / 1024
+    return best
+
+
+def scale(dimension, version, steps, repeat):
+    """Returns [(dimension value, program lines, {column: value})], one per doubling."""
+    first, overrides, _ = DIMENSIONS[dimension]
+    interpreter_class = importlib.import_module(f"interpreterv{version}").Interpreter
+    rows = []
+    for step in range(steps):
+        value = first * 2**step
+        params = {**BASE, **overrides, dimension: value}
+        program = generate(version, **params)
+        rows.append((value, len(program), measure(interpreter_class, program, repeat)))
+    return rows
+
+
+def growth_exponent(rows, column):
+    if len(rows) < 2:
+        return None
+    (value_a, _, a), (value_b, _, b) = rows[-2:]
+    if a[column] <= 0 or b[column] <= 0:
+        return None
+    return math.log(b[column] / a[column]) / math.log(value_b / value_a)
+
+
+def print_table(dimension, version, rows):
+    print(f"{dimension} (v{version})")
+    print(
+        f"  {'value':>8} {'lines':>7} {'parse ms':>10} {'load ms':>10} {'run ms':>10} {'peak KiB':>10}"
+    )
+    for value, lines, result in rows:
+        print(
+            f"  {value:8} {lines:7} {result['parse'] * 1000:10.2f} {result['load'] * 1000:10.2f} "
+            f"{result['run'] * 1000:10.2f} {result['peak_kib']:10.0f}"
+        )
+    cells = []
+    for column in COLUMNS:
+        exponent = growth_exponent(rows, column)
+        if exponent is None:
+            cells.append(f"{'-':>10}")
+        else:
+            mark = "!" if exponent > SUPERLINEAR else " "
+            cells.append(f"{exponent:9.2f}{mark}")
+    print(f"  {'growth':>8} {'':7} {' '.join(cells)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report how the interpreters scale with program size."
+    )
+    parser.add_argument(
+        "-k", dest="name_filter", help="only scale dimensions whose name contains this"
+    )
+    parser.add_argument("--versions", default="1,2,3", help="comma-separated versions")
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    versions = {int(version) for version in args.versions.split(",")}
+    results = {}
+    for dimension, (_, _, dimension_versions) in DIMENSIONS.items():
+        if args.name_filter and args.name_filter not in dimension:
+            continue
+        for version in dimension_versions:
+            if version not in versions:
+                continue
+            rows = scale(dimension, version, args.steps, args.repeat)
+            print_table(dimension, version, rows)
+            results[f"{dimension}/v{version}"] = [
+                {"value": value, "lines": lines, **result}
+                for value, lines, result in rows
+            ]
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Command-line entry point that runs a Brewin program.
+
+usage: python -m brewin program.brewin [-v N] [-i INPUT_FILE] [-s SOCKET]
+
+-v selects the language version (1, 2 or 3; default 3). The program's input is read from INPUT_FILE or, if there's
+none, from stdin, which is read all at once when the program first asks for input (rather than a line per (inputs
+...) statement); if stdin is a terminal, input is read from the keyboard as the program asks for it instead. Output
+is written to stdout in blocks (see intio.BufferedOutputSink), flushed when the program ends, reports an error or
+waits for keyboard input. If the program ends with an error, the error is written to stderr and the exit status is 1.
+
+-s runs the program on the daemon listening on SOCKET (see rundaemon.py) rather than in this process, which saves
+importing the interpreter and loading the program. The input is then read (all of it) before the program is sent,
+and a terminal provides no input.
+
+Starting up is most of the cost of running a small program, so this module only imports the selected version's
+interpreter (and the modules it uses), once the arguments are known, and parses them without argparse, which takes
+about as long to import as the whole version 3 interpreter. benchmarks/bench_startup.py measures the cold start of
+each version against a time budget.
+"""
+
+import importlib
+import sys
+
+USAGE = "usage: python -m brewin program.brewin [-v N] [-i INPUT_FILE] [-s SOCKET]"
+VERSIONS = ("1", "2", "3")
+
+
+def parse_args(argv):
+    """
+    Returns (program path, version, input path or None, socket path or None); exits with status 2 on bad arguments.
+    """
+    program_path = None
+    version = "3"
+    input_path = None
+    socket_path = None
+    args = iter(argv)
+    for arg in args:
+        if arg in ("-h", "--help"):
+            sys.stdout.write(__doc__.lstrip())
+            sys.exit(0)
+        elif arg in ("-v", "--version", "-i", "--input", "-s", "--socket"):
+            value = next(args, None)
+            if value is None:
+                usage_error(f"{arg} needs a value")
+            if arg in ("-v", "--version"):
+                version = value
+            elif arg in ("-i", "--input"):
+                input_path = value
+            else:
+                socket_path = value
+        elif arg.startswith("-") and arg != "-":
+            usage_error(f"unknown option {arg}")
+        elif program_path is None:
+            program_path = arg
+        else:
+            usage_error(f"unexpected argument {arg}")
+    if program_path is None:
+        usage_error("no program given")
+    if version not in VERSIONS:
+        usage_error(f"unknown version {version} (choose from {', '.join(VERSIONS)})")
+    return program_path, version, input_path, socket_path
+
+
+def usage_error(message):
+    sys.stderr.write(f"{USAGE}\nbrewin: error: {message}\n")
+    sys.exit(2)
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as file:
+        return file.read().splitlines()
+
+
+# reads stdin in one go, but only once the first line is needed, so programs that don't read input don't wait for it
+def read_stdin_lines():
+    yield from sys.stdin.buffer.read().decode("utf-8").splitlines()
+
+
+def run_on_daemon(socket_path, source, version, inputs):
+    from daemonclient import Client
+
+    with Client(socket_path) as client:
+        response = client.run(source, list(inputs or []), version=int(version))
+    if response["status"] != "ok":
+        sys.stderr.write(f"brewin: {response['status']}: {response['message']}\n")
+        return 1
+    sys.stdout.write("".join(f"{line}\n" for line in response["output"]))
+    if response["error_message"] is not None:
+        sys.stderr.write(f"{response['error_message']}\n")
+        return 1
+    return 0
+
+
+def main(argv=None):
+    program_path, version, input_path, socket_path = parse_args(
+        sys.argv[1:] if argv is None else argv
+    )
+    source = read_lines(program_path)
+    if input_path is not None:
+        inputs = read_lines(input_path)
+    elif sys.stdin.isatty():
+        inputs = None
+    else:
+        inputs = read_stdin_lines()
+    if socket_path is not None:
+        return run_on_daemon(socket_path, source, version, inputs)
+
+    interpreter_module = importlib.import_module(f"interpreterv{version}")
+    from intio import BufferedOutputSink, LineInputProvider
+
+    interpreter = interpreter_module.Interpreter(
+        output_sink=BufferedOutputSink(sys.stdout.fileno()),
+        output_log_limit=0,
+        input_provider=None if inputs is None else LineInputProvider(inputs),
+    )
+    try:
+        interpreter.run(source)
+    except RuntimeError as err:
+        if interpreter.error_type is None:
+            raise  # not an error reported by the interpreter
+        sys.stderr.write(f"{err}\n")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
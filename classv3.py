@@ -61,6 +61,9 @@ class MethodDef:
             self.return_type = Type(method_source[1])
         self.formal_params = self.__parse_params(method_source[3])
         self.code = method_source[4]
+        # ids of the (return (call ...)) statements in tail position
+        self.tail_call_returns = set()
+        self.__find_tail_call_returns(self.code)
 
     def get_method_name(self):
         return self.method_name
@@ -75,6 +78,36 @@ class MethodDef:
     def get_code(self):
         return self.code
 
+    # a (return (call ...)) statement is in tail position unless it's nested inside the body of a try, since then
+    # an exception thrown by the callee would still have to be caught by this method
+    def __find_tail_call_returns(self, statement):
+        if type(statement) is not list or not statement:
+            return
+        tok = statement[0]
+        if tok == InterpreterBase.RETURN_DEF:
+            if (
+                len(statement) == 2
+                and type(statement[1]) is list
+                and statement[1]
+                and statement[1][0] == InterpreterBase.CALL_DEF
+            ):
+                self.tail_call_returns.add(id(statement))
+        elif tok == InterpreterBase.BEGIN_DEF:
+            for sub_statement in statement[1:]:
+                self.__find_tail_call_returns(sub_statement)
+        elif tok == InterpreterBase.LET_DEF:
+            for sub_statement in statement[2:]:
+                self.__find_tail_call_returns(sub_statement)
+        elif tok == InterpreterBase.IF_DEF:
+            for sub_statement in statement[2:]:
+                self.__find_tail_call_returns(sub_statement)
+        elif tok == InterpreterBase.WHILE_DEF:
+            for sub_statement in statement[2:]:
+                self.__find_tail_call_returns(sub_statement)
+        elif tok == InterpreterBase.TRY_DEF:
+            for sub_statement in statement[2:]:  # only the catch statement
+                self.__find_tail_call_returns(sub_statement)
+
     # input params in the form of [[type1 param1] [type2 param2] ...]
     # output is a set of VariableDefs
     def __parse_params(self, params):
@@ -90,10 +123,22 @@ class MethodDef:
 # v2 class definition: [class classname [inherits baseclassname] [field1] [field2] ... [method1] [method2] ...]
 # [] denotes optional syntax
 class ClassDef:
+    # statements a resumable run may suspend in, see may_suspend()
+    SUSPENDING_STATEMENTS = {
+        InterpreterBase.CALL_DEF,
+        InterpreterBase.WHILE_DEF,
+        InterpreterBase.INPUT_STRING_DEF,
+        InterpreterBase.INPUT_INT_DEF,
+    }
+
     def __init__(self, class_source, interpreter):
         self.interpreter = interpreter
         self.name = class_source[1]
         self.class_source = class_source
+        # maps the id of a statement/expression to whether it contains a call, see contains_call()
+        self.contains_call_cache = {}
+        # maps the id of a statement to whether a resumable run may suspend in it, see may_suspend()
+        self.may_suspend_cache = {}
         if self.__is_a_template_class(class_source):
             # don't process class at all now if it's a templated class
             return
@@ -132,10 +177,58 @@ class ClassDef:
     def get_superclass(self):
         return self.super_class
 
+    # returns True if the passed-in statement or expression (part of this class's source) contains a method call
+    # anywhere inside it. Code without calls can't re-enter Brewin methods, so the explicit-stack evaluator runs it
+    # with the plain recursive evaluator
+    def contains_call(self, code):
+        # ids are safe keys since our class source (and thus code) lives as long as we do
+        key = id(code)
+        result = self.contains_call_cache.get(key)
+        if result is None:
+            result = self.__contains_call_aux(code)
+            self.contains_call_cache[key] = result
+        return result
+
+    def __contains_call_aux(self, code):
+        if type(code) is not list:
+            return False
+        if code and code[0] == InterpreterBase.CALL_DEF:
+            return True
+        for item in code:
+            if type(item) is list and self.__contains_call_aux(item):
+                return True
+        return False
+
+    # returns True if the passed-in statement (part of this class's source) contains a method call, a while loop or
+    # an input statement anywhere inside it. A resumable run (see ResumableObjectDef) runs such code on its explicit
+    # stack, so that it can stop between two iterations of a loop or while it waits for input
+    def may_suspend(self, code):
+        key = id(code)
+        result = self.may_suspend_cache.get(key)
+        if result is None:
+            result = self.__may_suspend_aux(code)
+            self.may_suspend_cache[key] = result
+        return result
+
+    def __may_suspend_aux(self, code):
+        if type(code) is not list:
+            return False
+        if (
+            code
+            and type(code[0]) is not list
+            and code[0] in ClassDef.SUSPENDING_STATEMENTS
+        ):
+            return True
+        for item in code:
+            if type(item) is list and self.__may_suspend_aux(item):
+                return True
+        return False
+
     # private helper that checks if a class is tempalted based on raw input parsed list
     def __is_a_template_class(self, class_source):
         if class_source[0] == InterpreterBase.TEMPLATE_CLASS_DEF:
             self.template_types = class_source[2]
+            self.specializations = {}  # type signature -> specialized ClassDef
             return True
 
         self.template_types = None
@@ -146,8 +239,14 @@ class ClassDef:
         return self.template_types is not None
 
     # given a type signature like classname@int@bool@otherclassname specializes the class by creating an instance
-    # of the class with those types filled in (aka templating the class)
+    # of the class with those types filled in (aka templating the class). Specializations are cached, so each
+    # one is only built once per program
     def specialize_class(self, type_sig):
+        if type_sig not in self.specializations:
+            self.specializations[type_sig] = self.__build_specialization(type_sig)
+        return self.specializations[type_sig]
+
+    def __build_specialization(self, type_sig):
         types_to_use = type_sig.split(InterpreterBase.TYPE_CONCAT_CHAR)[
             1:
         ]  # classname:type1:type2 - take [type1, type2]
@@ -241,6 +340,7 @@ class ClassDef:
     def __create_method_list(self, class_body):
         self.methods = []
         self.method_map = {}
+        self.tail_call_returns = set()  # union of each method's tail_call_returns
         methods_defined_so_far = set()
         for member in class_body:
             if member[0] == InterpreterBase.METHOD_DEF:
@@ -254,6 +354,7 @@ class ClassDef:
                 self.__check_method_names_and_types(method_def)
                 self.methods.append(method_def)
                 self.method_map[method_def.method_name] = method_def
+                self.tail_call_returns |= method_def.tail_call_returns
                 methods_defined_so_far.add(method_def.method_name)
 
     # for a given method, make sure that the paramter types are valid, return type is valid, and param names
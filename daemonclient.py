@@ -0,0 +1,62 @@
+"""
+Module that contains the client of the interpreter daemon (see rundaemon.py).
+
+    with Client("/tmp/brewin.sock") as client:
+        response = client.run(source_lines, inputs=["5"], limits={"max_fuel": 100000})
+        print(response["output"], response["error_type"])
+
+Requests and responses are JSON objects, one per line, sent over a Unix domain socket; a connection can carry any
+number of requests, answered in order. A request holds
+- "program": the program source, as a list of lines or a single string
+- "inputs": list of input lines (optional)
+- "limits": keyword arguments of a limits.RunLimits, e.g. {"max_fuel": 100000} (optional, version 3 only)
+- "version": interpreter version, 1, 2 or 3 (optional, defaults to 3)
+- "id": any JSON value, echoed in the response (optional)
+
+A response holds the request's id and a status: "ok" if the program ran (even if it ended with an error),
+"timeout" or "memory_limit" if it exceeded the daemon's own limits, "bad_request" or "crash". For "ok" it also holds
+the output lines, the error type name, line and message (or nulls), the name of the RunLimits limit that was
+exceeded (or null) and the run's usage (see Interpreter.get_usage()); for the other statuses, a message.
+
+This module only imports what talking to the daemon takes, so that clients start quickly.
+"""
+
+import json
+import socket
+
+
+class Client:
+    """
+    A connection to the daemon listening on socket_path; timeout is in seconds per request (None waits forever).
+    """
+
+    def __init__(self, socket_path, timeout=None):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        self.socket.connect(socket_path)
+        self.reader = self.socket.makefile("rb")
+
+    def run(self, program, inputs=None, limits=None, version=3, request_id=None):
+        """Runs program (a list of lines or a string) on the daemon and returns its response, as a dict."""
+        request = {"program": program, "version": version}
+        if inputs is not None:
+            request["inputs"] = list(inputs)
+        if limits is not None:
+            request["limits"] = limits
+        if request_id is not None:
+            request["id"] = request_id
+        self.socket.sendall(json.dumps(request).encode() + b"\n")
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("the daemon closed the connection")
+        return json.loads(line)
+
+    def close(self):
+        self.reader.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,870 @@
+"""
+Differential testing: runs programs through every execution engine of every interpreter version that can run them
+and reports the programs on which the engines disagree, optionally shrinking each one to a minimal program that still
+shows the disagreement.
+
+usage: python difftest.py [PATH ...] [--random N] [--seed S] [--versions 1,2,3] [--engines NAME,...]
+                          [--timeout SECONDS] [--minimize] [--save-dir DIR] [-o report.jsonl]
+
+An engine is an interpreter version run in one configuration (see ENGINES); the engines of version 3 are the
+reference tree-walker, the explicit-stack evaluator, the instrumented code path, a compiled Program run twice, an
+asynchronous run (Interpreter.run_async()) that reads its input from an async source, a run time-sliced by a
+scheduler.Scheduler into slices of a few steps, and a run of an interpreter restored from a snapshot (see
+snapshot.py) taken after a first run.
+Engines agree if they produce the same output, the same ErrorType and the same error line (as returned by
+get_error_type_and_line()), and don't crash.
+
+Each PATH is a .brewin file (of the --versions' highest version unless it's named vN.brewin, with its input read from
+a .in file of the same name, if any) or a directory. A directory holding vN.brewin files is one case whose variants
+are the same program written for each version (like the folders of benchmarks/programs, whose input is in
+input.txt); variants of different versions must print the same output and end with the same ErrorType, but their
+error lines aren't compared. Other directories are searched for cases recursively.
+
+--random N adds N randomly generated well-typed programs (see random_program()). A random program that only uses
+version 2 features is run as a version 2 and a version 3 variant.
+
+The exit status is 1 if any case diverged.
+"""
+
+import argparse
+import asyncio
+import copy
+import importlib
+import json
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+
+from bparser import BParser
+from intio import LineInputProvider, QueueInputSource
+from scheduler import Scheduler
+import snapshot
+from worker import RunTimeout, time_limit
+
+VERSIONS = (1, 2, 3)
+
+# engine name -> (interpreter version, Interpreter options, how the program is run: by Interpreter.run(), by
+# Interpreter.run_async(), compiled and run twice, compiled and run by a Scheduler, or restored from a snapshot)
+ENGINES = {
+    "v1": (1, {}, "run"),
+    "v2": (2, {}, "run"),
+    "v3": (3, {}, "run"),
+    "v3-explicit-stack": (3, {"explicit_stack": True}, "run"),
+    "v3-instrumented": (3, {"collect_metrics": True}, "run"),
+    "v3-rerun": (3, {}, "rerun"),
+    "v3-async": (3, {}, "async"),
+    "v3-scheduled": (3, {}, "scheduled"),
+    "v3-snapshot": (3, {}, "snapshot"),
+}
+
+SCHEDULED_SLICE_STEPS = 7  # small, so that runs are suspended at many different points
+
+# the outcome of running a program on one engine: output is a tuple of lines, error is (ErrorType name, line) or
+# None, and crash describes any other exception (or a timeout), else None
+Outcome = namedtuple("Outcome", "output error crash")
+
+Case = namedtuple("Case", "name variants inputs")  # variants: {version: source lines}
+
+
+def run_engine(engine, source, inputs=(), timeout=None):
+    """Runs source on an engine (a key of ENGINES) and returns its Outcome."""
+    version, options, mode = ENGINES[engine]
+    module = importlib.import_module(f"interpreterv{version}")
+    interpreter = None
+    try:
+        with time_limit(timeout):
+            if mode in ("rerun", "scheduled"):
+                program = module.compile(source, **options)
+                if mode == "rerun":
+                    for _ in range(2):
+                        result = program.run(LineInputProvider(inputs))
+                else:
+                    scheduler = Scheduler(SCHEDULED_SLICE_STEPS)
+                    task = scheduler.submit(program, LineInputProvider(inputs))
+                    scheduler.run()
+                    result = task.result
+                error = None
+                if result.error_type is not None:
+                    error = (result.error_type.name, result.error_line)
+                return Outcome(tuple(result.output), error, None)
+            interpreter = module.Interpreter(
+                console_output=False,
+                input_provider=LineInputProvider(inputs),
+                **options,
+            )
+            if mode == "async":
+                asyncio.run(_run_async(interpreter, source, inputs))
+            elif mode == "snapshot":
+                interpreter = _restore_after_run(interpreter, source, inputs, options)
+                interpreter.run_main()
+            else:
+                interpreter.run(source)
+    except RunTimeout:
+        return Outcome(_output_of(interpreter), None, "timeout")
+    except RuntimeError as err:
+        if interpreter is None or interpreter.error_type is None:
+            return Outcome(_output_of(interpreter), None, f"RuntimeError: {err}")
+        error_type, error_line = interpreter.get_error_type_and_line()
+        return Outcome(_output_of(interpreter), (error_type.name, error_line), None)
+    except Exception as err:  # pylint: disable=broad-except
+        return Outcome(_output_of(interpreter), None, f"{type(err).__name__}: {err}")
+    return Outcome(_output_of(interpreter), None, None)
+
+
+async def _run_async(interpreter, source, inputs):
+    queue = asyncio.Queue()
+    for line in inputs:
+        queue.put_nowait(line)
+    queue.put_nowait(None)
+    await interpreter.run_async(source, QueueInputSource(queue))
+
+
+# runs source, snapshots the interpreter (including the objects the run left behind and the templates it
+# specialized) and returns the restored interpreter, reset for another run
+def _restore_after_run(interpreter, source, inputs, options):
+    interpreter.load(source)
+    try:
+        interpreter.run_main()
+    except RuntimeError:
+        pass  # the restored interpreter's run reports the same error
+    restored = snapshot.loads(
+        snapshot.dumps(interpreter),
+        console_output=False,
+        input_provider=LineInputProvider(inputs),
+        **options,
+    )
+    restored.reset()
+    return restored
+
+
+def _output_of(interpreter):
+    return tuple(interpreter.get_output()) if interpreter is not None else ()
+
+
+def engines_for(version, selected=None):
+    return [
+        name
+        for name, (engine_version, _, _) in ENGINES.items()
+        if engine_version == version and (selected is None or name in selected)
+    ]
+
+
+def run_case(case, selected_engines=None, timeout=None):
+    """Returns {engine name: Outcome} for each engine of each of the case's variants."""
+    outcomes = {}
+    for version, source in sorted(case.variants.items()):
+        for engine in engines_for(version, selected_engines):
+            outcomes[engine] = run_engine(engine, source, case.inputs, timeout)
+    return outcomes
+
+
+def partition(outcomes, compare_lines=True):
+    """Returns the groups of engine labels whose outcomes agree, as a frozenset of frozensets."""
+    groups = {}
+    for label, outcome in outcomes.items():
+        if not compare_lines and outcome.error is not None:
+            outcome = outcome._replace(error=(outcome.error[0], None))
+        groups.setdefault(outcome, set()).add(label)
+    return frozenset(frozenset(labels) for labels in groups.values())
+
+
+def divergence_signature(outcomes):
+    """
+    Returns {group of engine labels whose outcomes agree: (ErrorType name, crash exception name)} of the outcomes of
+    one program, which the minimizer keeps constant: it rejects a smaller program if it splits the engines differently,
+    or makes them end in a different kind of error.
+    """
+    signature = {}
+    for labels in partition(outcomes):
+        outcome = outcomes[min(labels)]
+        error_name = outcome.error[0] if outcome.error else None
+        crash_name = outcome.crash.split(":")[0] if outcome.crash else None
+        signature[labels] = (error_name, crash_name)
+    return signature
+
+
+def diverges(case, outcomes):
+    groups = partition(
+        outcomes, compare_lines=len(set(map(tuple, case.variants.values()))) == 1
+    )
+    return len(groups) > 1 or any(outcome.crash for outcome in outcomes.values())
+
+
+# Writing programs back out of their parse trees. Lists that hold statements or definitions are written over several
+# lines, so that errors in different statements are reported on different lines.
+
+_BLOCK_HEADS = {
+    "class",
+    "tclass",
+    "method",
+    "field",
+    "begin",
+    "if",
+    "while",
+    "let",
+    "try",
+    "print",
+    "set",
+    "return",
+    "throw",
+    "inputi",
+    "inputs",
+}
+
+
+def _is_block(node):
+    return (
+        isinstance(node, list)
+        and bool(node)
+        and isinstance(node[0], str)
+        and node[0] in _BLOCK_HEADS
+    )
+
+
+def _inline(node):
+    if isinstance(node, list):
+        return "(" + " ".join(_inline(child) for child in node) + ")"
+    return str(node)
+
+
+def _format(node, indent, lines):
+    if not any(_is_block(child) for child in node):
+        lines.append(indent + _inline(node))
+        return
+    first_block = next(i for i, child in enumerate(node) if _is_block(child))
+    lines.append(
+        indent + "(" + " ".join(_inline(child) for child in node[:first_block])
+    )
+    for child in node[first_block:]:
+        if isinstance(child, list):
+            _format(child, indent + "  ", lines)
+        else:
+            lines.append(indent + "  " + str(child))
+    lines[-1] += ")"
+
+
+def format_program(tree):
+    """Returns the source lines of a parsed program."""
+    lines = []
+    for node in tree:
+        if isinstance(node, list):
+            _format(node, "", lines)
+        else:
+            lines.append(str(node))
+    return lines
+
+
+# Minimization
+
+
+def _list_paths(node, path=()):
+    yield path
+    for i, child in enumerate(node):
+        if isinstance(child, list):
+            yield from _list_paths(child, path + (i,))
+
+
+def _node_at(tree, path):
+    for i in path:
+        tree = tree[i]
+    return tree
+
+
+def minimize(source, engines, inputs=(), timeout=None, max_tests=2000):
+    """
+    Shrinks source while the engines keep disagreeing (or all crashing) the same way, by deleting nodes of its parse
+    tree and replacing nodes with one of their children; see divergence_signature(). Returns the smallest program
+    found, as source lines.
+
+    Shrinking often creates endless loops, so each candidate run is limited to ten times the slowest run of the
+    original program (or timeout, if that's lower).
+    """
+    status, tree = BParser.parse(source)
+    if not status:
+        return source
+    tree = copy.deepcopy(tree)
+    start = time.perf_counter()
+    outcomes = {
+        engine: run_engine(engine, source, inputs, timeout) for engine in engines
+    }
+    target = divergence_signature(outcomes)
+    # like diverges(), engines that all crash the same way count as a divergence worth shrinking
+    if len(target) < 2 and not any(outcome.crash for outcome in outcomes.values()):
+        return source
+    candidate_timeout = max(0.1, 10 * (time.perf_counter() - start))
+    if timeout:
+        candidate_timeout = min(candidate_timeout, timeout)
+    tests = 0
+
+    def still_diverges():
+        nonlocal tests
+        tests += 1
+        lines = format_program(tree)
+        outcomes = {
+            engine: run_engine(engine, lines, inputs, candidate_timeout)
+            for engine in engines
+        }
+        return divergence_signature(outcomes) == target
+
+    progress = True
+    while progress and tests < max_tests:
+        progress = False
+        # in reverse preorder, a change to a node only moves nodes that were already visited
+        for path in reversed(list(_list_paths(tree))):
+            node = _node_at(tree, path)
+            for i in reversed(range(len(node))):
+                if tests >= max_tests or i >= len(node):
+                    continue
+                removed = node.pop(i)
+                if still_diverges():
+                    progress = True
+                else:
+                    node.insert(i, removed)
+            if not path or tests >= max_tests:
+                continue
+            parent = _node_at(tree, path[:-1])
+            for child in [child for child in node if isinstance(child, list)]:
+                if tests >= max_tests:
+                    break
+                parent[path[-1]] = child
+                if still_diverges():
+                    progress = True
+                    node = child
+                    break
+                parent[path[-1]] = node
+    return format_program(tree)
+
+
+# Random programs
+
+
+def random_program(rng, version=3):
+    """
+    Returns (source lines, input lines, whether the program uses version 3 features) of a random program that's
+    well-typed for version (in version 1, it only uses the version 1 language) and terminates: loops are bounded and
+    a method only calls methods created before it (see _RandomProgram).
+    """
+    generator = _RandomProgram(rng, version)
+    tree = generator.program()
+    return format_program(tree), generator.inputs, generator.uses_v3_features
+
+
+class _RandomProgram:
+    TYPES = ("int", "bool", "string")
+    STRINGS = ('"a"', '"bc"', '"x y"', '"z"')
+    MAX_EXPRESSION_DEPTH = 3
+    MAX_STATEMENT_DEPTH = 3
+
+    def __init__(self, rng, version):
+        self.rng = rng
+        self.version = version
+        self.typed = version >= 2
+        self.inputs = [str(rng.randint(0, 50)) for _ in range(rng.randint(0, 3))]
+        self.uses_v3_features = False
+        self.classes = []
+        self.next_rank = 0
+        self.next_loop = 0
+        # set while a method (or main) is generated
+        self.scope = None  # [(type, name, assignable)]
+        self.methods = None  # [(target expression, method)] that may be called
+        self.loop_fields = (
+            None  # version 1 only: the loop counter fields of the current class
+        )
+        self.return_type = None
+
+    def program(self):
+        for class_num in range(self.rng.randint(1, 3)):
+            self.classes.append(self.__declare_class(class_num))
+        if self.version >= 3 and self.rng.random() < 0.3:
+            self.uses_v3_features = True
+            box = self.__box_class()
+        else:
+            box = None
+        tree = [self.__define_class(class_info) for class_info in self.classes]
+        if box:
+            tree.append(box)
+        tree.append(self.__main_class(box is not None))
+        return tree
+
+    # class and method signatures
+
+    def __declare_class(self, class_num):
+        parent = None
+        if self.typed and self.classes and self.rng.random() < 0.5:
+            parent = self.rng.choice(self.classes)
+        fields = [
+            (self.rng.choice(self.TYPES), f"f{class_num}_{i}")
+            for i in range(self.rng.randint(1, 3))
+        ]
+        methods = []
+        if parent:
+            for method in self.__visible_methods(parent):
+                if self.rng.random() < 0.4:
+                    methods.append(dict(method, overrides=True))
+        for i in range(self.rng.randint(1, 3)):
+            params = [
+                (self.rng.choice(self.TYPES), f"p{j}")
+                for j in range(self.rng.randint(0, 2))
+            ]
+            methods.append(
+                {
+                    "name": f"m{class_num}_{i}",
+                    "return_type": self.rng.choice(self.TYPES + ("void",)),
+                    "params": params,
+                    "rank": self.next_rank,
+                    "overrides": False,
+                }
+            )
+            self.next_rank += 1
+        return {
+            "name": f"c{class_num}",
+            "parent": parent,
+            "fields": fields,
+            "methods": methods,
+        }
+
+    def __visible_methods(self, class_info):
+        methods = {}
+        while class_info:
+            for method in class_info["methods"]:
+                methods.setdefault(method["name"], method)
+            class_info = class_info["parent"]
+        return list(methods.values())
+
+    def __subclasses(self, class_info):
+        subclasses = []
+        for other in self.classes:
+            ancestor = other
+            while ancestor and ancestor is not class_info:
+                ancestor = ancestor["parent"]
+            if ancestor:
+                subclasses.append(other)
+        return subclasses
+
+    # definitions
+
+    def __define_class(self, class_info):
+        node = ["class", class_info["name"]]
+        if class_info["parent"]:
+            node += ["inherits", class_info["parent"]["name"]]
+        self.loop_fields = []
+        methods = [
+            self.__define_method(class_info, method) for method in class_info["methods"]
+        ]
+        fields = [
+            self.__field(field_type, name, self.__constant(field_type))
+            for field_type, name in class_info["fields"]
+        ]
+        fields += [self.__field("int", name, "0") for name in self.loop_fields]
+        return node + fields + methods
+
+    def __field(self, field_type, name, value):
+        if self.typed:
+            return ["field", field_type, name, value]
+        return ["field", name, value]
+
+    def __define_method(self, class_info, method):
+        self.scope = [(t, name, True) for t, name in class_info["fields"]]
+        self.scope += [(t, name, True) for t, name in method["params"]]
+        self.methods = [
+            ("me", other)
+            for other in self.__visible_methods(class_info)
+            if other["rank"] < method["rank"]
+        ]
+        if method["overrides"] and self.rng.random() < 0.5:
+            self.methods.append(("super", method))
+        self.return_type = method["return_type"]
+        statements = [self.__statement(1) for _ in range(self.rng.randint(1, 3))]
+        if method["return_type"] != "void":
+            statements.append(["return", self.__expression(method["return_type"])])
+        params = [self.__param(t, name) for t, name in method["params"]]
+        body = ["begin"] + statements
+        if self.typed:
+            return ["method", method["return_type"], method["name"], params, body]
+        return ["method", method["name"], params, body]
+
+    def __param(self, param_type, name):
+        return [param_type, name] if self.typed else name
+
+    def __box_class(self):
+        return [
+            "tclass",
+            "box",
+            ["T"],
+            ["field", "T", "value"],
+            ["method", "void", "put", [["T", "v"]], ["set", "value", "v"]],
+            ["method", "T", "get", [], ["return", "value"]],
+        ]
+
+    def __main_class(self, use_box):
+        self.loop_fields = []
+        self.return_type = "void"
+        objects = []
+        setup = []
+        for num, class_info in enumerate(self.classes):
+            name = f"o{num}"
+            objects.append((class_info["name"], name))
+            created = self.rng.choice(self.__subclasses(class_info))
+            setup.append(["set", name, ["new", created["name"]]])
+        self.methods = [
+            (name, method)
+            for (_, name), class_info in zip(objects, self.classes)
+            for method in self.__visible_methods(class_info)
+        ]
+        variables = [("int", f"in{i}") for i in range(len(self.inputs))]
+        variables += [(t, f"v{i}") for i, t in enumerate(self.TYPES)]
+        self.scope = [(t, name, True) for t, name in variables]
+        setup += [["inputi", name] for _, name in variables[: len(self.inputs)]]
+        if use_box:
+            setup += [
+                ["set", "b", ["new", "box@int"]],
+                ["call", "b", "put", self.__expression("int")],
+            ]
+            self.methods.append(
+                ("b", {"name": "get", "return_type": "int", "params": []})
+            )
+        statements = setup + [
+            self.__statement(1) for _ in range(self.rng.randint(2, 6))
+        ]
+        if self.typed and self.rng.random() < 0.1:
+            # a call through a null reference, which must be a FAULT_ERROR on the same line everywhere
+            objects.append((self.classes[0]["name"], "nothing_here"))
+            method = self.classes[0]["methods"][0]
+            args = [self.__expression(t) for t, _ in method["params"]]
+            statements.append(["call", "nothing_here", method["name"]] + args)
+        if self.typed:
+            definitions = [[t, name, self.__constant(t)] for t, name in variables]
+            definitions += [[t, name, "null"] for t, name in objects]
+            if use_box:
+                definitions.append(["box@int", "b", "null"])
+            body = ["let", definitions] + statements
+            return ["class", "main", ["method", "void", "main", [], body]]
+        fields = [["field", name, self.__constant(t)] for t, name in variables]
+        fields += [["field", name, "null"] for _, name in objects]
+        fields += [["field", name, "0"] for name in self.loop_fields]
+        return (
+            ["class", "main"]
+            + fields
+            + [["method", "main", [], ["begin"] + statements]]
+        )
+
+    # statements and expressions
+
+    def __statement(self, depth):
+        choices = ["print", "set", "call"]
+        if depth < self.MAX_STATEMENT_DEPTH:
+            choices += ["if", "while", "begin"]
+            if self.typed:
+                choices.append("let")
+            if self.version >= 3:
+                choices.append("try")
+        if self.return_type is not None:
+            choices.append("return")
+        kind = self.rng.choice(choices)
+        if kind == "set":
+            targets = [(t, name) for t, name, assignable in self.scope if assignable]
+            if targets:
+                var_type, name = self.rng.choice(targets)
+                return ["set", name, self.__expression(var_type)]
+            kind = "print"
+        if kind == "call":
+            call = self.__call(None)
+            if call:
+                return call
+            kind = "print"
+        if kind == "return":
+            if self.rng.random() > 0.2:
+                return self.__statement(depth)
+            if self.return_type == "void":
+                return ["return"]
+            return ["return", self.__expression(self.return_type)]
+        if kind == "print":
+            return ["print"] + [
+                self.__expression(self.rng.choice(self.TYPES))
+                for _ in range(self.rng.randint(1, 2))
+            ]
+        if kind == "if":
+            node = ["if", self.__expression("bool"), self.__statement(depth + 1)]
+            if self.rng.random() < 0.5:
+                node.append(self.__statement(depth + 1))
+            return node
+        if kind == "begin":
+            return ["begin"] + [
+                self.__statement(depth + 1) for _ in range(self.rng.randint(1, 3))
+            ]
+        if kind == "while":
+            return self.__while(depth)
+        if kind == "let":
+            return self.__let(depth)
+        return self.__try(depth)
+
+    def __while(self, depth):
+        counter = f"w{self.next_loop}"
+        self.next_loop += 1
+        body = ["begin"] + [
+            self.__statement(depth + 1) for _ in range(self.rng.randint(1, 2))
+        ]
+        body.append(["set", counter, ["+", counter, "1"]])
+        loop = ["while", ["<", counter, str(self.rng.randint(0, 4))], body]
+        if self.typed:
+            return ["let", [["int", counter, "0"]], loop]
+        self.loop_fields.append(counter)
+        return ["begin", ["set", counter, "0"], loop]
+
+    def __let(self, depth):
+        definitions = []
+        for _ in range(self.rng.randint(1, 2)):
+            var_type = self.rng.choice(self.TYPES)
+            definitions.append(
+                [
+                    var_type,
+                    f"l{len(self.scope)}_{len(definitions)}",
+                    self.__constant(var_type),
+                ]
+            )
+        scope = self.scope
+        self.scope = scope + [(t, name, True) for t, name, _ in definitions]
+        statements = [
+            self.__statement(depth + 1) for _ in range(self.rng.randint(1, 3))
+        ]
+        self.scope = scope
+        return ["let", definitions] + statements
+
+    def __try(self, depth):
+        self.uses_v3_features = True
+        body = ["begin", self.__statement(depth + 1)]
+        if self.rng.random() < 0.6:
+            throw = ["throw", self.__expression("string")]
+            if self.rng.random() < 0.5:
+                throw = ["if", self.__expression("bool"), throw]
+            body.append(throw)
+        body.append(self.__statement(depth + 1))
+        return ["try", body, ["print", "exception"]]
+
+    def __call(self, return_type, depth=1):
+        candidates = [
+            (target, method)
+            for target, method in self.methods
+            if return_type is None or method["return_type"] == return_type
+        ]
+        if not candidates:
+            return None
+        target, method = self.rng.choice(candidates)
+        args = [self.__expression(t, depth + 1) for t, _ in method["params"]]
+        return ["call", target, method["name"]] + args
+
+    def __constant(self, value_type):
+        if value_type == "int":
+            return str(self.rng.randint(0, 20))
+        if value_type == "bool":
+            return self.rng.choice(("true", "false"))
+        return self.rng.choice(self.STRINGS)
+
+    def __expression(self, value_type, depth=1):
+        variables = [name for t, name, _ in self.scope if t == value_type]
+        if depth >= self.MAX_EXPRESSION_DEPTH or self.rng.random() < 0.3:
+            if variables and self.rng.random() < 0.6:
+                return self.rng.choice(variables)
+            return self.__constant(value_type)
+        if self.rng.random() < 0.15:
+            call = self.__call(value_type, depth)
+            if call:
+                return call
+        if value_type == "int":
+            operator = self.rng.choice(("+", "-", "*", "%", "/"))
+            if operator in ("%", "/"):
+                return [
+                    operator,
+                    self.__expression("int", depth + 1),
+                    str(self.rng.randint(1, 9)),
+                ]
+            return [
+                operator,
+                self.__expression("int", depth + 1),
+                self.__expression("int", depth + 1),
+            ]
+        if value_type == "string":
+            return [
+                "+",
+                self.__expression("string", depth + 1),
+                self.__expression("string", depth + 1),
+            ]
+        kind = self.rng.choice(("compare", "equal", "not", "logic"))
+        if kind == "compare":
+            operator = self.rng.choice(("<", "<=", ">", ">=", "==", "!="))
+            return [
+                operator,
+                self.__expression("int", depth + 1),
+                self.__expression("int", depth + 1),
+            ]
+        if kind == "equal":
+            operand_type = self.rng.choice(("string", "bool"))
+            operator = self.rng.choice(("==", "!="))
+            return [
+                operator,
+                self.__expression(operand_type, depth + 1),
+                self.__expression(operand_type, depth + 1),
+            ]
+        if kind == "not":
+            return ["!", self.__expression("bool", depth + 1)]
+        operator = self.rng.choice(("&", "|"))
+        return [
+            operator,
+            self.__expression("bool", depth + 1),
+            self.__expression("bool", depth + 1),
+        ]
+
+
+def random_case(rng, versions, num):
+    version = rng.choice(sorted(versions))
+    source, inputs, uses_v3_features = random_program(rng, version)
+    variants = {version: source}
+    if version >= 2 and not uses_v3_features:
+        variants = {v: source for v in (2, 3) if v in versions}
+    return Case(f"random{num}", variants, inputs)
+
+
+# Corpora
+
+
+def load_corpus(paths, default_version=3):
+    """Yields the Cases found in paths (see the module docstring)."""
+    for path in paths:
+        if os.path.isdir(path):
+            variants = {}
+            for version in VERSIONS:
+                variant_path = os.path.join(path, f"v{version}.brewin")
+                if os.path.exists(variant_path):
+                    variants[version] = _read_lines(variant_path)
+            if variants:
+                input_path = os.path.join(path, "input.txt")
+                inputs = _read_lines(input_path) if os.path.exists(input_path) else []
+                yield Case(os.path.normpath(path), variants, inputs)
+                continue
+            for name in sorted(os.listdir(path)):
+                child = os.path.join(path, name)
+                if os.path.isdir(child) or name.endswith(".brewin"):
+                    yield from load_corpus([child], default_version)
+        else:
+            stem, _ = os.path.splitext(path)
+            version = default_version
+            name = os.path.basename(stem)
+            if len(name) == 2 and name[0] == "v" and name[1].isdigit():
+                version = int(name[1])
+            input_path = stem + ".in"
+            inputs = _read_lines(input_path) if os.path.exists(input_path) else []
+            yield Case(path, {version: _read_lines(path)}, inputs)
+
+
+def _read_lines(path):
+    with open(path) as file:
+        return file.read().splitlines()
+
+
+def describe(outcome):
+    text = f"{len(outcome.output)} lines of output"
+    if outcome.output:
+        text += f" ending {outcome.output[-1]!r}"
+    if outcome.error:
+        text += f", {outcome.error[0]} on line {outcome.error[1]}"
+    if outcome.crash:
+        text += f", crashed: {outcome.crash}"
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Differential testing of the Brewin interpreters."
+    )
+    parser.add_argument("paths", nargs="*", help=".brewin files or directories")
+    parser.add_argument(
+        "--random", type=int, default=0, help="number of random programs"
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--versions", default="1,2,3", help="comma-separated versions")
+    parser.add_argument("--engines", default=None, help="comma-separated engine names")
+    parser.add_argument("--timeout", type=float, default=5.0, help="seconds per run")
+    parser.add_argument(
+        "--minimize", action="store_true", help="shrink diverging programs"
+    )
+    parser.add_argument(
+        "--save-dir", help="write diverging (and minimized) programs here"
+    )
+    parser.add_argument(
+        "-o", "--output", help="write a JSON Lines report of the divergences here"
+    )
+    args = parser.parse_args()
+
+    versions = {int(version) for version in args.versions.split(",")}
+    selected = set(args.engines.split(",")) if args.engines else None
+    seed = args.seed if args.seed is not None else random.randrange(1 << 32)
+    rng = random.Random(seed)
+
+    cases = [
+        case._replace(
+            variants={v: s for v, s in case.variants.items() if v in versions}
+        )
+        for case in load_corpus(args.paths, max(versions))
+    ]
+    cases += [random_case(rng, versions, num) for num in range(args.random)]
+
+    report = open(args.output, "w") if args.output else None
+    divergent = 0
+    try:
+        for case in cases:
+            if not case.variants:
+                continue
+            outcomes = run_case(case, selected, args.timeout)
+            if not diverges(case, outcomes):
+                continue
+            divergent += 1
+            print(f"DIVERGENCE {case.name}")
+            for labels in sorted(partition(outcomes), key=sorted):
+                outcome = outcomes[min(labels)]
+                print(f"  {', '.join(sorted(labels))}: {describe(outcome)}")
+            entry = {
+                "case": case.name,
+                "inputs": case.inputs,
+                "outcomes": {
+                    label: outcome._asdict() for label, outcome in outcomes.items()
+                },
+            }
+            sources = {tuple(source) for source in case.variants.values()}
+            if args.minimize and len(sources) == 1:
+                minimized = minimize(
+                    list(sources.pop()), list(outcomes), case.inputs, args.timeout
+                )
+                entry["minimized"] = minimized
+                print("  minimized:")
+                for line in minimized:
+                    print(f"    {line}")
+            if args.save_dir:
+                _save(args.save_dir, case, entry.get("minimized"))
+            if report:
+                report.write(json.dumps(entry) + "\n")
+    finally:
+        if report:
+            report.close()
+    print(f"{len(cases)} cases (seed {seed}), {divergent} diverged", file=sys.stderr)
+    if divergent:
+        sys.exit(1)
+
+
+def _save(save_dir, case, minimized):
+    os.makedirs(save_dir, exist_ok=True)
+    name = os.path.basename(os.path.normpath(case.name))
+    for version, source in case.variants.items():
+        with open(os.path.join(save_dir, f"{name}.v{version}.brewin"), "w") as file:
+            file.write("\n".join(source) + "\n")
+    if case.inputs:
+        with open(os.path.join(save_dir, f"{name}.in"), "w") as file:
+            file.write("\n".join(case.inputs) + "\n")
+    if minimized:
+        with open(os.path.join(save_dir, f"{name}.min.brewin"), "w") as file:
+            file.write("\n".join(minimized) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Explicit-stack evaluation for v3.
+
+The default tree-walking evaluator in objectv3.py recurses in Python for every nested statement, expression and
+method call, so each level of Brewin recursion costs several Python frames and deep Brewin recursion runs into
+Python's recursion limit. When an Interpreter is created with explicit_stack=True, ObjectDef instead hands out
+generators for statements/expressions/calls that may run Brewin methods, and the EvalStack below drives them,
+keeping the pending Brewin frames on a heap-allocated list. Python stack usage is then bounded by the nesting depth
+of the program source, not by the Brewin call depth.
+
+Protocol between ObjectDef and EvalStack: a frame (generator) yields either
+- another generator: a sub-computation; it is pushed, run to completion, and its return value is sent back, or
+- any other object: an already-computed result, which is sent straight back.
+
+A resumable run (see ResumableObjectDef) is driven by run_steps() instead of run(), a bounded number of steps at a
+time, so that whoever drives it can do something else between two calls. Its frames may also yield an InputRequest,
+which run_steps() returns: the driver fetches the input however it likes and hands it over with send_input().
+"""
+
+from types import GeneratorType
+
+
+class InputRequest:
+    """
+    Yielded by a frame of a resumable run that executes an input statement. The driver sends the input back: a str
+    (or None once the input is exhausted) if get_string is set, an int otherwise.
+    """
+
+    def __init__(self, get_string):
+        self.get_string = get_string
+
+
+INPUT_STRING_REQUEST = InputRequest(True)
+INPUT_INT_REQUEST = InputRequest(False)
+
+
+class EvalStack:
+    # call depth limit of explicit-stack and resumable runs whose limits don't set one: nothing else stops their
+    # stack from growing until the process runs out of memory (see Interpreter.run_main())
+    DEFAULT_MAX_CALL_DEPTH = 200000
+
+    # what run_steps() returns when it stops without the run having ended or asked for input
+    PAUSED = "paused"
+    DONE = "done"
+
+    def __init__(self):
+        self.frames = []  # pending generators; the last one is running
+        self.result = None  # return value of the bottom-most frame, once run() finishes
+        self.value = None  # what run_steps() sends to the running frame when it resumes
+        self.steps = 0  # steps taken by run_steps() so far
+
+    # push the generator for the bottom-most computation (e.g., the call to main)
+    def push(self, frame):
+        self.frames.append(frame)
+
+    # run frames until the stack is empty; returns (and stores in self.result) the bottom frame's return value
+    def run(self):
+        frames = self.frames
+        value = None
+        try:
+            while frames:
+                try:
+                    request = frames[-1].send(value)
+                except StopIteration as finished:
+                    frames.pop()
+                    value = finished.value
+                    continue
+                if type(request) is GeneratorType:
+                    frames.append(request)
+                    value = None
+                else:
+                    value = request
+        except BaseException:
+            # an error aborts the whole program; drop the remaining frames
+            frames.clear()
+            raise
+        self.result = value
+        return value
+
+    # runs at most max_steps steps (a step resumes one frame); returns DONE once the stack is empty (the bottom
+    # frame's return value is then in self.result), the InputRequest of a frame that needs input (answer it with
+    # send_input() before the next call), or PAUSED
+    def run_steps(self, max_steps):
+        frames = self.frames
+        value = self.value
+        steps = 0
+        try:
+            while steps < max_steps:
+                steps += 1
+                try:
+                    request = frames[-1].send(value)
+                except StopIteration as finished:
+                    frames.pop()
+                    value = finished.value
+                    if not frames:
+                        self.result = value
+                        return EvalStack.DONE
+                    continue
+                if type(request) is GeneratorType:
+                    frames.append(request)
+                    value = None
+                elif type(request) is InputRequest:
+                    value = None
+                    return request
+                else:
+                    value = request
+        except BaseException:
+            frames.clear()
+            raise
+        finally:
+            self.value = value
+            self.steps += steps
+        return EvalStack.PAUSED
+
+    # hands the input asked for by the InputRequest that run_steps() returned to the frame that asked for it
+    def send_input(self, value):
+        self.value = value
@@ -0,0 +1,107 @@
+"""
+Runs one Brewin program over many input vectors by loading it once and forking copy-on-write workers.
+
+usage: python fanout.py program.brewin inputs.jsonl [-j WORKERS] [--version N]
+
+Each line of the inputs file is a JSON list of input lines for one run. The results are written to stdout as
+JSON Lines, in input order, each holding the run's output, its error type name and line (or nulls), and a crash
+message if the run raised an exception other than an error reported by the interpreter (or null). Runs never read
+from the keyboard: as with rundaemon.py, an (inputs ...) past the end of a run's inputs gets None, and an
+(inputi ...) ends the run with an EOFError crash.
+
+The parent process parses the program, builds its classes and (for v3) specializes its templated classes, then
+forks the workers, so each run only pays for executing main. Requires the "fork" start method (Linux/macOS).
+"""
+
+import argparse
+import gc
+import importlib
+import json
+import multiprocessing
+import os
+import sys
+from collections import namedtuple
+
+from intio import LineInputProvider
+
+# what fan_out() returns for a run that raised an unexpected exception (e.g., a RecursionError), instead of its
+# RunResult; message is the exception's type name and message
+RunCrash = namedtuple("RunCrash", "message")
+
+# the program shared with forked workers; set in the parent right before forking
+_program = None
+_input_sets = None
+
+
+def _run_input(index):
+    try:
+        return _program.run(LineInputProvider(_input_sets[index]))
+    except Exception as err:  # pylint: disable=broad-except
+        return RunCrash(f"{type(err).__name__}: {err}")
+
+
+def fan_out(program_source, input_sets, version=3, workers=None, **options):
+    """
+    Runs program_source (a list of lines) once per entry of input_sets (each a list of input lines) and returns
+    the list of RunResults (or RunCrashes), in the same order as input_sets. options are passed on to the
+    Interpreter.
+    """
+    global _program, _input_sets
+    interpreter_module = importlib.import_module(f"interpreterv{version}")
+    program = interpreter_module.compile(program_source, **options)
+    if hasattr(program.interpreter, "specialize_templates"):
+        program.interpreter.specialize_templates()
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(input_sets) // (workers * 8))
+    _program = program
+    _input_sets = input_sets
+    # move everything allocated so far out of the GC's reach, so collections in the workers don't write to (and
+    # thereby copy) the pages holding the shared program
+    gc.freeze()
+    try:
+        context = multiprocessing.get_context("fork")
+        with context.Pool(workers) as pool:
+            return pool.map(_run_input, range(len(input_sets)), chunksize)
+    finally:
+        gc.unfreeze()
+        _program = None
+        _input_sets = None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run one Brewin program over many inputs."
+    )
+    parser.add_argument("program", help="Brewin source file")
+    parser.add_argument("inputs", help="JSON Lines file, one list of inputs per line")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--version", type=int, default=3, choices=(1, 2, 3))
+    args = parser.parse_args()
+
+    with open(args.program) as file:
+        source = file.read().split("\n")
+    with open(args.inputs) as file:
+        input_sets = [json.loads(line) for line in file if line.strip()]
+    results = fan_out(source, input_sets, args.version, args.workers)
+    for result in results:
+        if isinstance(result, RunCrash):
+            record = {
+                "output": None,
+                "error_type": None,
+                "error_line": None,
+                "crash": result.message,
+            }
+        else:
+            error_type = result.error_type.name if result.error_type else None
+            record = {
+                "output": result.output,
+                "error_type": error_type,
+                "error_line": result.error_line,
+                "crash": None,
+            }
+        sys.stdout.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
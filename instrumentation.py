@@ -0,0 +1,159 @@
+"""
+Module that contains the instrumentation API of the version 3 interpreter.
+
+An Instrumentation receives structured events as a program runs. Subclass it, override the events you need, and pass
+instances to the interpreter:
+
+    class AllocationCounter(Instrumentation):
+        def __init__(self):
+            self.count = 0
+
+        def allocate(self, obj, line_num):
+            self.count += 1
+
+    counter = AllocationCounter()
+    interpreterv3.Interpreter(instrumentation=[counter]).run(program)
+
+The interpreter picks its code path when a run starts: with no instrumentation it creates plain ObjectDefs, whose
+only instrumentation check is whether a method call was passed any hooks; otherwise it creates
+InstrumentedObjectDefs, which call the hooks (and pass them to each method call), and reports output events itself.
+Each event is only dispatched to the instruments that override it.
+
+In every event, obj is the object part (see ObjectDef.anchor_object) running the code; line numbers are reported the
+same way the interpreter reports them in errors.
+"""
+
+from intbase import InterpreterBase
+
+EVENTS = (
+    "statement",
+    "expression",
+    "method_lookup",
+    "type_check",
+    "method_enter",
+    "method_exit",
+    "allocate",
+    "throw",
+    "catch",
+    "output",
+)
+
+
+class Instrumentation:
+    """
+    Base class for instrumentation; every event is ignored unless overridden.
+    """
+
+    def statement(self, obj, code):
+        """A statement (a parsed list whose first token holds the line_num) is about to run."""
+
+    def expression(self, obj, expr):
+        """An expression node (a constant, a variable name or a parsed list) is about to be evaluated."""
+
+    def method_lookup(self, obj, method_name, steps):
+        """A method was looked up, following steps links of the superclass chain (see ObjectDef.super_object)."""
+
+    def type_check(self, typea, typeb, for_assignment):
+        """Interpreter.check_type_compatibility() was called."""
+
+    def method_enter(self, obj, method_def, env, line_num_of_caller):
+        """A method starts running; env holds its parameters."""
+
+    def method_exit(self, obj, method_def, status):
+        """
+        A method finished with the status of its top-level statement (an ObjectDef.STATUS_* constant).
+        STATUS_TAIL_CALL means the method ended in an eliminated tail call, whose method_enter comes next.
+        """
+
+    def allocate(self, obj, line_num):
+        """A new object was created by (new ...), or the main object was created (line_num is None)."""
+
+    def throw(self, obj, exception, line_num):
+        """A (throw ...) statement threw exception, a string Value."""
+
+    def catch(self, obj, exception):
+        """A try statement caught exception and is about to run its catch statement."""
+
+    def output(self, text):
+        """A (print ...) statement printed text."""
+
+
+class StatementPrinter(Instrumentation):
+    """
+    Prints each statement before it runs; this is what the interpreter's trace_output option does.
+    """
+
+    def statement(self, obj, code):
+        print(f"{code[0].line_num}: {code}")
+
+
+class PerformanceCounters(Instrumentation):
+    """
+    Counts the work a run does; this is what the interpreter's collect_metrics option uses. Unlike timings, the
+    counts are deterministic, so they can be compared across runs and versions of the interpreter.
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.expressions = 0
+        self.method_calls = 0
+        self.superclass_steps = 0
+        self.type_checks = 0
+        self.environment_scopes = 0  # method calls, let blocks and catch blocks
+        self.allocations = {}  # class name -> objects created
+
+    def statement(self, obj, code):
+        self.statements += 1
+        if code[0] == InterpreterBase.LET_DEF:
+            self.environment_scopes += 1
+
+    def expression(self, obj, expr):
+        self.expressions += 1
+
+    def method_lookup(self, obj, method_name, steps):
+        self.superclass_steps += steps
+
+    def type_check(self, typea, typeb, for_assignment):
+        self.type_checks += 1
+
+    def method_enter(self, obj, method_def, env, line_num_of_caller):
+        self.method_calls += 1
+        self.environment_scopes += 1
+
+    def allocate(self, obj, line_num):
+        class_name = obj.class_def.name
+        self.allocations[class_name] = self.allocations.get(class_name, 0) + 1
+
+    def catch(self, obj, exception):
+        self.environment_scopes += 1
+
+    def as_dict(self):
+        return {
+            "statements": self.statements,
+            "expressions": self.expressions,
+            "method_calls": self.method_calls,
+            "superclass_steps": self.superclass_steps,
+            "type_checks": self.type_checks,
+            "environment_scopes": self.environment_scopes,
+            "allocations": dict(self.allocations),
+        }
+
+
+class Hooks:
+    """
+    The hooks of a list of instruments, grouped by event: each attribute named after an event is the list of the
+    bound methods that handle it.
+    """
+
+    def __init__(self, instruments):
+        for event in EVENTS:
+            default = getattr(Instrumentation, event)
+            setattr(
+                self,
+                event,
+                [
+                    getattr(instrument, event)
+                    for instrument in instruments
+                    if getattr(type(instrument), event) is not default
+                ],
+            )
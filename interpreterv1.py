@@ -5,17 +5,28 @@ delegating functionality to various modules.
 
 from classv1 import ClassDef
 from intbase import InterpreterBase, ErrorType
+from intio import InterpreterIO
 from bparser import BParser
 from objectv1 import ObjectDef
+from program import Program
 
 
-class Interpreter(InterpreterBase):
+class Interpreter(InterpreterIO, InterpreterBase):
     """
     Main interpreter class that subclasses InterpreterBase.
     """
 
-    def __init__(self, console_output=True, inp=None, trace_output=False):
+    def __init__(
+        self,
+        console_output=True,
+        inp=None,
+        trace_output=False,
+        output_sink=None,
+        output_log_limit=None,
+        input_provider=None,
+    ):
         super().__init__(console_output, inp)
+        self.init_io(output_sink, output_log_limit, input_provider)
         self.trace_output = trace_output
         self.main_object = None
         self.class_index = {}
@@ -25,6 +36,14 @@ class Interpreter(InterpreterBase):
         Run a program (an array of strings, where each item is a line of source code).
         Delegates parsing to the provided BParser class in bparser.py.
         """
+        self.load(program)
+        self.run_main()
+
+    def load(self, program):
+        """
+        Parse a program and build its class definitions. A loaded program can then be run
+        (any number of times) with run_main().
+        """
         status, parsed_program = BParser.parse(program)
         if not status:
             super().error(
@@ -32,6 +51,10 @@ class Interpreter(InterpreterBase):
             )
         self.__map_class_names_to_class_defs(parsed_program)
 
+    def run_main(self):
+        """
+        Run the loaded program: instantiate the main class and call its main method.
+        """
         # instantiate main class
         invalid_line_num_of_caller = None
         self.main_object = self.instantiate(
@@ -39,12 +62,34 @@ class Interpreter(InterpreterBase):
         )
 
         # call main function in main class; return value is ignored from main
-        self.main_object.call_method(
-            InterpreterBase.MAIN_FUNC_DEF, [], invalid_line_num_of_caller
-        )
+        try:
+            self.main_object.call_method(
+                InterpreterBase.MAIN_FUNC_DEF, [], invalid_line_num_of_caller
+            )
+        finally:
+            self.flush_output()
 
         # program terminates!
 
+    def reset(self):
+        """
+        "Reset" I/O and the objects created by the previous run; the loaded program is kept.
+        """
+        super().reset()
+        self.main_object = None
+
+    def get_metrics(self):
+        """
+        Get the performance counters of the last run; this interpreter doesn't collect any, so always None.
+        """
+        return None
+
+    def get_usage(self):
+        """
+        Get the resources consumed by the last run; this interpreter doesn't account for them, so always None.
+        """
+        return None
+
     def instantiate(self, class_name, line_num_of_statement):
         """
         Instantiate a new class. The line number is necessary to properly generate an error
@@ -74,3 +119,13 @@ class Interpreter(InterpreterBase):
                         item[0].line_num,
                     )
                 self.class_index[item[1]] = ClassDef(item, self)
+
+
+def compile(program, **options):  # pylint: disable=redefined-builtin
+    """
+    Parse and load a program once, returning a Program that can be run many times.
+    Options are passed on to the Interpreter.
+    """
+    interpreter = Interpreter(console_output=False, **options)
+    interpreter.load(program)
+    return Program(interpreter)
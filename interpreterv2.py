@@ -1,20 +1,37 @@
 from classv2 import ClassDef
 from intbase import InterpreterBase, ErrorType
+from intio import InterpreterIO
 from bparser import BParser
 from objectv2 import ObjectDef
+from program import Program
 from type_valuev2 import TypeManager
 
 # need to document that each class has at least one method guaranteed
 
 # Main interpreter class
-class Interpreter(InterpreterBase):
-    def __init__(self, console_output=True, inp=None, trace_output=False):
+class Interpreter(InterpreterIO, InterpreterBase):
+    def __init__(
+        self,
+        console_output=True,
+        inp=None,
+        trace_output=False,
+        output_sink=None,
+        output_log_limit=None,
+        input_provider=None,
+    ):
         super().__init__(console_output, inp)
+        self.init_io(output_sink, output_log_limit, input_provider)
         self.trace_output = trace_output
 
     # run a program, provided in an array of strings, one string per line of source code
     # usese the provided BParser class found in parser.py to parse the program into lists
     def run(self, program):
+        self.load(program)
+        self.run_main()
+
+    # parses the program and builds its type and class metadata; a loaded program can then be run (any number of
+    # times) with run_main()
+    def load(self, program):
         status, parsed_program = BParser.parse(program)
         if not status:
             super().error(
@@ -23,6 +40,8 @@ class Interpreter(InterpreterBase):
         self.__add_all_class_types_to_type_manager(parsed_program)
         self.__map_class_names_to_class_defs(parsed_program)
 
+    # runs the loaded program: creates the main object and calls its main method
+    def run_main(self):
         # instantiate main class
         invalid_line_num_of_caller = None
         self.main_object = self.instantiate(
@@ -30,12 +49,28 @@ class Interpreter(InterpreterBase):
         )
 
         # call main function in main class; return value is ignored from main
-        self.main_object.call_method(
-            InterpreterBase.MAIN_FUNC_DEF, [], False, invalid_line_num_of_caller
-        )
+        try:
+            self.main_object.call_method(
+                InterpreterBase.MAIN_FUNC_DEF, [], False, invalid_line_num_of_caller
+            )
+        finally:
+            self.flush_output()
 
         # program terminates!
 
+    # "Reset" I/O and the objects created by the previous run; the loaded program is kept
+    def reset(self):
+        super().reset()
+        self.main_object = None
+
+    # returns the performance counters of the last run; this interpreter doesn't collect any
+    def get_metrics(self):
+        return None
+
+    # returns the resources consumed by the last run; this interpreter doesn't account for them
+    def get_usage(self):
+        return None
+
     # user passes in the line number of the statement that performed the new command so we can generate an error
     # if the user tries to new an class name that does not exist. This will report the line number of the statement
     # with the new command
@@ -98,3 +133,11 @@ class Interpreter(InterpreterBase):
                 if item[2] == InterpreterBase.INHERITS_DEF:
                     superclass_name = item[3]
                 self.type_manager.add_class_type(class_name, superclass_name)
+
+
+# parses and loads a program once, returning a Program that can be run many times; options are passed on to the
+# Interpreter
+def compile(program, **options):  # pylint: disable=redefined-builtin
+    interpreter = Interpreter(console_output=False, **options)
+    interpreter.load(program)
+    return Program(interpreter)
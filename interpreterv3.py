@@ -1,41 +1,273 @@
+import gc
+
 from classv3 import ClassDef
 from intbase import InterpreterBase, ErrorType
 from bparser import BParser
-from objectv3 import ObjectDef
+from evalstackv3 import EvalStack
+from instrumentation import Hooks, PerformanceCounters, StatementPrinter
+from intio import InterpreterIO, ListOutputSink
+from limits import Budget
+from objectv3 import ObjectDef, InstrumentedObjectDef
+from objectv3 import ResumableObjectDef, ResumableInstrumentedObjectDef
+from objectv3 import reachable_objects
+from program import Program
 from type_valuev3 import TypeManager
 
 # need to document that template classes can't be base or derived classes and students won't be tested on that
 
 
 # Main interpreter class
-class Interpreter(InterpreterBase):
-    def __init__(self, console_output=True, inp=None, trace_output=False):
+class Interpreter(InterpreterIO, InterpreterBase):
+    # EvalStack steps a run_main_async() run takes between two yields to the event loop (about a millisecond)
+    ASYNC_SLICE_STEPS = 500
+
+    # explicit_stack=True selects the explicit-stack evaluator (see evalstackv3.py), which keeps Brewin frames on
+    # the heap so deep recursion doesn't hit Python's recursion limit; max_call_depth is the call depth limit of the
+    # runs whose limits.RunLimits doesn't set one (see run_main()); instrumentation is a list of
+    # instrumentation.Instrumentation objects that receive events as the program runs (trace_output adds one that
+    # prints each statement); collect_metrics=True counts the work each run does (see get_metrics()); limits is the
+    # limits.RunLimits of each run that doesn't get its own; freeze_program=True calls gc.freeze() once a program is
+    # loaded, so that garbage collections no longer traverse the parsed program and its class metadata (nor anything
+    # else allocated so far)
+    def __init__(
+        self,
+        console_output=True,
+        inp=None,
+        trace_output=False,
+        explicit_stack=False,
+        max_call_depth=None,
+        output_sink=None,
+        output_log_limit=None,
+        input_provider=None,
+        instrumentation=None,
+        collect_metrics=False,
+        limits=None,
+        freeze_program=False,
+    ):
         super().__init__(console_output, inp)
-        self.trace_output = trace_output
+        self.init_io(output_sink, output_log_limit, input_provider)
+        self.explicit_stack = explicit_stack
+        self.max_call_depth = max_call_depth
+        self.eval_stack = None
+        self.instrumentation = list(instrumentation or [])
+        if trace_output:
+            self.instrumentation.append(StatementPrinter())
+        self.collect_metrics = collect_metrics
+        self.counters = (
+            None  # PerformanceCounters of the last run, if collect_metrics is set
+        )
+        self.__specializations_before_run = 0
+        self.hooks = None  # the instrumentation's hooks, while a run is instrumented
+        self.object_class = ObjectDef
+        self.limits = limits
+        self.freeze_program = freeze_program
+        self.budget = Budget()  # the limits.Budget of the current (or last) run
 
     # run a program, provided in an array of strings, one string per line of source code
     # usese the provided BParser class found in parser.py to parse the program into lists
-    def run(self, program):
+    def run(self, program, limits=None):
+        self.load(program)
+        self.run_main(limits)
+
+    # run() as a coroutine, see run_main_async()
+    async def run_async(
+        self, program, input_source=None, output_sink=None, limits=None
+    ):
+        self.load(program)
+        await self.run_main_async(input_source, output_sink, limits)
+
+    # parses the program and builds its type and class metadata; a loaded program can then be run (any number of
+    # times) with run_main()
+    def load(self, program):
         status, parsed_program = BParser.parse(program)
         if not status:
             super().error(
                 ErrorType.SYNTAX_ERROR, f"Parse error on program: {parsed_program}"
             )
+        self.load_parsed(parsed_program)
+
+    # load() for a program that was already parsed by BParser.parse(), e.g. one restored from a snapshot
+    def load_parsed(self, parsed_program):
         self.__add_all_class_types_to_type_manager(parsed_program)
         self.__map_class_names_to_class_defs(parsed_program)
+        if self.freeze_program:
+            gc.freeze()
 
-        # instantiate main class
+    # runs the loaded program: creates the main object and calls its main method. limits (a limits.RunLimits)
+    # overrides the interpreter's for this run; exceeding one (including the max_call_depth default, whatever the
+    # evaluator) raises limits.ResourceLimitExceeded.
+    # keep_main_object=True calls main on the main object of the previous run (or of a restored snapshot, see
+    # snapshot.py) instead, so the objects its fields refer to carry over from one run to the next; they aren't
+    # counted by the new run's heap limits
+    def run_main(self, limits=None, keep_main_object=False):
+        self.__select_code_path()
+        self.budget = self.__new_budget(limits, self.explicit_stack)
+        self.__prepare_main_object(keep_main_object)
+        invalid_line_num_of_caller = None
+
+        # call main function in main class; return value is ignored from main
+        try:
+            if self.explicit_stack:
+                self.eval_stack = EvalStack()
+                self.eval_stack.push(
+                    self.main_object.start_method(
+                        InterpreterBase.MAIN_FUNC_DEF,
+                        [],
+                        False,
+                        invalid_line_num_of_caller,
+                    )
+                )
+                self.eval_stack.run()
+            else:
+                self.main_object.call_method(
+                    InterpreterBase.MAIN_FUNC_DEF, [], False, invalid_line_num_of_caller
+                )
+        finally:
+            self.flush_output()
+
+        # program terminates!
+
+    # like run_main(), but a coroutine that shares the event loop's thread with other tasks: main runs as a resumable
+    # run (see start_resumable_run()) that yields to the event loop every ASYNC_SLICE_STEPS steps and whenever it
+    # waits for input. Input statements await input_source, an intio.AsyncInputSource (without one, input is read as
+    # in run_main()), and the lines the program prints are pushed to output_sink, an intio.AsyncOutputSink, before
+    # each yield (without one, they're output as in run_main()). Time spent waiting for input counts towards the
+    # max_seconds limit. keep_main_object is that of run_main()
+    async def run_main_async(
+        self, input_source=None, output_sink=None, limits=None, keep_main_object=False
+    ):
+        # only imported by the programs that run asynchronously, since it's slow to import
+        import asyncio
+
+        pending = []  # lines printed since they were last pushed to output_sink
+        console_output, sync_output_sink = self.console_output, self.output_sink
+        if output_sink is not None:
+            self.console_output = True
+            self.output_sink = ListOutputSink(pending)
+        try:
+            eval_stack = self.start_resumable_run(limits, keep_main_object)
+            while True:
+                status = eval_stack.run_steps(Interpreter.ASYNC_SLICE_STEPS)
+                if status is EvalStack.DONE:
+                    break
+                if pending:
+                    lines = pending[:]
+                    pending.clear()
+                    await output_sink.write_lines(lines)
+                if status is EvalStack.PAUSED:
+                    await asyncio.sleep(0)
+                elif input_source is None:
+                    eval_stack.send_input(self.read_input(status))
+                elif status.get_string:
+                    eval_stack.send_input(await input_source.next_line())
+                else:
+                    eval_stack.send_input(await input_source.next_int())
+        finally:
+            self.console_output, self.output_sink = console_output, sync_output_sink
+            self.flush_output()
+            if pending:
+                await output_sink.write_lines(pending)
+
+    # prepares a resumable run of the loaded program: like run_main(), it creates (or keeps) the main object, but
+    # rather than running main, it pushes it onto a new EvalStack, which is returned and run with
+    # EvalStack.run_steps(). Such runs use ResumableObjectDefs, whatever explicit_stack is set to
+    def start_resumable_run(self, limits=None, keep_main_object=False):
+        self.__select_code_path(resumable=True)
+        self.budget = self.__new_budget(limits, True)
+        self.__prepare_main_object(keep_main_object)
+        invalid_line_num_of_caller = None
+        self.eval_stack = EvalStack()
+        self.eval_stack.push(
+            self.main_object.start_method(
+                InterpreterBase.MAIN_FUNC_DEF, [], False, invalid_line_num_of_caller
+            )
+        )
+        return self.eval_stack
+
+    # reads the input asked for by an evalstackv3.InputRequest as run_main() would
+    def read_input(self, input_request):
+        if input_request.get_string:
+            return self.get_input()
+        return self.get_int_input()
+
+    # returns the performance counters of the last run as a dict, or None if collect_metrics isn't set
+    def get_metrics(self):
+        if self.counters is None:
+            return None
+        metrics = self.counters.as_dict()
+        metrics["template_specializations"] = (
+            self.__count_specializations() - self.__specializations_before_run
+        )
+        return metrics
+
+    # number of templated class specializations built so far, by any run (or by specialize_templates())
+    def __count_specializations(self):
+        return sum(
+            len(class_def.specializations)
+            for class_def in self.class_index.values()
+            if class_def.is_templated_class()
+        )
+
+    # returns what the current (or last) run consumed: fuel, objects allocated, and the live and peak objects and
+    # estimated bytes (see limits.Budget.usage())
+    def get_usage(self):
+        return self.budget.usage()
+
+    # picks the plain or the instrumented code path for a run, and its resumable variant for resumable runs
+    def __select_code_path(self, resumable=False):
+        instruments = list(self.instrumentation)
+        if self.collect_metrics:
+            self.counters = PerformanceCounters()
+            # specializations are cached for the program's lifetime; the metrics count those the run builds
+            self.__specializations_before_run = self.__count_specializations()
+            instruments.append(self.counters)
+        # instance attributes check_type_compatibility and output, if any, shadow the methods for an instrumented run
+        vars(self).pop("check_type_compatibility", None)
+        vars(self).pop("output", None)
+        if not instruments:
+            self.hooks = None
+            self.object_class = ResumableObjectDef if resumable else ObjectDef
+            return
+        self.hooks = Hooks(instruments)
+        if resumable:
+            self.object_class = ResumableInstrumentedObjectDef
+        else:
+            self.object_class = InstrumentedObjectDef
+        if self.hooks.type_check:
+            self.check_type_compatibility = self.__reported_check_type_compatibility
+        if self.hooks.output:
+            self.output = self.__reported_output
+
+    # creates the main object of a run, unless keep_main_object is set and there's one from a previous run. A kept
+    # main object and the objects it refers to are switched to the run's code path (see __select_code_path())
+    def __prepare_main_object(self, keep_main_object):
+        if keep_main_object and self.main_object is not None:
+            if type(self.main_object) is not self.object_class:
+                for obj in reachable_objects(self.main_object):
+                    part = obj
+                    while part is not None:
+                        part.__class__ = self.object_class
+                        part = part.super_object
+            return
         invalid_line_num_of_caller = None
         self.main_object = self.instantiate(
             InterpreterBase.MAIN_CLASS_DEF, invalid_line_num_of_caller
         )
 
-        # call main function in main class; return value is ignored from main
-        self.main_object.call_method(
-            InterpreterBase.MAIN_FUNC_DEF, [], False, invalid_line_num_of_caller
-        )
+    # the Budget of a run with the given limits (the interpreter's if None). Without a call depth limit, an
+    # explicit-stack run gets max_call_depth or, failing that, EvalStack.DEFAULT_MAX_CALL_DEPTH: its depth isn't
+    # bounded by Python's recursion limit
+    def __new_budget(self, limits, explicit_stack):
+        max_call_depth = self.max_call_depth
+        if max_call_depth is None and explicit_stack:
+            max_call_depth = EvalStack.DEFAULT_MAX_CALL_DEPTH
+        return Budget(self.limits if limits is None else limits, max_call_depth)
 
-        # program terminates!
+    # "Reset" I/O and the objects created by the previous run; the loaded program is kept
+    def reset(self):
+        super().reset()
+        self.main_object = None
+        self.eval_stack = None
 
     # user passes in the line number of the statement that performed the new command so we can generate an error
     # if the user tries to new an class name that does not exist. This will report the line number of the statement
@@ -50,9 +282,13 @@ class Interpreter(InterpreterBase):
                 line_num_of_statement,
             )
 
-        obj = ObjectDef(
-            self, class_def, None, self.trace_output
+        obj = self.object_class(
+            self, class_def
         )  # Create an object based on this class definition
+        self.budget.allocate(obj, line_num_of_statement)
+        if self.hooks is not None:
+            for hook in self.hooks.allocate:
+                hook(obj, line_num_of_statement)
         return obj
 
     # returns a ClassDef object - only used for non-templated classes to locate the base class
@@ -79,6 +315,50 @@ class Interpreter(InterpreterBase):
     def check_type_compatibility(self, typea, typeb, for_assignment=False):
         return self.type_manager.check_type_compatibility(typea, typeb, for_assignment)
 
+    # output() for runs with output hooks
+    def __reported_output(self, val):
+        for hook in self.hooks.output:
+            hook(val)
+        super().output(val)
+
+    # check_type_compatibility() for runs with type_check hooks
+    def __reported_check_type_compatibility(self, typea, typeb, for_assignment=False):
+        for hook in self.hooks.type_check:
+            hook(typea, typeb, for_assignment)
+        return self.type_manager.check_type_compatibility(typea, typeb, for_assignment)
+
+    # builds the specialization of every templated class type named in the loaded program up front, rather than
+    # on first use, e.g. so that forked workers all share them. Specializations that fail are skipped here; they
+    # report their error when the program uses them
+    def specialize_templates(self):
+        sources = [class_def.class_source for class_def in self.class_index.values()]
+        specialized = set()
+        while sources:
+            for type_name in self.__templated_type_names(sources.pop(), set()):
+                if type_name in specialized:
+                    continue
+                specialized.add(type_name)
+                try:
+                    class_def = self.__get_class_def_from_class_name(type_name)
+                except RuntimeError:
+                    self.error_type = None
+                    self.error_line = None
+                    continue
+                if class_def is not None:
+                    sources.append(class_def.class_source)
+
+    # returns the set of valid templated type names (e.g. list@int) used in some class source
+    def __templated_type_names(self, code, names):
+        for item in code:
+            if type(item) is list:
+                self.__templated_type_names(item, names)
+            elif (
+                InterpreterBase.TYPE_CONCAT_CHAR in item
+                and self.type_manager.is_valid_type(item)
+            ):
+                names.add(item)
+        return names
+
     # pass in a regular class name (e.g., person) or templated class name (e.g. list@int)
     def __get_class_def_from_class_name(self, class_type):
         if not self.type_manager.is_valid_type(class_type):
@@ -128,3 +408,11 @@ class Interpreter(InterpreterBase):
                 self.type_manager.add_class_type(
                     class_name, superclass_name, len(type_params)
                 )
+
+
+# parses and loads a program once, returning a Program that can be run many times; options are passed on to the
+# Interpreter, e.g. compile(program, explicit_stack=True)
+def compile(program, **options):  # pylint: disable=redefined-builtin
+    interpreter = Interpreter(console_output=False, **options)
+    interpreter.load(program)
+    return Program(interpreter)
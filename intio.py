@@ -0,0 +1,367 @@
+"""
+Module that contains the pluggable output sinks and input providers used by InterpreterBase.
+
+By default InterpreterBase prints each line with print(); pass an OutputSink as the output_sink argument of an
+Interpreter to change where (and how) console output is written. The Interpreter classes get this support from the
+InterpreterIO mixin.
+
+By default InterpreterBase reads input from the inp list or, without one, from the keyboard with input(); pass an
+InputProvider as the input_provider argument of an Interpreter to stream input from an iterator or a file instead.
+Input providers read ahead in chunks, so they're meant for non-interactive input.
+
+The version 3 interpreter's run_main_async() takes an AsyncInputSource and an AsyncOutputSink instead, whose methods
+are coroutines, e.g. to serve an interactive session over an asyncio stream (StreamInputSource, StreamOutputSink).
+"""
+
+import mmap
+import os
+import sys
+from itertools import islice
+
+
+class OutputSink:
+    """
+    Base class for output sinks. write_line() is called once per line the Brewin program prints; flush() is
+    called by the interpreter when the program ends, reports an error, or reads input from the keyboard or from an
+    input provider.
+    """
+
+    def write_line(self, line):
+        """Write one line of output (without its trailing newline)."""
+        raise NotImplementedError
+
+    def flush(self):
+        """Make sure all lines written so far have reached their destination."""
+
+
+class PrintOutputSink(OutputSink):
+    """
+    Writes each line with print(), exactly like InterpreterBase does without a sink.
+    """
+
+    def write_line(self, line):
+        print(line)
+
+    def flush(self):
+        sys.stdout.flush()
+
+
+class NullOutputSink(OutputSink):
+    """
+    Discards all output.
+    """
+
+    def write_line(self, line):
+        pass
+
+
+class ListOutputSink(OutputSink):
+    """
+    Appends each line to the list lines.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def write_line(self, line):
+        self.lines.append(line)
+
+
+class BufferedOutputSink(OutputSink):
+    """
+    Collects lines in memory and writes them to a file descriptor in blocks of (at least) buffer_size characters,
+    so printing many lines costs one os.write() per block rather than per line.
+    """
+
+    DEFAULT_BUFFER_SIZE = 1 << 16
+
+    def __init__(self, fd=1, buffer_size=DEFAULT_BUFFER_SIZE, encoding="utf-8"):
+        self.fd = fd
+        self.buffer_size = buffer_size
+        self.encoding = encoding
+        self.pending = []
+        self.pending_size = 0
+
+    def write_line(self, line):
+        text = f"{line}\n"
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        data = "".join(self.pending).encode(self.encoding)
+        self.pending = []
+        self.pending_size = 0
+        if self.fd in (1, 2):
+            # don't let our block overtake anything already buffered by sys.stdout/sys.stderr
+            sys.stdout.flush()
+            sys.stderr.flush()
+        view = memoryview(data)
+        while view:
+            written = os.write(self.fd, view)
+            view = view[written:]
+
+
+class InputProvider:
+    """
+    Base class for input providers. next_line() is called for each (inputs ...) statement and next_int() for each
+    (inputi ...) statement.
+    """
+
+    def next_line(self):
+        """Return the next line of input as a str, or None if the input is exhausted."""
+        raise NotImplementedError
+
+    def next_int(self):
+        """Return the next line of input converted to an int; raises EOFError if the input is exhausted."""
+        line = self.next_line()
+        if line is None:
+            raise EOFError("no more input")
+        return int(line)
+
+
+class LineInputProvider(InputProvider):
+    """
+    Reads input lazily from any iterable of strings (a list, a generator, a file object, ...), chunk_lines lines at
+    a time. The first (inputi ...) that reaches a chunk converts the whole chunk to ints at once; if the chunk
+    also holds non-integer lines, its lines are converted one at a time instead.
+    """
+
+    DEFAULT_CHUNK_LINES = 4096
+
+    def __init__(self, lines, strip_newlines=False, chunk_lines=DEFAULT_CHUNK_LINES):
+        self.lines = iter(lines)
+        self.strip_newlines = strip_newlines  # for files, whose lines still end in \n
+        self.chunk_lines = chunk_lines
+        self.chunk = []
+        # chunk converted to ints; False if it holds non-integer lines
+        self.chunk_ints = None
+        self.pos = 0  # index of the next line in chunk
+
+    def next_line(self):
+        if self.pos == len(self.chunk) and not self.__read_chunk():
+            return None
+        line = self.chunk[self.pos]
+        self.pos += 1
+        return line
+
+    def next_int(self):
+        if self.pos == len(self.chunk) and not self.__read_chunk():
+            raise EOFError("no more input")
+        if self.chunk_ints is None:
+            try:
+                self.chunk_ints = list(map(int, self.chunk))
+            except ValueError:
+                self.chunk_ints = False
+        pos = self.pos
+        self.pos += 1
+        if self.chunk_ints is False:
+            return int(self.chunk[pos])
+        return self.chunk_ints[pos]
+
+    # returns False if there's no more input
+    def __read_chunk(self):
+        chunk = list(islice(self.lines, self.chunk_lines))
+        if self.strip_newlines:
+            chunk = [line.rstrip("\n") for line in chunk]
+        self.chunk = chunk
+        self.chunk_ints = None
+        self.pos = 0
+        return len(chunk) > 0
+
+
+class FileInputProvider(LineInputProvider):
+    """
+    Reads input from an open text file (e.g., sys.stdin), one line per input.
+    """
+
+    def __init__(self, file, chunk_lines=LineInputProvider.DEFAULT_CHUNK_LINES):
+        super().__init__(file, True, chunk_lines)
+
+
+class MappedFileInputProvider(LineInputProvider):
+    """
+    Reads input from the file at path by memory-mapping it, splitting it into lines block by block as the program
+    consumes them, so the whole file is never materialized as a list of strings.
+    """
+
+    BLOCK_SIZE = 1 << 20
+
+    def __init__(
+        self, path, encoding="utf-8", chunk_lines=LineInputProvider.DEFAULT_CHUNK_LINES
+    ):
+        self.encoding = encoding
+        self.file = open(path, "rb")
+        if os.fstat(self.file.fileno()).st_size > 0:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.map = None  # empty files can't be mapped
+        super().__init__(self.__generate_lines(), False, chunk_lines)
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+    def __generate_lines(self):
+        if self.map is None:
+            return
+        size = len(self.map)
+        pos = 0
+        while pos < size:
+            end = min(pos + MappedFileInputProvider.BLOCK_SIZE, size)
+            if end < size:
+                # only split complete lines; the rest is left for the next block
+                newline = self.map.rfind(b"\n", pos, end)
+                if newline != -1:
+                    end = newline + 1
+                else:
+                    end = self.map.find(b"\n", end)
+                    end = size if end == -1 else end + 1
+            lines = self.map[pos:end].decode(self.encoding).split("\n")
+            if lines[-1] == "":
+                lines.pop()  # the block ended with a newline
+            yield from lines
+            pos = end
+
+
+class InterpreterIO:
+    """
+    Mixin that adds output sinks, the output log cap and input providers to the Interpreter classes, on top of
+    InterpreterBase's print() and input() based I/O. It lives here because intbase.py is replaced by the graders' own
+    copy. List this class before InterpreterBase in an Interpreter's bases, and call init_io() after
+    InterpreterBase.__init__().
+    """
+
+    def init_io(self, output_sink=None, output_log_limit=None, input_provider=None):
+        """
+        Set up I/O: if output_sink, an OutputSink, is given, console output is written to it instead of being
+        printed; if output_log_limit is given, only the first output_log_limit lines are kept in the output log (0
+        disables the log); and if input_provider, an InputProvider, is given, input is read from it instead of from
+        inp or the keyboard.
+        """
+        self.output_sink = output_sink
+        self.output_log_limit = output_log_limit
+        self.input_provider = input_provider
+
+    def get_input(self):
+        if self.input_provider is not None:
+            self.flush_output()  # make sure any prompt is visible before we wait for input
+            return self.input_provider.next_line()
+        if not self.inp:
+            self.flush_output()  # InterpreterBase reads from the keyboard
+        return super().get_input()
+
+    def get_int_input(self):
+        """
+        Like get_input(), but for (inputi ...): returns the next input converted to an int.
+        """
+        if self.input_provider is not None:
+            self.flush_output()
+            return self.input_provider.next_int()
+        return int(self.get_input())
+
+    def output(self, val):
+        if self.console_output:
+            if self.output_sink is None:
+                print(val)
+            else:
+                self.output_sink.write_line(val)
+        if (
+            self.output_log_limit is None
+            or len(self.output_log) < self.output_log_limit
+        ):
+            self.output_log.append(val)
+
+    def flush_output(self):
+        """
+        Flush the output sink, if any. Called when the program ends, reports an error or reads input
+        from the keyboard or an input provider.
+        """
+        if self.output_sink is not None:
+            self.output_sink.flush()
+
+    def error(self, error_type, description=None, line_num=None):
+        self.flush_output()
+        super().error(error_type, description, line_num)
+
+
+class AsyncOutputSink:
+    """
+    Base class for the output sinks of Interpreter.run_main_async(). write_lines() is awaited with the lines printed
+    since its previous call whenever the run yields to the event loop: every so many steps, when it waits for input
+    and when it ends.
+    """
+
+    async def write_lines(self, lines):
+        """Write a list of lines of output (without their trailing newlines)."""
+        raise NotImplementedError
+
+
+class StreamOutputSink(AsyncOutputSink):
+    """
+    Writes output to an asyncio.StreamWriter (e.g., a client connection), waiting for it to drain after each block.
+    """
+
+    def __init__(self, writer, encoding="utf-8"):
+        self.writer = writer
+        self.encoding = encoding
+
+    async def write_lines(self, lines):
+        self.writer.write("".join(f"{line}\n" for line in lines).encode(self.encoding))
+        await self.writer.drain()
+
+
+class AsyncInputSource:
+    """
+    Base class for the input sources of Interpreter.run_main_async(): next_line() is awaited for each (inputs ...)
+    statement and next_int() for each (inputi ...) statement.
+    """
+
+    async def next_line(self):
+        """Return the next line of input as a str, or None if the input is exhausted."""
+        raise NotImplementedError
+
+    async def next_int(self):
+        """Return the next line of input converted to an int; raises EOFError if the input is exhausted."""
+        line = await self.next_line()
+        if line is None:
+            raise EOFError("no more input")
+        return int(line)
+
+
+class StreamInputSource(AsyncInputSource):
+    """
+    Reads input lines from an asyncio.StreamReader (e.g., a client connection) as the program asks for them.
+    """
+
+    def __init__(self, reader, encoding="utf-8"):
+        self.reader = reader
+        self.encoding = encoding
+
+    async def next_line(self):
+        line = await self.reader.readline()
+        if not line:
+            return None
+        return line.decode(self.encoding).rstrip("\r\n")
+
+
+class QueueInputSource(AsyncInputSource):
+    """
+    Takes input lines from an asyncio.Queue, in which None marks the end of the input.
+    """
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.exhausted = False
+
+    async def next_line(self):
+        if self.exhausted:
+            return None
+        line = await self.queue.get()
+        if line is None:
+            self.exhausted = True
+        return line
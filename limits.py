@@ -0,0 +1,213 @@
+"""
+Module that contains the per-run resource limits of the version 3 interpreter.
+
+A RunLimits object bounds one run of a program:
+
+    limits = RunLimits(max_fuel=1_000_000, max_call_depth=500, max_seconds=2.0, max_heap_bytes=64 << 20)
+    interpreter = interpreterv3.Interpreter(limits=limits)  # the default for each run
+    interpreter.run(program, limits=RunLimits(max_fuel=1000))  # or for a single run
+
+Fuel is consumed one unit per while loop iteration and per method call (tail calls included): those are the only
+constructs that can run statements repeatedly, so fuel bounds the work a run can do. A run that exceeds a limit is
+terminated by raising ResourceLimitExceeded, which (unlike the errors of the Brewin program, which are RuntimeErrors)
+can't be confused with a program error; Program.run() reports it in RunResult.limit_exceeded.
+
+The call depth limit is the only one with a default: a run whose RunLimits doesn't set it gets the Interpreter's
+max_call_depth, and an explicit-stack or resumable run (see evalstackv3.py) EvalStack.DEFAULT_MAX_CALL_DEPTH if that
+isn't set either. The tree-walking evaluator is otherwise bounded by Python's recursion limit, which is reported as a
+RecursionError instead.
+
+The heap limits bound the Brewin objects alive at once, counted in objects and in estimated bytes (see
+object_bytes(), measured once per class); an object is counted from its (new ...) until Python frees it.
+
+The interpreter keeps a Budget for each run. Its checks are counter-based: loops and calls only decrement
+Budget.ticks, and the fuel and the clock are only checked when it drops below zero, every CLOCK_CHECK_INTERVAL units
+at most. Budget.usage() reports what the run consumed, including its peak heap figures.
+"""
+
+import gc
+import sys
+import time
+import weakref
+
+
+class ResourceLimitExceeded(Exception):
+    """
+    Raised when a run exceeds one of its RunLimits; limit is "fuel", "call_depth", "time", "heap_objects" or
+    "heap_bytes", value is the limit and line_num is the line of the loop, call or (new ...) that exceeded it.
+    """
+
+    def __init__(self, limit, value, line_num):
+        super().__init__(f"{limit} limit of {value} exceeded on line {line_num}")
+        self.limit = limit
+        self.value = value
+        self.line_num = line_num
+
+
+class RunLimits:
+    """
+    Limits of one run; None means unlimited.
+    """
+
+    def __init__(
+        self,
+        max_fuel=None,
+        max_call_depth=None,
+        max_seconds=None,
+        max_heap_objects=None,
+        max_heap_bytes=None,
+    ):
+        self.max_fuel = max_fuel
+        self.max_call_depth = max_call_depth
+        self.max_seconds = max_seconds
+        self.max_heap_objects = max_heap_objects
+        self.max_heap_bytes = max_heap_bytes
+
+
+class Budget:
+    """
+    The state of a run's limits: what's left of them, the current call depth and the objects alive.
+    """
+
+    CLOCK_CHECK_INTERVAL = 1000  # fuel units between two checks of the clock
+
+    # default_max_call_depth is the call depth limit if limits doesn't set one
+    def __init__(self, limits=None, default_max_call_depth=None):
+        limits = limits or RunLimits()
+        self.max_fuel = limits.max_fuel
+        self.max_seconds = limits.max_seconds
+        self.max_call_depth = limits.max_call_depth
+        if self.max_call_depth is None:
+            self.max_call_depth = default_max_call_depth
+        if self.max_call_depth is None:
+            self.max_call_depth = sys.maxsize
+        self.deadline = None
+        if limits.max_seconds is not None:
+            self.deadline = time.monotonic() + limits.max_seconds
+        self.call_depth = 0
+        self.charged = 0  # fuel consumed by the previous chunks
+        self.chunk = 0  # fuel units in the current chunk
+        self.ticks = 0  # fuel units left in the current chunk
+        self.__start_chunk()
+        self.max_heap_objects = limits.max_heap_objects
+        self.max_heap_bytes = limits.max_heap_bytes
+        self.allocated_objects = 0
+        self.live_objects = 0
+        self.live_bytes = 0
+        self.peak_objects = 0
+        self.peak_bytes = 0
+        self.__class_bytes = {}  # ClassDef -> estimated bytes of its objects
+        self.__sizes = {}  # weak reference to each live object -> its estimated bytes
+
+    def __start_chunk(self):
+        chunk = sys.maxsize if self.deadline is None else Budget.CLOCK_CHECK_INTERVAL
+        if self.max_fuel is not None:
+            chunk = min(chunk, self.max_fuel - self.charged)
+        self.chunk = self.ticks = chunk
+
+    # called when ticks drops below zero, i.e., by the first fuel unit past the current chunk
+    def refill(self, line_num):
+        charged = self.charged + self.chunk
+        if self.max_fuel is not None and charged >= self.max_fuel:
+            raise ResourceLimitExceeded("fuel", self.max_fuel, line_num)
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise ResourceLimitExceeded("time", self.max_seconds, line_num)
+        self.charged = charged
+        self.__start_chunk()
+        self.ticks -= 1  # for the unit that triggered the refill
+
+    def call_depth_exceeded(self, line_num):
+        raise ResourceLimitExceeded("call_depth", self.max_call_depth, line_num)
+
+    # includes the unit that exceeded the fuel limit, if it was exceeded
+    def fuel_used(self):
+        return self.charged + self.chunk - self.ticks
+
+    # called by the interpreter for each object it creates (the main object and each (new ...))
+    def allocate(self, obj, line_num):
+        size = self.__class_bytes.get(obj.class_def)
+        if size is None:
+            size = self.__class_bytes[obj.class_def] = object_bytes(obj)
+        self.__sizes[weakref.ref(obj, self.__free)] = size
+        self.allocated_objects += 1
+        self.live_objects += 1
+        self.live_bytes += size
+        if self.__over_heap_limit():
+            # unreachable objects that are part of reference cycles (e.g., Brewin objects that refer to each other)
+            # may still be waiting for the garbage collector
+            gc.collect()
+            if self.__over_heap_limit():
+                if self.max_heap_objects is not None and (
+                    self.live_objects > self.max_heap_objects
+                ):
+                    raise ResourceLimitExceeded(
+                        "heap_objects", self.max_heap_objects, line_num
+                    )
+                raise ResourceLimitExceeded("heap_bytes", self.max_heap_bytes, line_num)
+        if self.live_objects > self.peak_objects:
+            self.peak_objects = self.live_objects
+        if self.live_bytes > self.peak_bytes:
+            self.peak_bytes = self.live_bytes
+
+    def __over_heap_limit(self):
+        return (
+            self.max_heap_objects is not None
+            and self.live_objects > self.max_heap_objects
+        ) or (self.max_heap_bytes is not None and self.live_bytes > self.max_heap_bytes)
+
+    def __free(self, ref):
+        self.live_objects -= 1
+        self.live_bytes -= self.__sizes.pop(ref)
+
+    def usage(self):
+        """Returns what the run consumed, as a JSON-serializable dict."""
+        return {
+            "fuel": self.fuel_used(),
+            "allocated_objects": self.allocated_objects,
+            "live_objects": self.live_objects,
+            "live_bytes": self.live_bytes,
+            "peak_objects": self.peak_objects,
+            "peak_bytes": self.peak_bytes,
+        }
+
+
+# the interpreter's shared metadata (including the tokens of the parsed program, e.g. field names), which isn't
+# counted in the size of an object
+SHARED_TYPES = (
+    "ClassDef",
+    "MethodDef",
+    "Interpreter",
+    "Type",
+    "StringWithLineNumber",
+)
+
+
+def object_bytes(obj):
+    """Estimates the memory used by obj (an ObjectDef) and its superclass parts."""
+    seen = set()
+    size = 0
+    part = obj
+    while part is not None:
+        size += _deep_size(part, seen, part)
+        part = part.super_object
+    return size
+
+
+# sys.getsizeof of value and everything it owns, skipping other objects and shared metadata
+def _deep_size(value, seen, part):
+    if id(value) in seen or type(value).__name__ in SHARED_TYPES:
+        return 0
+    if hasattr(value, "anchor_object") and value is not part:
+        return 0  # another object, or another part of this one
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += _deep_size(key, seen, part)
+            size += _deep_size(item, seen, part)
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            size += _deep_size(item, seen, part)
+    elif hasattr(value, "__dict__") and not callable(value):
+        size += _deep_size(vars(value), seen, part)
+    return size
@@ -1,9 +1,11 @@
 from classv3 import VariableDef
 import copy
+import weakref
 from env_v2 import EnvironmentManager
+from evalstackv3 import INPUT_INT_REQUEST, INPUT_STRING_REQUEST
 from intbase import InterpreterBase, ErrorType
-from type_valuev3 import create_value, create_default_value
-from type_valuev3 import Type, Value
+from type_valuev3 import create_value, create_default_value, concat_strings
+from type_valuev3 import Type, Value, PartValue
 
 
 class ObjectDef:
@@ -11,6 +13,8 @@ class ObjectDef:
     STATUS_PROCEED = 0
     STATUS_RETURN = 1
     STATUS_EXCEPTION = 2
+    # value is (obj, method_name, actual_params, super_only, line_num, anchor) for the caller to run
+    STATUS_TAIL_CALL = 3
 
     # type constants
     INT_TYPE_CONST = Type(InterpreterBase.INT_DEF)
@@ -18,19 +22,27 @@ class ObjectDef:
     BOOL_TYPE_CONST = Type(InterpreterBase.BOOL_DEF)
 
     # class_def is a ClassDef object
-    def __init__(self, interpreter, class_def, anchor_object=None, trace_output=False):
+    def __init__(self, interpreter, class_def, anchor_object=None):
         self.interpreter = interpreter  # objref to interpreter object. used to report errors, get input, produce output
         self.class_def = class_def
+        # a part only holds a weak reference to the most derived part (see anchor_object), so that objects don't
+        # refer to themselves and are freed by reference counting as soon as they become unreachable
         if anchor_object is None:  # CAREY
-            self.anchor_object = self
+            self.__anchor_ref = None
         else:
-            self.anchor_object = anchor_object  # CAREY
-        self.trace_output = trace_output
+            self.__anchor_ref = weakref.ref(anchor_object)  # CAREY
         self.__instantiate_fields()
         self.__map_method_names_to_method_definitions()
         self.__create_map_of_operations_to_lambdas()  # sets up maps to facilitate binary and unary operations, e.g., (+ 5 6)
         self.__init_superclass_if_any()  # construct default values for superclass fields all the way to the base class
 
+    # the most derived part of the object this part belongs to (self, for the most derived part)
+    @property
+    def anchor_object(self):
+        if self.__anchor_ref is None:
+            return self
+        return self.__anchor_ref()
+
     # CAREY
     def __get_obj_with_method(self, start_obj, method_name, actual_params):
         cur_obj = start_obj
@@ -54,7 +66,110 @@ class ObjectDef:
     # actual_params is a list of Value objects; all parameters are passed by value
     # the caller passes in its line number so if there's an error (e.g., mismatched # of parameters or unknown
     # method name) we can generate an error at the source (where the call is initiated) for better context
-    def call_method(self, method_name, actual_params, super_only, line_num_of_caller):
+    # hooks is the instrumentation.Hooks whose method_enter and method_exit hooks are called around each method
+    # body the call runs (InstrumentedObjectDef passes the interpreter's); plain calls leave it None
+    def call_method(
+        self, method_name, actual_params, super_only, line_num_of_caller, hooks=None
+    ):
+        obj_to_call_on, method_def, env = self.__prepare_method_call(
+            method_name, actual_params, super_only, line_num_of_caller
+        )
+        self.__charge_call(line_num_of_caller)
+        if hooks is not None:
+            for hook in hooks.method_enter:
+                hook(obj_to_call_on, method_def, env, line_num_of_caller)
+        # since each method has a single top-level statement, execute it.
+        status, return_value = obj_to_call_on.__execute_statement(
+            env, method_def.return_type, method_def.code
+        )
+        if hooks is not None:
+            for hook in hooks.method_exit:
+                hook(obj_to_call_on, method_def, status)
+        if status != ObjectDef.STATUS_TAIL_CALL:
+            self.interpreter.budget.call_depth -= 1
+            return self.__method_call_result(method_def, status, return_value)
+
+        # the method ended with a (return (call ...)) in tail position; rather than recursing, run the callee in
+        # this frame, and keep doing so for as long as the callees end in tail calls themselves. Each eliminated
+        # call is reported to the hooks as a call of its own, which starts right after its caller's body ends
+        # with STATUS_TAIL_CALL
+        return_type = method_def.return_type
+        while status == ObjectDef.STATUS_TAIL_CALL:
+            tail_call = return_value
+            callee = self.__prepare_tail_call(method_def, tail_call)
+            if callee is None:
+                status, return_value = self.__make_non_tail_call(method_def, tail_call)
+                break
+            obj_to_call_on, method_def, env = callee
+            if hooks is not None:
+                for hook in hooks.method_enter:
+                    hook(obj_to_call_on, method_def, env, tail_call[4])
+            status, return_value = obj_to_call_on.__execute_statement(
+                env, method_def.return_type, method_def.code
+            )
+            if hooks is not None:
+                for hook in hooks.method_exit:
+                    hook(obj_to_call_on, method_def, status)
+        self.interpreter.budget.call_depth -= 1
+        return self.__tail_call_result(method_def, return_type, status, return_value)
+
+    # each call costs a unit of fuel and a level of call depth (see limits.py); the caller gives the level back
+    # when the call returns (errors abort the run, so it needn't be restored then)
+    def __charge_call(self, line_num_of_caller):
+        budget = self.interpreter.budget
+        budget.ticks -= 1
+        if budget.ticks < 0:
+            budget.refill(line_num_of_caller)
+        budget.call_depth += 1
+        if budget.call_depth > budget.max_call_depth:
+            budget.call_depth_exceeded(line_num_of_caller)
+
+    # tail_call is the value of a STATUS_TAIL_CALL result from method_def's code. Returns the
+    # (obj_to_call_on, method_def, env) to run next in place of method_def, or None if the call can't be eliminated
+    # because the callee's return type isn't compatible with method_def's, so that its result must still be checked.
+    # An eliminated call costs a unit of fuel, but no call depth
+    def __prepare_tail_call(self, method_def, tail_call):
+        obj, method_name, actual_params, super_only, line_num, _ = tail_call
+        callee = obj.__prepare_method_call(
+            method_name, actual_params, super_only, line_num
+        )
+        if not self.interpreter.check_type_compatibility(
+            method_def.return_type, callee[1].return_type, True
+        ):
+            return None
+        budget = self.interpreter.budget
+        budget.ticks -= 1
+        if budget.ticks < 0:
+            budget.refill(line_num)
+        return callee
+
+    # runs a tail call as a regular call, then returns its result from method_def as (return expression) would
+    def __make_non_tail_call(self, method_def, tail_call):
+        obj, method_name, actual_params, super_only, line_num, _ = tail_call
+        status, return_value = obj.call_method(
+            method_name, actual_params, super_only, line_num
+        )
+        if status == ObjectDef.STATUS_RETURN:
+            return_value = self.__typed_return_value(
+                method_def.return_type, return_value, line_num
+            )
+        return status, return_value
+
+    # the result of a call whose tail calls were eliminated: method_def is the last method that ran, and
+    # return_type is the return type of the method that was originally called
+    def __tail_call_result(self, method_def, return_type, status, return_value):
+        status, return_value = self.__method_call_result(
+            method_def, status, return_value
+        )
+        if status == ObjectDef.STATUS_RETURN and return_value.is_null():
+            return_value = Value(return_type, None)  # propagate return type to null
+        return status, return_value
+
+    # finds the object part and MethodDef that a call dispatches to, and builds the environment holding the
+    # method's parameters; returns (obj_to_call_on, method_def, env)
+    def __prepare_method_call(
+        self, method_name, actual_params, super_only, line_num_of_caller
+    ):
         # check to see if we have a method in this class or its base class(es) matching this signature
         if self.__get_obj_with_method(self, method_name, actual_params) is None:
             self.interpreter.error(
@@ -89,10 +204,10 @@ class ObjectDef:
                     method_def.line_num,
                 )
             env.set(formal_copy.name, formal_copy)
-        # since each method has a single top-level statement, execute it.
-        status, return_value = obj_to_call_on.__execute_statement(
-            env, method_def.return_type, method_def.code
-        )
+        return obj_to_call_on, method_def, env
+
+    # maps the (status, value) produced by a method's top-level statement to the (status, value) of the call
+    def __method_call_result(self, method_def, status, return_value):
         # if the method explicitly used the (return expression) statement to return a value, then return that
         # value back to the caller
         if status == ObjectDef.STATUS_RETURN and return_value is not None:
@@ -109,6 +224,9 @@ class ObjectDef:
 
     def get_me_as_value(self):
         my_typename = self.class_def.class_source[1]
+        if self.__anchor_ref is not None:
+            # the value refers to this part, so it must keep the whole object alive
+            return PartValue(Type(my_typename), self, self.__anchor_ref())
         return Value(Type(my_typename), self)
 
     # checks whether each formal parameter has a compatible type with the actual parameter
@@ -126,8 +244,6 @@ class ObjectDef:
     #   return statement, and thus the next statement in the method should run normally
     # - return value is a value of type Value which is the returned value from the function
     def __execute_statement(self, env, return_type, code):
-        if self.trace_output:
-            print(f"{code[0].line_num}: {code}")
         tok = code[0]
         if tok == InterpreterBase.BEGIN_DEF:
             return self.__execute_begin(env, return_type, code)
@@ -177,6 +293,7 @@ class ObjectDef:
             if (
                 status == ObjectDef.STATUS_RETURN
                 or status == ObjectDef.STATUS_EXCEPTION
+                or status == ObjectDef.STATUS_TAIL_CALL
             ):
                 break
         # if we run thru the entire block without a return, then just return proceed
@@ -276,16 +393,33 @@ class ObjectDef:
         if len(code) == 1:
             # [return] with no return value; return default value for type
             return ObjectDef.STATUS_RETURN, None
-        else:
-            status, result = self.__evaluate_expression(env, code[1], code[0].line_num)
+        if id(code) in self.class_def.tail_call_returns:
+            # (return (call ...)) in tail position: evaluate the call's target and arguments here, but leave the
+            # call itself to call_method, which runs it without growing the stack
+            status, call_target = self.__evaluate_call_target(
+                env, code[1], code[0].line_num
+            )
             if status == ObjectDef.STATUS_EXCEPTION:
-                return status, result
-            if result.is_null():
-                result = Value(return_type, None)  # propagate return type to null
-        self.__check_type_compatibility(
-            return_type, result.type(), True, code[0].line_num
+                return status, call_target
+            return ObjectDef.STATUS_TAIL_CALL, self.__tail_call(code, call_target)
+        status, result = self.__evaluate_expression(env, code[1], code[0].line_num)
+        if status == ObjectDef.STATUS_EXCEPTION:
+            return status, result
+        return ObjectDef.STATUS_RETURN, self.__typed_return_value(
+            return_type, result, code[0].line_num
         )
-        return ObjectDef.STATUS_RETURN, result
+
+    # checks a value returned by (return expression) against the method's return type
+    def __typed_return_value(self, return_type, result, line_num):
+        if result.is_null():
+            result = Value(return_type, None)  # propagate return type to null
+        self.__check_type_compatibility(return_type, result.type(), True, line_num)
+        return result
+
+    # code is a (return (call ...)) statement and call_target the (obj, actual_params, super_only, anchor) it calls
+    def __tail_call(self, code, call_target):
+        obj, actual_params, super_only, anchor = call_target
+        return obj, code[1][2], actual_params, super_only, code[0].line_num, anchor
 
     # (print expression1 expression2 ...) where expresion could be a variable, value, or a (+ ...)
     def __execute_print(self, env, code):
@@ -309,11 +443,10 @@ class ObjectDef:
 
     # (inputs target_variable) or (inputi target_variable) sets target_variable to input string/int
     def __execute_input(self, env, code, get_string):
-        inp = self.interpreter.get_input()
         if get_string:
-            val = Value(ObjectDef.STRING_TYPE_CONST, inp)
+            val = Value(ObjectDef.STRING_TYPE_CONST, self.interpreter.get_input())
         else:
-            val = Value(ObjectDef.INT_TYPE_CONST, int(inp))
+            val = Value(ObjectDef.INT_TYPE_CONST, self.interpreter.get_int_input())
 
         self.__set_variable_aux(env, code[1], val, code[0].line_num)
         return ObjectDef.STATUS_PROCEED, None
@@ -341,7 +474,7 @@ class ObjectDef:
         if condition.type() != ObjectDef.BOOL_TYPE_CONST:
             self.interpreter.error(
                 ErrorType.TYPE_ERROR,
-                "non-boolean if condition " + ' '.join(x for x in code[1]),
+                "non-boolean if condition " + " ".join(x for x in code[1]),
                 code[0].line_num,
             )
         if condition.value():
@@ -360,6 +493,7 @@ class ObjectDef:
     # (while expression (statement) ) where expresion could be a boolean value, boolean member variable,
     # or a boolean expression in parens, like (> 5 a)
     def __execute_while(self, env, return_type, code):
+        budget = self.interpreter.budget
         while True:
             status, condition = self.__evaluate_expression(
                 env, code[1], code[0].line_num
@@ -369,16 +503,21 @@ class ObjectDef:
             if condition.type() != ObjectDef.BOOL_TYPE_CONST:
                 self.interpreter.error(
                     ErrorType.TYPE_ERROR,
-                    "non-boolean while condition " + ' '.join(x for x in code[1]),
+                    "non-boolean while condition " + " ".join(x for x in code[1]),
                     code[0].line_num,
                 )
             if not condition.value():  # condition is false, exit loop immediately
                 return ObjectDef.STATUS_PROCEED, None
+            # each iteration costs a unit of fuel (see limits.py)
+            budget.ticks -= 1
+            if budget.ticks < 0:
+                budget.refill(code[0].line_num)
             # condition is true, run body of while loop
             status, return_value = self.__execute_statement(env, return_type, code[2])
             if (
                 status == ObjectDef.STATUS_RETURN
                 or status == ObjectDef.STATUS_EXCEPTION
+                or status == ObjectDef.STATUS_TAIL_CALL
             ):
                 return (
                     status,
@@ -434,56 +573,8 @@ class ObjectDef:
             )
             if status2 == ObjectDef.STATUS_EXCEPTION:
                 return status2, operand2  # operand2 would be the thrown string
-            if (
-                operand1.type() == operand2.type()
-                and operand1.type() == ObjectDef.INT_TYPE_CONST
-            ):
-                if operator not in self.binary_ops[InterpreterBase.INT_DEF]:
-                    self.interpreter.error(
-                        ErrorType.TYPE_ERROR,
-                        "invalid operator applied to ints",
-                        line_num_of_statement,
-                    )
-                return ObjectDef.STATUS_PROCEED, self.binary_ops[
-                    InterpreterBase.INT_DEF
-                ][operator](operand1, operand2)
-            if (
-                operand1.type() == operand2.type()
-                and operand1.type() == ObjectDef.STRING_TYPE_CONST
-            ):
-                if operator not in self.binary_ops[InterpreterBase.STRING_DEF]:
-                    self.interpreter.error(
-                        ErrorType.TYPE_ERROR,
-                        "invalid operator applied to strings",
-                        line_num_of_statement,
-                    )
-                return ObjectDef.STATUS_PROCEED, self.binary_ops[
-                    InterpreterBase.STRING_DEF
-                ][operator](operand1, operand2)
-            if (
-                operand1.type() == operand2.type()
-                and operand1.type() == ObjectDef.BOOL_TYPE_CONST
-            ):
-                if operator not in self.binary_ops[InterpreterBase.BOOL_DEF]:
-                    self.interpreter.error(
-                        ErrorType.TYPE_ERROR,
-                        "invalid operator applied to bool",
-                        line_num_of_statement,
-                    )
-                return ObjectDef.STATUS_PROCEED, self.binary_ops[
-                    InterpreterBase.BOOL_DEF
-                ][operator](operand1, operand2)
-            # handle object reference comparisons last
-            if self.interpreter.check_type_compatibility(
-                operand1.type(), operand2.type(), False
-            ):
-                return ObjectDef.STATUS_PROCEED, self.binary_ops[
-                    InterpreterBase.CLASS_DEF
-                ][operator](operand1, operand2)
-            self.interpreter.error(
-                ErrorType.TYPE_ERROR,
-                f"operator {operator} applied to two incompatible types",
-                line_num_of_statement,
+            return ObjectDef.STATUS_PROCEED, self.__apply_binary_op(
+                operator, operand1, operand2, line_num_of_statement
             )
         if operator in self.unary_op_list:
             status, operand = self.__evaluate_expression(
@@ -492,15 +583,9 @@ class ObjectDef:
             if status == ObjectDef.STATUS_EXCEPTION:
                 return status, operand  # operand would be the thrown string
             if operand.type() == ObjectDef.BOOL_TYPE_CONST:
-                if operator not in self.unary_ops[InterpreterBase.BOOL_DEF]:
-                    self.interpreter.error(
-                        ErrorType.TYPE_ERROR,
-                        "invalid unary operator applied to bool",
-                        line_num_of_statement,
-                    )
-                return ObjectDef.STATUS_PROCEED, self.unary_ops[
-                    InterpreterBase.BOOL_DEF
-                ][operator](operand)
+                return ObjectDef.STATUS_PROCEED, self.__apply_unary_op(
+                    operator, operand, line_num_of_statement
+                )
 
         # handle call expression: (call objref methodname p1 p2 p3)
         if operator == InterpreterBase.CALL_DEF:
@@ -513,6 +598,70 @@ class ObjectDef:
                 env, expr, line_num_of_statement
             )
 
+    # applies a binary operator to two already-evaluated operands, returning the resulting Value
+    def __apply_binary_op(self, operator, operand1, operand2, line_num_of_statement):
+        if (
+            operand1.type() == operand2.type()
+            and operand1.type() == ObjectDef.INT_TYPE_CONST
+        ):
+            if operator not in self.binary_ops[InterpreterBase.INT_DEF]:
+                self.interpreter.error(
+                    ErrorType.TYPE_ERROR,
+                    "invalid operator applied to ints",
+                    line_num_of_statement,
+                )
+            return self.binary_ops[InterpreterBase.INT_DEF][operator](
+                operand1, operand2
+            )
+        if (
+            operand1.type() == operand2.type()
+            and operand1.type() == ObjectDef.STRING_TYPE_CONST
+        ):
+            if operator not in self.binary_ops[InterpreterBase.STRING_DEF]:
+                self.interpreter.error(
+                    ErrorType.TYPE_ERROR,
+                    "invalid operator applied to strings",
+                    line_num_of_statement,
+                )
+            return self.binary_ops[InterpreterBase.STRING_DEF][operator](
+                operand1, operand2
+            )
+        if (
+            operand1.type() == operand2.type()
+            and operand1.type() == ObjectDef.BOOL_TYPE_CONST
+        ):
+            if operator not in self.binary_ops[InterpreterBase.BOOL_DEF]:
+                self.interpreter.error(
+                    ErrorType.TYPE_ERROR,
+                    "invalid operator applied to bool",
+                    line_num_of_statement,
+                )
+            return self.binary_ops[InterpreterBase.BOOL_DEF][operator](
+                operand1, operand2
+            )
+        # handle object reference comparisons last
+        if self.interpreter.check_type_compatibility(
+            operand1.type(), operand2.type(), False
+        ):
+            return self.binary_ops[InterpreterBase.CLASS_DEF][operator](
+                operand1, operand2
+            )
+        self.interpreter.error(
+            ErrorType.TYPE_ERROR,
+            f"operator {operator} applied to two incompatible types",
+            line_num_of_statement,
+        )
+
+    # applies a unary operator to an already-evaluated boolean operand, returning the resulting Value
+    def __apply_unary_op(self, operator, operand, line_num_of_statement):
+        if operator not in self.unary_ops[InterpreterBase.BOOL_DEF]:
+            self.interpreter.error(
+                ErrorType.TYPE_ERROR,
+                "invalid unary operator applied to bool",
+                line_num_of_statement,
+            )
+        return self.unary_ops[InterpreterBase.BOOL_DEF][operator](operand)
+
     # (new classname)                     -- for instantiation of regular classes
     # (new classname@type1@type2@type3)   -- for instantiation of templated classes
     def __execute_new_aux(self, _, code, line_num_of_statement):
@@ -523,8 +672,23 @@ class ObjectDef:
     # this method is a helper used by call statements and call expressions
     # (call object_ref/me methodname p1 p2 p3)
     def __execute_call_aux(self, env, code, line_num_of_statement):
+        status, call_target = self.__evaluate_call_target(
+            env, code, line_num_of_statement
+        )
+        if status == ObjectDef.STATUS_EXCEPTION:
+            return status, call_target
+        # anchor keeps the object alive during the call (see __evaluate_call_target)
+        obj, actual_args, super_only, anchor = call_target
+        return obj.call_method(code[2], actual_args, super_only, line_num_of_statement)
+
+    # evaluates the object reference and the arguments of (call object_ref/me methodname p1 p2 p3), returning
+    # a (status, value) tuple whose value is (obj, actual_args, super_only, anchor) unless an exception was thrown.
+    # If the object reference is a PartValue, obj is a superclass part, which only holds a weak reference to its
+    # object, and anchor is the object, which the caller must keep referring to until the call ends; else it's None
+    def __evaluate_call_target(self, env, code, line_num_of_statement):
         # determine which object we want to call the method on
         super_only = False
+        anchor = None
         obj_name = code[1]
         if obj_name == InterpreterBase.ME_DEF:
             obj = self
@@ -550,6 +714,8 @@ class ObjectDef:
                     ErrorType.FAULT_ERROR, "null dereference", line_num_of_statement
                 )
             obj = obj_val.value()
+            if type(obj_val) is PartValue:
+                anchor = obj_val.anchor
         # prepare the actual arguments for passing
         actual_args = []
         for expr in code[3:]:
@@ -559,7 +725,322 @@ class ObjectDef:
             if status == ObjectDef.STATUS_EXCEPTION:
                 return status, actual_arg
             actual_args.append(actual_arg)
-        return obj.call_method(code[2], actual_args, super_only, line_num_of_statement)
+        return ObjectDef.STATUS_PROCEED, (obj, actual_args, super_only, anchor)
+
+    # The methods below implement the explicit-stack evaluator (see evalstackv3.py). They mirror the recursive
+    # evaluator above, but rather than recursing into nested statements, expressions and calls they yield them to
+    # the interpreter's EvalStack. Code that contains no method call can't run Brewin methods, so it is passed
+    # straight to the recursive evaluator and its (status, value) result is yielded as-is.
+
+    # returns a generator that runs the method; push it onto an EvalStack to run it. hooks is as in call_method()
+    def start_method(
+        self, method_name, actual_params, super_only, line_num_of_caller, hooks=None
+    ):
+        return self.__stack_call_method(
+            method_name, actual_params, super_only, line_num_of_caller, hooks
+        )
+
+    def __stack_call_method(
+        self, method_name, actual_params, super_only, line_num_of_caller, hooks
+    ):
+        obj_to_call_on, method_def, env = self.__prepare_method_call(
+            method_name, actual_params, super_only, line_num_of_caller
+        )
+        self.__charge_call(line_num_of_caller)
+        if hooks is not None:
+            for hook in hooks.method_enter:
+                hook(obj_to_call_on, method_def, env, line_num_of_caller)
+        status, return_value = yield obj_to_call_on.__stack_statement(
+            env, method_def.return_type, method_def.code
+        )
+        if hooks is not None:
+            for hook in hooks.method_exit:
+                hook(obj_to_call_on, method_def, status)
+        if status != ObjectDef.STATUS_TAIL_CALL:
+            self.interpreter.budget.call_depth -= 1
+            return self.__method_call_result(method_def, status, return_value)
+
+        return_type = method_def.return_type
+        while status == ObjectDef.STATUS_TAIL_CALL:
+            tail_call = return_value
+            callee = self.__prepare_tail_call(method_def, tail_call)
+            if callee is None:
+                obj, method_name, actual_params, super_only, line_num, _ = tail_call
+                status, return_value = yield obj.start_method(
+                    method_name, actual_params, super_only, line_num
+                )
+                if status == ObjectDef.STATUS_RETURN:
+                    return_value = self.__typed_return_value(
+                        method_def.return_type, return_value, line_num
+                    )
+                break
+            obj_to_call_on, method_def, env = callee
+            if hooks is not None:
+                for hook in hooks.method_enter:
+                    hook(obj_to_call_on, method_def, env, tail_call[4])
+            status, return_value = yield obj_to_call_on.__stack_statement(
+                env, method_def.return_type, method_def.code
+            )
+            if hooks is not None:
+                for hook in hooks.method_exit:
+                    hook(obj_to_call_on, method_def, status)
+        self.interpreter.budget.call_depth -= 1
+        return self.__tail_call_result(method_def, return_type, status, return_value)
+
+    # returns either a (status, value) tuple or a generator producing one
+    def __stack_statement(self, env, return_type, code):
+        if not self.class_def.contains_call(code):
+            return self.__execute_statement(env, return_type, code)
+        tok = code[0]
+        if tok == InterpreterBase.BEGIN_DEF:
+            return self.__stack_begin(env, return_type, code)
+        elif tok == InterpreterBase.SET_DEF:
+            return self.__stack_set(env, code)
+        elif tok == InterpreterBase.IF_DEF:
+            return self.__stack_if(env, return_type, code)
+        elif tok == InterpreterBase.CALL_DEF:
+            return self.__stack_call(env, code)
+        elif tok == InterpreterBase.WHILE_DEF:
+            return self.__stack_while(env, return_type, code)
+        elif tok == InterpreterBase.RETURN_DEF:
+            return self.__stack_return(env, return_type, code)
+        elif tok == InterpreterBase.PRINT_DEF:
+            return self.__stack_print(env, code)
+        elif tok == InterpreterBase.LET_DEF:
+            return self.__stack_begin(env, return_type, code, True)
+        elif tok == InterpreterBase.THROW_DEF:
+            return self.__stack_throw(env, code)
+        elif tok == InterpreterBase.TRY_DEF:
+            return self.__stack_try(env, return_type, code)
+        else:
+            # Report error via interpreter
+            self.interpreter.error(
+                ErrorType.SYNTAX_ERROR, "unknown statement " + tok, tok.line_num
+            )
+
+    def __stack_begin(self, env, return_type, code, has_vardef=False):
+        if has_vardef:
+            code_start = 2
+            env.block_nest()
+            self.__add_locals_to_env(env, code[1], code[0].line_num)
+        else:
+            code_start = 1
+
+        status = ObjectDef.STATUS_PROCEED
+        return_value = None
+        for statement in code[code_start:]:
+            status, return_value = yield self.__stack_statement(
+                env, return_type, statement
+            )
+            if (
+                status == ObjectDef.STATUS_RETURN
+                or status == ObjectDef.STATUS_EXCEPTION
+                or status == ObjectDef.STATUS_TAIL_CALL
+            ):
+                break
+        if has_vardef:
+            env.block_unnest()
+        return status, return_value
+
+    def __stack_try(self, env, return_type, code):
+        status, return_value = yield self.__stack_statement(env, return_type, code[1])
+        if status == ObjectDef.STATUS_RETURN:
+            return status, return_value
+        if status == ObjectDef.STATUS_PROCEED:
+            return status, None
+        # exception thrown!
+        env.block_nest()
+        self.__add_exception_string_to_env(env, return_value)
+        status, return_value = yield self.__stack_statement(env, return_type, code[2])
+        env.block_unnest()
+        return status, return_value
+
+    def __stack_throw(self, env, code):
+        status, thrown_str = yield self.__stack_expression(
+            env, code[1], code[0].line_num
+        )
+        if thrown_str.t != ObjectDef.STRING_TYPE_CONST:
+            self.interpreter.error(
+                ErrorType.TYPE_ERROR, "non-string thrown on line", code[0].line_num
+            )
+        return ObjectDef.STATUS_EXCEPTION, thrown_str
+
+    def __stack_call(self, env, code):
+        status, return_value = yield self.__stack_call_aux(env, code, code[0].line_num)
+        if status == ObjectDef.STATUS_RETURN:
+            return ObjectDef.STATUS_PROCEED, return_value
+        return status, return_value
+
+    def __stack_set(self, env, code):
+        status, val = yield self.__stack_expression(env, code[2], code[0].line_num)
+        if status == ObjectDef.STATUS_EXCEPTION:
+            return status, val
+        self.__set_variable_aux(env, code[1], val, code[0].line_num)
+        return ObjectDef.STATUS_PROCEED, None
+
+    def __stack_return(self, env, return_type, code):
+        if id(code) in self.class_def.tail_call_returns:
+            status, call_target = yield self.__stack_call_target(
+                env, code[1], code[0].line_num
+            )
+            if status == ObjectDef.STATUS_EXCEPTION:
+                return status, call_target
+            return ObjectDef.STATUS_TAIL_CALL, self.__tail_call(code, call_target)
+        status, result = yield self.__stack_expression(env, code[1], code[0].line_num)
+        if status == ObjectDef.STATUS_EXCEPTION:
+            return status, result
+        return ObjectDef.STATUS_RETURN, self.__typed_return_value(
+            return_type, result, code[0].line_num
+        )
+
+    def __stack_print(self, env, code):
+        output = ""
+        for expr in code[1:]:
+            status, term = yield self.__stack_expression(env, expr, code[0].line_num)
+            if status == ObjectDef.STATUS_EXCEPTION:
+                return status, term
+            val = term.value()
+            if term.type() == ObjectDef.BOOL_TYPE_CONST:
+                val = "true" if val else "false"
+            output += str(val)
+        self.interpreter.output(output)
+        return ObjectDef.STATUS_PROCEED, None
+
+    def __stack_if(self, env, return_type, code):
+        status, condition = yield self.__stack_expression(
+            env, code[1], code[0].line_num
+        )
+        if status == ObjectDef.STATUS_EXCEPTION:
+            return status, condition
+        if condition.type() != ObjectDef.BOOL_TYPE_CONST:
+            self.interpreter.error(
+                ErrorType.TYPE_ERROR,
+                "non-boolean if condition " + " ".join(x for x in code[1]),
+                code[0].line_num,
+            )
+        if condition.value():
+            return (yield self.__stack_statement(env, return_type, code[2]))
+        elif len(code) == 4:
+            return (yield self.__stack_statement(env, return_type, code[3]))
+        return ObjectDef.STATUS_PROCEED, None
+
+    def __stack_while(self, env, return_type, code):
+        budget = self.interpreter.budget
+        while True:
+            status, condition = yield self.__stack_expression(
+                env, code[1], code[0].line_num
+            )
+            if status == ObjectDef.STATUS_EXCEPTION:
+                return status, condition
+            if condition.type() != ObjectDef.BOOL_TYPE_CONST:
+                self.interpreter.error(
+                    ErrorType.TYPE_ERROR,
+                    "non-boolean while condition " + " ".join(x for x in code[1]),
+                    code[0].line_num,
+                )
+            if not condition.value():  # condition is false, exit loop immediately
+                return ObjectDef.STATUS_PROCEED, None
+            budget.ticks -= 1
+            if budget.ticks < 0:
+                budget.refill(code[0].line_num)
+            status, return_value = yield self.__stack_statement(
+                env, return_type, code[2]
+            )
+            if (
+                status == ObjectDef.STATUS_RETURN
+                or status == ObjectDef.STATUS_EXCEPTION
+                or status == ObjectDef.STATUS_TAIL_CALL
+            ):
+                return status, return_value
+
+    # returns either a (status, value) tuple or a generator producing one
+    def __stack_expression(self, env, expr, line_num_of_statement):
+        if not self.class_def.contains_call(expr):
+            return self.__evaluate_expression(env, expr, line_num_of_statement)
+        if expr[0] == InterpreterBase.CALL_DEF:
+            return self.__stack_call_aux(env, expr, line_num_of_statement)
+        return self.__stack_operator(env, expr, line_num_of_statement)
+
+    # an operator expression, e.g. (+ 1 (call me foo)), with a call among its operands
+    def __stack_operator(self, env, expr, line_num_of_statement):
+        operator = expr[0]
+        if operator in self.binary_op_list:
+            status1, operand1 = yield self.__stack_expression(
+                env, expr[1], line_num_of_statement
+            )
+            if status1 == ObjectDef.STATUS_EXCEPTION:
+                return status1, operand1
+            status2, operand2 = yield self.__stack_expression(
+                env, expr[2], line_num_of_statement
+            )
+            if status2 == ObjectDef.STATUS_EXCEPTION:
+                return status2, operand2
+            return ObjectDef.STATUS_PROCEED, self.__apply_binary_op(
+                operator, operand1, operand2, line_num_of_statement
+            )
+        if operator in self.unary_op_list:
+            status, operand = yield self.__stack_expression(
+                env, expr[1], line_num_of_statement
+            )
+            if status == ObjectDef.STATUS_EXCEPTION:
+                return status, operand
+            if operand.type() == ObjectDef.BOOL_TYPE_CONST:
+                return ObjectDef.STATUS_PROCEED, self.__apply_unary_op(
+                    operator, operand, line_num_of_statement
+                )
+        return None
+
+    def __stack_call_aux(self, env, code, line_num_of_statement):
+        status, call_target = yield self.__stack_call_target(
+            env, code, line_num_of_statement
+        )
+        if status == ObjectDef.STATUS_EXCEPTION:
+            return status, call_target
+        obj, actual_args, super_only, anchor = call_target
+        return (
+            yield obj.start_method(
+                code[2], actual_args, super_only, line_num_of_statement
+            )
+        )
+
+    def __stack_call_target(self, env, code, line_num_of_statement):
+        super_only = False
+        anchor = None
+        obj_name = code[1]
+        if obj_name == InterpreterBase.ME_DEF:
+            obj = self
+        elif obj_name == InterpreterBase.SUPER_DEF:
+            if not self.super_object:
+                self.interpreter.error(
+                    ErrorType.TYPE_ERROR,
+                    "invalid call to super object by class "
+                    + self.class_def.get_name(),
+                    line_num_of_statement,
+                )
+            obj = self.super_object
+            super_only = True
+        else:
+            status, obj_val = yield self.__stack_expression(
+                env, obj_name, line_num_of_statement
+            )
+            if status == ObjectDef.STATUS_EXCEPTION:
+                return status, obj_val
+            if obj_val.is_null():
+                self.interpreter.error(
+                    ErrorType.FAULT_ERROR, "null dereference", line_num_of_statement
+                )
+            obj = obj_val.value()
+            if type(obj_val) is PartValue:
+                anchor = obj_val.anchor
+        actual_args = []
+        for expr in code[3:]:
+            status, actual_arg = yield self.__stack_expression(
+                env, expr, line_num_of_statement
+            )
+            if status == ObjectDef.STATUS_EXCEPTION:
+                return status, actual_arg
+            actual_args.append(actual_arg)
+        return ObjectDef.STATUS_PROCEED, (obj, actual_args, super_only, anchor)
 
     def __map_method_names_to_method_definitions(self):
         self.methods = {}
@@ -634,7 +1115,9 @@ class ObjectDef:
             "<=": lambda a, b: Value(ObjectDef.BOOL_TYPE_CONST, a.value() <= b.value()),
         }
         self.binary_ops[InterpreterBase.STRING_DEF] = {
-            "+": lambda a, b: Value(ObjectDef.STRING_TYPE_CONST, a.value() + b.value()),
+            "+": lambda a, b: Value(
+                ObjectDef.STRING_TYPE_CONST, concat_strings(a.v, b.v)
+            ),  # a.v and b.v may be StringRopes; don't flatten them
             "==": lambda a, b: Value(ObjectDef.BOOL_TYPE_CONST, a.value() == b.value()),
             "!=": lambda a, b: Value(ObjectDef.BOOL_TYPE_CONST, a.value() != b.value()),
             ">": lambda a, b: Value(ObjectDef.BOOL_TYPE_CONST, a.value() > b.value()),
@@ -664,6 +1147,151 @@ class ObjectDef:
             self.super_object = None
             return
 
-        self.super_object = ObjectDef(
-            self.interpreter, superclass_def, self.anchor_object, self.trace_output
+        self.super_object = type(self)(
+            self.interpreter, superclass_def, self.anchor_object
+        )
+
+
+# An ObjectDef that reports events to the interpreter's instrumentation (see instrumentation.py). The interpreter
+# only creates these when instrumentation is present, so plain ObjectDefs don't check for hooks at all.
+# It overrides ObjectDef's private methods by their mangled names.
+class InstrumentedObjectDef(ObjectDef):
+    def _ObjectDef__execute_statement(self, env, return_type, code):
+        for hook in self.interpreter.hooks.statement:
+            hook(self, code)
+        return super()._ObjectDef__execute_statement(env, return_type, code)
+
+    def _ObjectDef__stack_statement(self, env, return_type, code):
+        # statements without calls are passed on to __execute_statement, which reports them
+        if self.class_def.contains_call(code):
+            for hook in self.interpreter.hooks.statement:
+                hook(self, code)
+        return super()._ObjectDef__stack_statement(env, return_type, code)
+
+    def _ObjectDef__evaluate_expression(self, env, expr, line_num_of_statement):
+        for hook in self.interpreter.hooks.expression:
+            hook(self, expr)
+        return super()._ObjectDef__evaluate_expression(env, expr, line_num_of_statement)
+
+    def _ObjectDef__stack_expression(self, env, expr, line_num_of_statement):
+        # expressions without calls are passed on to __evaluate_expression, which reports them
+        if self.class_def.contains_call(expr):
+            for hook in self.interpreter.hooks.expression:
+                hook(self, expr)
+        return super()._ObjectDef__stack_expression(env, expr, line_num_of_statement)
+
+    def _ObjectDef__get_obj_with_method(self, start_obj, method_name, actual_params):
+        found = super()._ObjectDef__get_obj_with_method(
+            start_obj, method_name, actual_params
+        )
+        steps = 0
+        cur_obj = start_obj
+        while cur_obj is not found:
+            cur_obj = cur_obj.super_object
+            steps += 1
+        for hook in self.interpreter.hooks.method_lookup:
+            hook(self, method_name, steps)
+        return found
+
+    # calls pass the interpreter's hooks on to ObjectDef's call protocol, which reports method enter and exit
+    def call_method(
+        self, method_name, actual_params, super_only, line_num_of_caller, hooks=None
+    ):
+        return super().call_method(
+            method_name,
+            actual_params,
+            super_only,
+            line_num_of_caller,
+            self.interpreter.hooks,
+        )
+
+    def start_method(
+        self, method_name, actual_params, super_only, line_num_of_caller, hooks=None
+    ):
+        return super().start_method(
+            method_name,
+            actual_params,
+            super_only,
+            line_num_of_caller,
+            self.interpreter.hooks,
         )
+
+    def _ObjectDef__execute_throw(self, env, code):
+        status, thrown_str = super()._ObjectDef__execute_throw(env, code)
+        for hook in self.interpreter.hooks.throw:
+            hook(self, thrown_str, code[0].line_num)
+        return status, thrown_str
+
+    def _ObjectDef__stack_throw(self, env, code):
+        status, thrown_str = yield super()._ObjectDef__stack_throw(env, code)
+        for hook in self.interpreter.hooks.throw:
+            hook(self, thrown_str, code[0].line_num)
+        return status, thrown_str
+
+    def _ObjectDef__add_exception_string_to_env(self, env, except_str):
+        for hook in self.interpreter.hooks.catch:
+            hook(self, except_str)
+        super()._ObjectDef__add_exception_string_to_env(env, except_str)
+
+
+# An ObjectDef for resumable runs, which an EvalStack runs a bounded number of steps at a time (see
+# EvalStack.run_steps()). Besides the code that contains calls, it runs loops and input statements on the explicit
+# stack (see ClassDef.may_suspend()), so a run always reaches its next step soon, and its input statements yield an
+# InputRequest to whoever drives the stack rather than reading input themselves.
+class ResumableObjectDef(ObjectDef):
+    def _ObjectDef__stack_statement(self, env, return_type, code):
+        class_def = self.class_def
+        if class_def.contains_call(code) or not class_def.may_suspend(code):
+            return super()._ObjectDef__stack_statement(env, return_type, code)
+        # a statement without calls that is or holds a loop or an input statement; ObjectDef would pass it on to
+        # __execute_statement, so it's reported here
+        hooks = self.interpreter.hooks
+        if hooks is not None:
+            for hook in hooks.statement:
+                hook(self, code)
+        tok = code[0]
+        if tok == InterpreterBase.WHILE_DEF:
+            return self._ObjectDef__stack_while(env, return_type, code)
+        elif tok == InterpreterBase.INPUT_STRING_DEF:
+            return self.__stack_input(env, code, True)
+        elif tok == InterpreterBase.INPUT_INT_DEF:
+            return self.__stack_input(env, code, False)
+        elif tok == InterpreterBase.BEGIN_DEF:
+            return self._ObjectDef__stack_begin(env, return_type, code)
+        elif tok == InterpreterBase.LET_DEF:
+            return self._ObjectDef__stack_begin(env, return_type, code, True)
+        elif tok == InterpreterBase.IF_DEF:
+            return self._ObjectDef__stack_if(env, return_type, code)
+        return self._ObjectDef__stack_try(env, return_type, code)
+
+    def __stack_input(self, env, code, get_string):
+        if get_string:
+            val = Value(ObjectDef.STRING_TYPE_CONST, (yield INPUT_STRING_REQUEST))
+        else:
+            val = Value(ObjectDef.INT_TYPE_CONST, (yield INPUT_INT_REQUEST))
+        self._ObjectDef__set_variable_aux(env, code[1], val, code[0].line_num)
+        return ObjectDef.STATUS_PROCEED, None
+
+
+class ResumableInstrumentedObjectDef(ResumableObjectDef, InstrumentedObjectDef):
+    pass
+
+
+# yields the objects reachable from obj (the most derived part of an object) through the fields of their parts, each
+# once and obj first; an object that a field refers to by one of its superclass parts is yielded as a whole
+def reachable_objects(obj):
+    seen = {id(obj)}
+    pending = [obj]
+    while pending:
+        obj = pending.pop()
+        yield obj
+        part = obj
+        while part is not None:
+            for var_def in part.fields.values():
+                target = var_def.value.v
+                if isinstance(target, ObjectDef):
+                    target = target.anchor_object
+                    if id(target) not in seen:
+                        seen.add(id(target))
+                        pending.append(target)
+            part = part.super_object
@@ -0,0 +1,478 @@
+"""
+Module that contains profilers for Brewin programs.
+
+SamplingProfiler periodically samples the Brewin call stack of a running interpreter from a background thread and
+attributes the elapsed time to Brewin methods and source lines:
+
+    interpreter = interpreterv3.Interpreter()
+    with SamplingProfiler(interpreter) as prof:
+        interpreter.run(program)
+    print(prof.report())
+
+The interpreter itself is not instrumented: the sampler reconstructs the Brewin stack from the Python frames of
+ObjectDef.call_method and ObjectDef.__execute_statement (or, with explicit_stack=True, from the generators on the
+interpreter's EvalStack), so a program that isn't being profiled runs at full speed.
+
+CallTracer (version 3 only) instead records every Brewin method call and return, with the class, method, argument
+types, caller line and a monotonic timestamp, in a ring buffer; the trace can be exported in the Chrome trace-event
+format (viewable in chrome://tracing or Perfetto), and a call graph with call counts is kept for the whole run:
+
+    tracer = CallTracer()
+    interpreter = interpreterv3.Interpreter(instrumentation=[tracer])
+    interpreter.run(program)
+    tracer.write_chrome_trace("trace.json")
+
+HeapProfiler (version 3 only) keeps track of the objects a program creates: how many objects each (new ...) site
+allocated, and snapshots of the objects still alive, with their estimated size, per class:
+
+    heap = HeapProfiler()
+    interpreterv3.Interpreter(instrumentation=[heap]).run(program)
+    print(heap.end_snapshot.report())
+
+Line numbers are reported the same way the interpreter reports them in errors.
+
+usage: python profiler.py program.brewin [--version N] [--interval SECONDS] [--collapsed FILE]
+       python profiler.py program.brewin --trace FILE [--call-graph FILE]
+       python profiler.py program.brewin --metrics
+       python profiler.py program.brewin --heap
+"""
+
+import argparse
+import gc
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import deque, namedtuple
+
+from instrumentation import Instrumentation
+from limits import object_bytes
+
+# names of the Python functions whose frames correspond to a Brewin method call, and to a Brewin statement (whose
+# "code" local is the statement being run)
+METHOD_FUNCTIONS = {"call_method", "__stack_call_method"}
+STATEMENT_FUNCTIONS = {
+    "__execute_statement",
+    "__stack_begin",
+    "__stack_try",
+    "__stack_throw",
+    "__stack_call",
+    "__stack_set",
+    "__stack_return",
+    "__stack_print",
+    "__stack_if",
+    "__stack_while",
+}
+OBJECT_MODULES = ("objectv1", "objectv2", "objectv3")
+
+
+class SamplingProfiler:
+    DEFAULT_INTERVAL = 0.005  # seconds between samples
+
+    def __init__(self, interpreter, interval=DEFAULT_INTERVAL):
+        self.interpreter = interpreter
+        self.interval = interval
+        # stack (tuple of (method label, line), outermost first) -> seconds
+        self.samples = {}
+        self.sample_count = 0
+        self.__method_codes, self.__statement_codes = self.__find_code_objects()
+        self.__thread = None
+        self.__target_thread_id = None
+        self.__stop_event = threading.Event()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.stop()
+
+    def start(self):
+        """Start sampling the calling thread (which should then run the interpreter)."""
+        self.__target_thread_id = threading.get_ident()
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__sample_loop, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop_event.set()
+        self.__thread.join()
+
+    # ---- results ----
+
+    def method_times(self):
+        """Returns {"class.method": (self_seconds, cumulative_seconds)}."""
+        return self.__flat_and_cumulative(lambda frame: frame[0])
+
+    def line_times(self):
+        """
+        Returns {line number: (self_seconds, cumulative_seconds)}; time spent setting up a call, before its first
+        statement starts, is attributed to line None.
+        """
+        return self.__flat_and_cumulative(lambda frame: frame[1])
+
+    def collapsed_stacks(self, with_lines=False):
+        """
+        Returns the samples in the "collapsed stack" format read by flamegraph tools: one line per distinct stack,
+        e.g. "main.main;main.fact;main.fact 1520", with the time in microseconds.
+        """
+        merged = {}
+        for stack, seconds in self.samples.items():
+            if with_lines:
+                key = ";".join(f"{label}:{line}" for label, line in stack)
+            else:
+                key = ";".join(label for label, _ in stack)
+            merged[key] = merged.get(key, 0) + seconds
+        return "".join(
+            f"{key} {round(seconds * 1e6)}\n" for key, seconds in sorted(merged.items())
+        )
+
+    def report(self, limit=20):
+        """Returns a human-readable report of the methods and lines with the most time."""
+        total = sum(self.samples.values())
+        lines = [f"{self.sample_count} samples, {total:.3f}s sampled"]
+        for title, times in (
+            ("method", self.method_times()),
+            ("line", self.line_times()),
+        ):
+            lines.append("")
+            lines.append(
+                f"{'self s':>9} {'self %':>7} {'cum s':>9} {'cum %':>7}  {title}"
+            )
+            ranked = sorted(times.items(), key=lambda item: item[1], reverse=True)
+            for key, (flat, cumulative) in ranked[:limit]:
+                lines.append(
+                    f"{flat:9.3f} {self.__percent(flat, total):6.1f}% "
+                    f"{cumulative:9.3f} {self.__percent(cumulative, total):6.1f}%  {key}"
+                )
+        return "\n".join(lines)
+
+    # ---- sampling ----
+
+    def __sample_loop(self):
+        last = time.perf_counter()
+        while not self.__stop_event.wait(self.interval):
+            now = time.perf_counter()
+            stack = self.__sample_stack()
+            if stack:
+                self.samples[stack] = self.samples.get(stack, 0) + (now - last)
+                self.sample_count += 1
+            last = now
+
+    # returns the current Brewin stack of the target thread as a tuple of (method label, line), outermost first
+    def __sample_stack(self):
+        frame = sys._current_frames().get(self.__target_thread_id)
+        python_frames = []
+        while frame is not None:
+            python_frames.append(frame)
+            frame = frame.f_back
+        python_frames.reverse()
+
+        eval_stack = getattr(self.interpreter, "eval_stack", None)
+        if eval_stack is not None and eval_stack.frames:
+            # explicit-stack evaluation: the pending Brewin frames are suspended generators on the EvalStack; the
+            # running one (the last) is also on the Python stack, above EvalStack.run
+            for pos, python_frame in enumerate(python_frames):
+                if (
+                    python_frame.f_code.co_name == "run"
+                    and python_frame.f_locals.get("self") is eval_stack
+                ):
+                    pending = [gen.gi_frame for gen in list(eval_stack.frames)[:-1]]
+                    running = python_frames[pos + 1 :]
+                    python_frames = [f for f in pending if f is not None] + running
+                    break
+
+        stack = []
+        for python_frame in python_frames:
+            code = python_frame.f_code
+            if code in self.__method_codes:
+                stack.append([self.__method_label(python_frame.f_locals), None])
+            elif code in self.__statement_codes and stack:
+                statement = python_frame.f_locals.get("code")
+                if statement:
+                    stack[-1][1] = getattr(statement[0], "line_num", None)
+        return tuple((label, line) for label, line in stack)
+
+    @staticmethod
+    def __method_label(f_locals):
+        obj = f_locals.get("obj_to_call_on") or f_locals.get("self")
+        method_def = f_locals.get("method_def")
+        if method_def is not None:
+            method_name = method_def.method_name
+        else:
+            method_name = f_locals.get("method_name")
+        class_name = obj.class_def.name if obj is not None else "?"
+        return f"{class_name}.{method_name}"
+
+    @staticmethod
+    def __find_code_objects():
+        method_codes = set()
+        statement_codes = set()
+        for module_name in OBJECT_MODULES:
+            module = sys.modules.get(module_name)
+            if module is None:
+                continue
+            for attr in vars(module.ObjectDef).values():
+                code = getattr(attr, "__code__", None)
+                if code is None:
+                    continue
+                if code.co_name in METHOD_FUNCTIONS:
+                    method_codes.add(code)
+                elif code.co_name in STATEMENT_FUNCTIONS:
+                    statement_codes.add(code)
+        return method_codes, statement_codes
+
+    def __flat_and_cumulative(self, key_of):
+        flat = {}
+        cumulative = {}
+        for stack, seconds in self.samples.items():
+            innermost = key_of(stack[-1])
+            flat[innermost] = flat.get(innermost, 0) + seconds
+            for key in {key_of(frame) for frame in stack}:
+                cumulative[key] = cumulative.get(key, 0) + seconds
+        return {key: (flat.get(key, 0), cumulative[key]) for key in cumulative}
+
+    @staticmethod
+    def __percent(part, total):
+        return 100 * part / total if total else 0
+
+
+# a CallTracer record: phase is "B" when the call starts and "E" when it ends; timestamp is in nanoseconds
+CallRecord = namedtuple(
+    "CallRecord",
+    ["phase", "timestamp", "class_name", "method_name", "arg_types", "caller_line"],
+)
+
+
+class CallTracer(Instrumentation):
+    DEFAULT_CAPACITY = 1 << 20  # records kept; older records are dropped first
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.records = deque(maxlen=capacity)
+        # ("class.method" of the caller, or None for main, "class.method" of the callee) -> number of calls
+        self.call_graph = {}
+        self.__active = []  # the "B" record of each call in progress, outermost first
+        self.__tail_caller = None  # label of a method that just ended in a tail call
+
+    # obj is the object part that defines method_def
+    def method_enter(self, obj, method_def, env, line_num_of_caller):
+        arg_types = tuple(
+            env.get(param.name).value.type().type_name
+            for param in method_def.formal_params
+        )
+        record = CallRecord(
+            "B",
+            time.perf_counter_ns(),
+            obj.class_def.name,
+            method_def.method_name,
+            arg_types,
+            line_num_of_caller,
+        )
+        self.records.append(record)
+        if self.__tail_caller is not None:
+            caller = self.__tail_caller
+            self.__tail_caller = None
+        elif self.__active:
+            caller = self.__label(self.__active[-1])
+        else:
+            caller = None
+        edge = (caller, self.__label(record))
+        self.call_graph[edge] = self.call_graph.get(edge, 0) + 1
+        self.__active.append(record)
+
+    def method_exit(self, obj, method_def, status):
+        record = self.__active.pop()
+        self.records.append(
+            record._replace(phase="E", timestamp=time.perf_counter_ns())
+        )
+        if status == obj.STATUS_TAIL_CALL:
+            self.__tail_caller = self.__label(record)
+
+    def chrome_trace(self):
+        """Returns the records as a Chrome trace-event JSON object."""
+        events = []
+        depth = 0
+        pid = os.getpid()
+        start = self.records[0].timestamp if self.records else 0
+        for record in self.records:
+            if record.phase == "E":
+                if depth == 0:
+                    continue  # its start was dropped from the ring buffer
+                depth -= 1
+            else:
+                depth += 1
+            event = {
+                "name": self.__label(record),
+                "cat": "brewin",
+                "ph": record.phase,
+                "ts": (record.timestamp - start) / 1000,  # microseconds
+                "pid": pid,
+                "tid": 1,
+            }
+            if record.phase == "B":
+                event["args"] = {
+                    "arg_types": list(record.arg_types),
+                    "caller_line": record.caller_line,
+                }
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ns"}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w") as file:
+            json.dump(self.chrome_trace(), file)
+
+    def call_graph_dot(self):
+        """Returns the call graph in Graphviz DOT format, with each edge labeled by its number of calls."""
+        lines = ["digraph calls {"]
+        for (caller, callee), count in sorted(
+            self.call_graph.items(), key=lambda item: str(item[0])
+        ):
+            if caller is not None:
+                lines.append(f'  "{caller}" -> "{callee}" [label="{count}"];')
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def __label(record):
+        return f"{record.class_name}.{record.method_name}"
+
+
+class HeapSnapshot:
+    """
+    The objects alive at some point of a run: rows maps each class name to (object count, estimated bytes). An
+    object's bytes include its superclass parts, its fields and their values (but not the objects they refer to).
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.count = sum(count for count, _ in rows.values())
+        self.bytes = sum(size for _, size in rows.values())
+
+    def report(self, limit=20):
+        lines = [
+            f"{self.count} live objects, {self.bytes} bytes",
+            f"{'objects':>9} {'bytes':>12} {'bytes %':>8}  class",
+        ]
+        ranked = sorted(self.rows.items(), key=lambda item: item[1][1], reverse=True)
+        for class_name, (count, size) in ranked[:limit]:
+            percent = 100 * size / self.bytes if self.bytes else 0
+            lines.append(f"{count:9} {size:12} {percent:7.1f}%  {class_name}")
+        return "\n".join(lines)
+
+
+class HeapProfiler(Instrumentation):
+    def __init__(self):
+        self.sites = (
+            {}
+        )  # (class name, line of the (new ...)) -> number of objects allocated
+        self.peak_objects = (
+            0  # most objects allocated and not yet freed, seen at any allocation
+        )
+        self.end_snapshot = None  # taken when main returns
+        self.__live = weakref.WeakSet()
+        self.__main_object = None
+        self.__depth = 0
+
+    def allocate(self, obj, line_num):
+        site = (obj.class_def.name, line_num)
+        self.sites[site] = self.sites.get(site, 0) + 1
+        self.__live.add(obj)
+        if self.__main_object is None:
+            self.__main_object = obj
+        self.peak_objects = max(self.peak_objects, len(self.__live))
+
+    def method_enter(self, obj, method_def, env, line_num_of_caller):
+        self.__depth += 1
+
+    def method_exit(self, obj, method_def, status):
+        self.__depth -= 1
+        if self.__depth == 0:
+            self.end_snapshot = self.snapshot()
+
+    def snapshot(self, collect=True):
+        """
+        Returns a HeapSnapshot of the objects alive now. With collect=False, unreachable objects that are part of
+        reference cycles (e.g., Brewin objects that refer to each other) may be included, if the garbage collector
+        hasn't freed them yet.
+        """
+        if collect:
+            gc.collect()
+        rows = {}
+        for obj in list(self.__live):
+            count, size = rows.get(obj.class_def.name, (0, 0))
+            rows[obj.class_def.name] = (count + 1, size + object_bytes(obj))
+        return HeapSnapshot(rows)
+
+    def site_report(self, limit=20):
+        lines = [f"{'objects':>9}  line  class"]
+        ranked = sorted(self.sites.items(), key=lambda item: item[1], reverse=True)
+        for (class_name, line_num), count in ranked[:limit]:
+            lines.append(f"{count:9}  {str(line_num):>4}  {class_name}")
+        return "\n".join(lines)
+
+    # estimates the memory used by an object and its superclass parts
+    object_bytes = staticmethod(object_bytes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile a Brewin program.")
+    parser.add_argument("program", help="Brewin source file")
+    parser.add_argument("--version", type=int, default=3, choices=(1, 2, 3))
+    parser.add_argument(
+        "--interval", type=float, default=SamplingProfiler.DEFAULT_INTERVAL
+    )
+    parser.add_argument("--collapsed", help="write collapsed stacks to this file")
+    parser.add_argument(
+        "--trace", help="trace every call (version 3) and write a Chrome trace"
+    )
+    parser.add_argument("--call-graph", help="with --trace, write a DOT call graph")
+    parser.add_argument(
+        "--heap",
+        action="store_true",
+        help="report allocation sites and the objects alive when main returns (version 3)",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="print the run's performance counters (version 3) as JSON",
+    )
+    args = parser.parse_args()
+
+    interpreter_module = importlib.import_module(f"interpreterv{args.version}")
+    with open(args.program) as file:
+        source = file.read().split("\n")
+    if args.heap:
+        heap = HeapProfiler()
+        interpreter_module.Interpreter(instrumentation=[heap]).run(source)
+        print(heap.site_report(), file=sys.stderr)
+        print(heap.end_snapshot.report(), file=sys.stderr)
+        print(f"peak: {heap.peak_objects} objects", file=sys.stderr)
+        return
+    if args.metrics:
+        interpreter = interpreter_module.Interpreter(collect_metrics=True)
+        interpreter.run(source)
+        print(json.dumps(interpreter.get_metrics(), indent=2), file=sys.stderr)
+        return
+    if args.trace:
+        tracer = CallTracer()
+        interpreter_module.Interpreter(instrumentation=[tracer]).run(source)
+        tracer.write_chrome_trace(args.trace)
+        if args.call_graph:
+            with open(args.call_graph, "w") as file:
+                file.write(tracer.call_graph_dot())
+        return
+    interpreter = interpreter_module.Interpreter()
+    profiler = SamplingProfiler(interpreter, args.interval)
+    with profiler:
+        interpreter.run(source)
+    print(profiler.report(), file=sys.stderr)
+    if args.collapsed:
+        with open(args.collapsed, "w") as file:
+            file.write(profiler.collapsed_stacks())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Module that contains the compile-once, run-many API shared by all interpreter versions.
+
+Each versioned interpreter module exports a compile() function that parses a program and builds its class
+metadata once, returning a Program:
+
+    program = interpreterv3.compile(source_lines)
+    for inputs in input_sets:
+        result = program.run(inputs)
+
+Only the per-run state (the objects created by the program, its input and its output) is reset between runs.
+
+A version 3 program can also be run a bounded number of steps at a time, e.g. by a scheduler.Scheduler:
+
+    run = program.start(inputs)
+    while not run.run_steps(1000):
+        ...  # do something else
+    result = run.result
+"""
+
+import sys
+
+from intio import InputProvider, LineInputProvider
+
+# evalstackv3.py and limits.py are only used by version 3, so they're imported where version 3 needs them, and
+# versions 1 and 2 don't pay for importing them
+
+
+class RunResult:
+    """
+    The outcome of one Program.run(): the lines the program printed, and if it ended with an error, the
+    ErrorType, line number and message of that error (all None otherwise). If the run was terminated for exceeding
+    one of its limits.RunLimits, limit_exceeded names the limit ("fuel", "call_depth" or "time"), error_line is the
+    line it was exceeded on and error_type is None. metrics holds the run's performance counters if the interpreter
+    collects them (see Interpreter.get_metrics()), and usage the resources it consumed, e.g. its peak heap objects
+    and bytes, if it accounts for them (see Interpreter.get_usage()).
+    """
+
+    def __init__(
+        self,
+        output,
+        error_type=None,
+        error_line=None,
+        error_message=None,
+        metrics=None,
+        limit_exceeded=None,
+        usage=None,
+    ):
+        self.output = output
+        self.error_type = error_type
+        self.error_line = error_line
+        self.error_message = error_message
+        self.metrics = metrics
+        self.limit_exceeded = limit_exceeded
+        self.usage = usage
+
+    def __repr__(self):
+        return (
+            f"RunResult(output={self.output!r}, error_type={self.error_type}, "
+            f"error_line={self.error_line})"
+        )
+
+
+class Program:
+    """
+    A program that an interpreter has already loaded (see Interpreter.load()), ready to be run repeatedly.
+    """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+
+    def run(self, inputs=None, output_sink=None, limits=None):
+        """
+        Run the program's main method and return a RunResult.
+
+        inputs is either a list of input strings (like the inp argument of an Interpreter) or an
+        intio.InputProvider. If output_sink is given, console output is written to it; otherwise it is only
+        collected in the RunResult. Errors reported by the interpreter end the run and are returned in the
+        RunResult rather than raised. limits, a limits.RunLimits, overrides the interpreter's limits for this run
+        (version 3 only).
+        """
+        interpreter = self.interpreter
+        self.__start_run(inputs, output_sink)
+        try:
+            if limits is None:
+                interpreter.run_main()
+            else:
+                interpreter.run_main(limits)
+        except RuntimeError as err:
+            if interpreter.error_type is None:
+                raise  # not an error reported by the interpreter
+            return _run_result(interpreter, str(err))
+        except Exception as err:
+            if not _is_limit_exceeded(err):
+                raise
+            return _limit_exceeded_result(interpreter, err)
+        return _run_result(interpreter)
+
+    async def run_async(self, input_source=None, output_sink=None, limits=None):
+        """
+        Like run(), but as a coroutine that yields to the event loop periodically and while it waits for input (see
+        Interpreter.run_main_async(); version 3 only). Input is read from input_source, an intio.AsyncInputSource
+        (without one, the program gets no input), and if output_sink, an intio.AsyncOutputSink, is given, console
+        output is pushed to it.
+        """
+        from limits import ResourceLimitExceeded
+
+        interpreter = self.interpreter
+        self.__start_run(LineInputProvider(()), None)
+        try:
+            await interpreter.run_main_async(input_source, output_sink, limits)
+        except RuntimeError as err:
+            if interpreter.error_type is None:
+                raise  # not an error reported by the interpreter
+            return _run_result(interpreter, str(err))
+        except ResourceLimitExceeded as err:
+            return _limit_exceeded_result(interpreter, err)
+        return _run_result(interpreter)
+
+    def start(self, inputs=None, output_sink=None, limits=None):
+        """
+        Start a run of the program's main method that executes a bounded number of steps at a time, and return it as
+        a ProgramRun (version 3 only). The arguments are those of run(). The program can't be run otherwise until
+        this run has ended.
+        """
+        self.__start_run(inputs, output_sink)
+        return ProgramRun(self.interpreter, limits)
+
+    def __start_run(self, inputs, output_sink):
+        interpreter = self.interpreter
+        interpreter.reset()
+        if isinstance(inputs, InputProvider):
+            interpreter.inp = None
+            interpreter.input_provider = inputs
+        else:
+            interpreter.inp = inputs
+            interpreter.input_provider = None
+        interpreter.output_sink = output_sink
+        interpreter.console_output = output_sink is not None
+
+
+class ProgramRun:
+    """
+    A run of a Program that executes at most a given number of EvalStack steps (see evalstackv3.py) per call to
+    run_steps(), so that whoever drives it can do something else between two calls. Returned by Program.start().
+    """
+
+    def __init__(self, interpreter, limits):
+        self.interpreter = interpreter
+        self.limits = limits
+        self.eval_stack = None  # created by the first call to run_steps()
+        self.result = None  # the RunResult, once the run has ended
+
+    @property
+    def steps(self):
+        """The number of steps taken so far."""
+        return 0 if self.eval_stack is None else self.eval_stack.steps
+
+    def run_steps(self, max_steps):
+        """
+        Run at most max_steps steps and return whether the run has ended, in which case its RunResult is in result.
+        Input statements read their input as in Program.run().
+        """
+        from evalstackv3 import EvalStack
+        from limits import ResourceLimitExceeded
+
+        if self.result is not None:
+            return True
+        interpreter = self.interpreter
+        try:
+            if self.eval_stack is None:
+                self.eval_stack = interpreter.start_resumable_run(self.limits)
+            eval_stack = self.eval_stack
+            end = eval_stack.steps + max_steps
+            while True:
+                status = eval_stack.run_steps(end - eval_stack.steps)
+                if status is EvalStack.DONE:
+                    break
+                if status is EvalStack.PAUSED:
+                    return False
+                eval_stack.send_input(interpreter.read_input(status))
+        except RuntimeError as err:
+            interpreter.flush_output()
+            if interpreter.error_type is None:
+                raise  # not an error reported by the interpreter
+            self.result = _run_result(interpreter, str(err))
+        except ResourceLimitExceeded as err:
+            interpreter.flush_output()
+            self.result = _limit_exceeded_result(interpreter, err)
+        else:
+            interpreter.flush_output()
+            self.result = _run_result(interpreter)
+        return True
+
+
+# whether err is a limits.ResourceLimitExceeded; only version 3 runs raise those, and their interpreter has imported
+# limits.py, so it isn't imported here
+def _is_limit_exceeded(err):
+    limits = sys.modules.get("limits")
+    return limits is not None and isinstance(err, limits.ResourceLimitExceeded)
+
+
+def _limit_exceeded_result(interpreter, err):
+    interpreter.error_line = err.line_num
+    return _run_result(interpreter, str(err), err.limit)
+
+
+def _run_result(interpreter, error_message=None, limit_exceeded=None):
+    error_type, error_line = interpreter.get_error_type_and_line()
+    return RunResult(
+        interpreter.get_output(),
+        error_type,
+        error_line,
+        error_message,
+        interpreter.get_metrics(),
+        limit_exceeded,
+        interpreter.get_usage(),
+    )
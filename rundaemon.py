@@ -0,0 +1,249 @@
+"""
+Runs Brewin programs for local clients: a long-running daemon that listens on a Unix domain socket and answers
+(program, inputs, limits) requests from a pool of pre-forked warm workers.
+
+usage: python rundaemon.py SOCKET [-j WORKERS] [--timeout SECONDS] [--memory-mb MB] [--preload program.brewin ...]
+
+The requests and responses are described in daemonclient.py, which holds the client; python -m brewin
+program.brewin --socket SOCKET runs a program through the daemon instead of in a new interpreter.
+
+Starting Python, importing an interpreter and loading a program cost more than running most small programs, so the
+daemon pays for them once: it imports every interpreter version and compiles the --preload programs (version 3),
+then forks the workers, which inherit all of it. Each worker accepts connections on the shared socket and keeps the
+programs it compiles in a cache keyed by version and source hash (see worker.py, which it shares with
+batchrunner.py), so a program that is sent again is only run. A worker that dies (e.g., killed by the OS) is replaced.
+
+--timeout bounds the wall time of each request and --memory-mb the address space of each worker; a request can also
+bring its own limits (see limits.RunLimits). The socket is only accessible to the user running the daemon, and it's
+removed when the daemon stops (on SIGTERM or SIGINT).
+"""
+
+import argparse
+import gc
+import json
+import os
+import signal
+import socket
+import sys
+import traceback
+
+from intio import LineInputProvider
+from limits import RunLimits
+from worker import VERSIONS, LoadError, ProgramCache, RunTimeout
+from worker import limit_memory, time_limit
+
+LISTEN_BACKLOG = 128
+
+# state of the daemon, inherited by the workers it forks
+_programs = None  # the ProgramCache
+_timeout = None
+
+
+# returns (id, version, program lines, inputs, limits or None); raises ValueError or TypeError for malformed requests
+def _parse_request(line):
+    request = json.loads(line)
+    if not isinstance(request, dict):
+        raise ValueError("a request must be a JSON object")
+    request_id = request.get("id")
+    version = request.get("version", 3)
+    if type(version) is not int or version not in VERSIONS:  # True == 1.0 == 1
+        raise ValueError(f"unknown version {version!r}")
+    source = request.get("program")
+    if isinstance(source, str):
+        source = source.split("\n")
+    if not isinstance(source, list) or not all(isinstance(s, str) for s in source):
+        raise ValueError("program must be a string or a list of strings")
+    inputs = request.get("inputs", [])
+    if not isinstance(inputs, list) or not all(isinstance(s, str) for s in inputs):
+        raise ValueError("inputs must be a list of strings")
+    limits = request.get("limits")
+    if limits is not None:
+        if version != 3:
+            raise ValueError("limits are only supported by version 3")
+        if not isinstance(limits, dict):
+            raise ValueError("limits must be a JSON object")
+        limits = RunLimits(**limits)
+    return request_id, version, source, inputs, limits
+
+
+def _handle_request(line):
+    try:
+        request_id, version, source, inputs, limits = _parse_request(line)
+    except (ValueError, TypeError) as err:
+        return {"id": None, "status": "bad_request", "message": str(err)}
+    response = {"id": request_id}
+    try:
+        with time_limit(_timeout):
+            program = _programs.get(version, source)
+            # an input provider (rather than a list) returns None once the inputs run out, even if there are none,
+            # instead of reading from the keyboard
+            result = program.run(LineInputProvider(inputs), limits=limits)
+    except RunTimeout:
+        response["status"] = "timeout"
+        response["message"] = f"the request took more than {_timeout} seconds"
+    except MemoryError:
+        response["status"] = "memory_limit"
+        response["message"] = "the worker ran out of memory"
+    except LoadError as err:
+        response.update(_outcome([], err.error_type, err.error_line, str(err)))
+    except Exception as err:  # pylint: disable=broad-except
+        response["status"] = "crash"
+        response["message"] = f"{type(err).__name__}: {err}"
+    else:
+        response.update(
+            _outcome(
+                list(result.output),
+                result.error_type,
+                result.error_line,
+                result.error_message,
+                result.limit_exceeded,
+                result.usage,
+            )
+        )
+    return response
+
+
+def _outcome(
+    output, error_type, error_line, error_message, limit_exceeded=None, usage=None
+):
+    return {
+        "status": "ok",
+        "output": output,
+        "error_type": error_type.name if error_type else None,
+        "error_line": error_line,
+        "error_message": error_message,
+        "limit_exceeded": limit_exceeded,
+        "usage": usage,
+    }
+
+
+def _serve_connection(conn):
+    reader = conn.makefile("rb")
+    try:
+        for line in reader:
+            if line.strip():
+                response = _handle_request(line)
+                conn.sendall(json.dumps(response).encode() + b"\n")
+    except OSError:
+        pass  # the client went away
+    finally:
+        reader.close()
+
+
+def _run_worker(listener, memory_limit_mb):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # a ^C reaches the whole process group; the daemon stops its workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    limit_memory(memory_limit_mb)
+    while True:
+        conn, _ = listener.accept()
+        with conn:
+            _serve_connection(conn)
+
+
+def _fork_worker(listener, memory_limit_mb):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            _run_worker(listener, memory_limit_mb)
+        except BaseException:  # pylint: disable=broad-except
+            traceback.print_exc()
+        finally:
+            # never return into the daemon's code (e.g., its cleanup) from a worker
+            os._exit(1)  # pylint: disable=protected-access
+    return pid
+
+
+def _listen(socket_path):
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except ConnectionRefusedError:
+            os.unlink(socket_path)  # left behind by a daemon that didn't stop cleanly
+        else:
+            raise OSError(f"a daemon is already listening on {socket_path}")
+        finally:
+            probe.close()
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(
+        0o177
+    )  # the socket is created readable and writable by its owner only
+    try:
+        listener.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    listener.listen(LISTEN_BACKLOG)
+    return listener
+
+
+def serve(socket_path, workers=None, timeout=None, memory_limit_mb=None, preload=()):
+    """
+    Runs the daemon on socket_path until it receives SIGTERM or SIGINT. preload is a list of version 3 programs
+    (each a list of lines) to compile before the workers are forked.
+    """
+    global _programs, _timeout
+    _programs = ProgramCache()
+    _timeout = timeout
+    for source in preload:
+        _programs.get(3, source)
+    workers = workers or os.cpu_count() or 1
+
+    listener = _listen(socket_path)
+    children = set()
+    signal.signal(signal.SIGTERM, lambda _signum, _frame: sys.exit(0))
+    # move everything loaded so far out of the GC's reach, so collections in the workers don't write to (and thereby
+    # copy) the pages holding the interpreters and the preloaded programs
+    gc.freeze()
+    try:
+        while True:
+            while len(children) < workers:
+                children.add(_fork_worker(listener, memory_limit_mb))
+            pid, status = os.wait()
+            children.discard(pid)
+            print(
+                f"worker {pid} exited with status {os.waitstatus_to_exitcode(status)}",
+                file=sys.stderr,
+            )
+    finally:
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+        for pid in children:
+            os.waitpid(pid, 0)
+        listener.close()
+        os.unlink(socket_path)
+        gc.unfreeze()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run Brewin programs for local clients."
+    )
+    parser.add_argument("socket", help="path of the Unix domain socket to listen on")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument(
+        "--timeout", type=float, default=None, help="seconds per request"
+    )
+    parser.add_argument("--memory-mb", type=int, default=None, help="per worker")
+    parser.add_argument(
+        "--preload",
+        action="append",
+        default=[],
+        help="version 3 program to compile at startup (repeatable)",
+    )
+    args = parser.parse_args()
+
+    preload = []
+    for path in args.preload:
+        with open(path) as file:
+            preload.append(file.read().split("\n"))
+    try:
+        serve(args.socket, args.workers, args.timeout, args.memory_mb, preload)
+    except KeyboardInterrupt:
+        pass
+    except OSError as err:
+        sys.exit(f"rundaemon: {err}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Module that contains a cooperative scheduler that runs many version 3 programs, time-sliced, on a single thread.
+
+    scheduler = Scheduler()
+    quick = scheduler.submit(interpreterv3.compile(source), inputs=["5"])
+    slow = scheduler.submit(interpreterv3.compile(other_source), priority=4, limits=RunLimits(max_fuel=10**7))
+    scheduler.run()
+    print(quick.result.output, slow.result.limit_exceeded)
+
+Each submitted program runs as a ProgramRun (see Program.start()), which executes a bounded number of EvalStack steps
+at a time. The scheduler goes round-robin over the tasks that haven't ended, in the order they were submitted, and
+gives each one slice_steps steps times its priority per round. A short program therefore ends after a few rounds
+however long the others run, without a process (or a thread) per program.
+
+A task's budget is its limits.RunLimits. Its fuel, call depth and heap limits only count the task's own work, but
+max_seconds is wall time, and includes the time the other tasks ran since the task started.
+
+A Program holds the state of its run, so a Program can only have one unfinished task at a time: compile a program
+once per task that runs it concurrently.
+"""
+
+from collections import deque
+
+
+class Task:
+    """A program submitted to a Scheduler; result is its RunResult once it has ended (None until then)."""
+
+    def __init__(self, program, program_run, priority, name):
+        self.program = program
+        self.program_run = program_run
+        self.priority = priority
+        self.name = name
+        self.rounds = 0  # rounds in which the task ran
+
+    @property
+    def done(self):
+        return self.program_run.result is not None
+
+    @property
+    def result(self):
+        return self.program_run.result
+
+    @property
+    def steps(self):
+        return self.program_run.steps
+
+    def __repr__(self):
+        return f"Task(name={self.name!r}, priority={self.priority}, steps={self.steps}, done={self.done})"
+
+
+class Scheduler:
+    """
+    Runs the tasks submitted to it, slice_steps EvalStack steps (times the task's priority) at a time.
+    """
+
+    # about a millisecond of a loop-heavy program (see Interpreter.ASYNC_SLICE_STEPS)
+    DEFAULT_SLICE_STEPS = 500
+
+    def __init__(self, slice_steps=DEFAULT_SLICE_STEPS):
+        if slice_steps < 1:
+            raise ValueError("slice_steps must be at least 1")
+        self.slice_steps = slice_steps
+        # the tasks that haven't ended, in the order they run in a round
+        self.tasks = deque()
+        self.__programs = set()  # the programs of those tasks
+
+    def submit(
+        self,
+        program,
+        inputs=None,
+        output_sink=None,
+        limits=None,
+        priority=1,
+        name=None,
+    ):
+        """
+        Add a run of program (a Program) to the tasks, and return its Task. inputs, output_sink and limits are those
+        of Program.run(); priority (a positive int) is the number of slices the task gets per round. Tasks can be
+        submitted while the scheduler runs, e.g. between two calls to run_round().
+        """
+        if priority < 1:
+            raise ValueError("priority must be at least 1")
+        if program in self.__programs:
+            raise ValueError("the program already has an unfinished task")
+        task = Task(program, program.start(inputs, output_sink, limits), priority, name)
+        self.tasks.append(task)
+        self.__programs.add(program)
+        return task
+
+    def run_round(self):
+        """Run each task that hasn't ended for its slices, once, and return the tasks that ended, in that order."""
+        finished = []
+        for _ in range(len(self.tasks)):
+            task = self.tasks.popleft()
+            task.rounds += 1
+            try:
+                ended = task.program_run.run_steps(self.slice_steps * task.priority)
+            except BaseException:
+                self.__programs.discard(task.program)  # the task is dropped
+                raise
+            if ended:
+                self.__programs.discard(task.program)
+                finished.append(task)
+            else:
+                self.tasks.append(task)
+        return finished
+
+    def run(self):
+        """Run rounds until every task has ended, and return the tasks in the order they ended."""
+        finished = []
+        while self.tasks:
+            finished.extend(self.run_round())
+        return finished
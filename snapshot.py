@@ -0,0 +1,276 @@
+"""
+Module that contains snapshots of the version 3 interpreter's state: a compact binary image of an interpreter that
+can be restored in another process.
+
+    interpreter = interpreterv3.Interpreter(inp=inputs)
+    interpreter.run(program)  # e.g., builds a large object graph in the fields of main
+    data = snapshot.dumps(interpreter)
+    ...
+    interpreter = snapshot.loads(data, inp=inputs)  # in a fresh process
+    interpreter.run_main(keep_main_object=True)  # main runs again on the restored main object
+
+A snapshot holds
+- the loaded program, as its parse tree (so restoring it doesn't parse the program again), from which the
+  TypeManager and the class_index are rebuilt, as load() builds them,
+- the templated class types that were specialized (e.g. list@int), which are specialized again,
+- the objects reachable from the main object, with the values of their fields; values refer to objects by their
+  index (and, for a reference to a superclass part, the part's depth), so that objects shared by several fields and
+  reference cycles are restored as they were,
+- the input cursor (the index of the next line of an inp list; restore the same inp list to continue reading
+  where the run stopped) and the output log.
+
+The class metadata isn't stored as it is: ClassDefs and MethodDefs keep caches keyed by the ids of the statements of
+the program, which don't survive a restore, so they're rebuilt from the program.
+
+A snapshot can be taken between runs: after a program is loaded, or after a run has ended, but not while a resumable
+run is suspended, since the frames of its EvalStack are Python generators. A long computation can checkpoint by
+running as a series of runs of main that each continue where the previous one stopped (run_main(keep_main_object=
+True)).
+
+The image is MAGIC, the format version and a zlib-compressed pickle of plain data (lists, tuples, strs, ints, bools
+and None); loads() refuses to unpickle anything else.
+"""
+
+import gc
+import io
+import pickle
+import zlib
+
+from bparser import StringWithLineNumber
+from intbase import InterpreterBase
+from interpreterv3 import Interpreter
+from objectv3 import ObjectDef, reachable_objects
+from type_valuev3 import Type, Value, PartValue
+
+MAGIC = b"BRWNSNAP"
+FORMAT_VERSION = 1
+COMPRESSION_LEVEL = 6
+
+# codes of the flattened parse tree; a code >= 0 is a token, the index of its string in the string table
+_OPEN_LIST = -1
+_CLOSE_LIST = -2
+
+_PRIMITIVE_TYPES = {
+    InterpreterBase.INT_DEF,
+    InterpreterBase.STRING_DEF,
+    InterpreterBase.BOOL_DEF,
+}
+
+
+class SnapshotError(Exception):
+    """Raised when data isn't a snapshot this module can restore."""
+
+
+def dumps(interpreter):
+    """Returns the snapshot of interpreter (an interpreterv3.Interpreter), as bytes."""
+    eval_stack = interpreter.eval_stack
+    if eval_stack is not None and eval_stack.frames:
+        raise ValueError("can't snapshot an interpreter while a run is suspended")
+    state = {
+        "program": _encode_program(interpreter),
+        "specializations": [
+            str(type_sig)
+            for class_def in interpreter.class_index.values()
+            if class_def.is_templated_class()
+            for type_sig, specialized in class_def.specializations.items()
+            if specialized is not None
+        ],
+        "heap": _encode_heap(getattr(interpreter, "main_object", None)),
+        "input_cursor": interpreter.input_cursor,
+        "output_log": [str(line) for line in interpreter.output_log],
+    }
+    data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+    return (
+        MAGIC
+        + FORMAT_VERSION.to_bytes(2, "little")
+        + zlib.compress(data, COMPRESSION_LEVEL)
+    )
+
+
+def loads(data, **options):
+    """
+    Restores the interpreter whose snapshot is data and returns it; options are passed to the Interpreter, e.g.
+    loads(data, inp=inputs, console_output=False).
+    """
+    if data[: len(MAGIC)] != MAGIC:
+        raise SnapshotError("not a Brewin snapshot")
+    version = int.from_bytes(data[len(MAGIC) : len(MAGIC) + 2], "little")
+    if version != FORMAT_VERSION:
+        raise SnapshotError(f"unsupported snapshot format version {version}")
+    try:
+        state = _PlainUnpickler(
+            io.BytesIO(zlib.decompress(data[len(MAGIC) + 2 :]))
+        ).load()
+    except (zlib.error, pickle.UnpicklingError, EOFError) as err:
+        raise SnapshotError(f"corrupt snapshot: {err}") from err
+
+    # restoring allocates many objects and frees none of them, so the collections the allocations would trigger (a
+    # large share of the restore time for a large heap) are skipped
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        interpreter = Interpreter(**options)
+        interpreter.load_parsed(_decode_program(*state["program"]))
+        for type_sig in state["specializations"]:
+            class_name = type_sig.split(InterpreterBase.TYPE_CONCAT_CHAR)[0]
+            interpreter.class_index[class_name].specialize_class(type_sig)
+        interpreter.main_object = _decode_heap(interpreter, state["heap"])
+    finally:
+        if gc_enabled:
+            gc.enable()
+    interpreter.input_cursor = state["input_cursor"]
+    interpreter.output_log = state["output_log"]
+    return interpreter
+
+
+def dump(interpreter, file):
+    """Writes the snapshot of interpreter to file, a binary file object."""
+    file.write(dumps(interpreter))
+
+
+def load(file, **options):
+    """Restores the interpreter whose snapshot is in file, a binary file object (see loads())."""
+    return loads(file.read(), **options)
+
+
+class _PlainUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"unexpected {module}.{name} in snapshot")
+
+
+# the program is stored as the classes of the parse tree, flattened into codes, with a string table and the line
+# number of each token
+def _encode_program(interpreter):
+    strings = {}
+    codes = []
+    line_nums = []
+
+    def encode(item):
+        if type(item) is list:
+            codes.append(_OPEN_LIST)
+            for sub_item in item:
+                encode(sub_item)
+            codes.append(_CLOSE_LIST)
+        else:
+            code = strings.get(item)
+            if code is None:
+                code = strings[item] = len(strings)
+            codes.append(code)
+            line_nums.append(item.line_num)
+
+    for class_def in interpreter.class_index.values():
+        encode(class_def.class_source)
+    return [str(string) for string in strings], codes, line_nums
+
+
+# tokens with the same string and line number are decoded as a single StringWithLineNumber (tokens are immutable),
+# which makes decoding several times faster than building one per token
+def _decode_program(strings, codes, line_nums):
+    line_nums = iter(line_nums)
+    tokens = {}  # (code, line number) -> token
+    program = []
+    lists = [program]
+    append = program.append
+    for code in codes:
+        if code >= 0:
+            key = (code, next(line_nums))
+            token = tokens.get(key)
+            if token is None:
+                token = tokens[key] = StringWithLineNumber(strings[code], key[1])
+            append(token)
+        elif code == _OPEN_LIST:
+            item = []
+            append(item)
+            lists.append(item)
+            append = item.append
+        else:
+            lists.pop()
+            append = lists[-1].append
+    return program
+
+
+# the heap is stored as a type table and a list of objects, the main object first; an object is its class type name
+# and the values of the fields of its parts, most derived part first, each value a (type index, payload) pair
+def _encode_heap(main_object):
+    if main_object is None:
+        return None
+    objects = list(reachable_objects(main_object))
+    indexes = {id(obj): index for index, obj in enumerate(objects)}
+    types = {}
+
+    def encode_value(value):
+        value_type = value.t
+        key = (
+            str(value_type.type_name),
+            _str_or_none(value_type.supertype_name),
+            value_type.templated_params,
+        )
+        type_index = types.get(key)
+        if type_index is None:
+            type_index = types[key] = len(types)
+        payload = value.v
+        if isinstance(payload, ObjectDef):
+            anchor = payload.anchor_object
+            depth = 0
+            part = anchor
+            while part is not payload:
+                part = part.super_object
+                depth += 1
+            payload = (
+                indexes[id(anchor)] if depth == 0 else (indexes[id(anchor)], depth)
+            )
+        elif payload is not None and value_type.type_name == InterpreterBase.STRING_DEF:
+            payload = str(payload)  # a StringRope is stored flattened
+        return type_index, payload
+
+    encoded_objects = []
+    for obj in objects:
+        values = []
+        part = obj
+        while part is not None:
+            values.extend(
+                encode_value(var_def.value) for var_def in part.fields.values()
+            )
+            part = part.super_object
+        encoded_objects.append((str(obj.class_def.name), values))
+    return list(types), encoded_objects
+
+
+# names in the parse tree are StringWithLineNumbers, which are stored as plain strs
+def _str_or_none(name):
+    return None if name is None else str(name)
+
+
+def _decode_heap(interpreter, heap):
+    if heap is None:
+        return None
+    encoded_types, encoded_objects = heap
+    types = [Type(*key) for key in encoded_types]
+    objects = [
+        interpreter.instantiate(class_name, None) for class_name, _ in encoded_objects
+    ]
+
+    for obj, (_, values) in zip(objects, encoded_objects):
+        values = iter(values)
+        part = obj
+        while part is not None:
+            for var_def in part.fields.values():
+                type_index, payload = next(values)
+                value_type = types[type_index]
+                if payload is not None and value_type.type_name not in _PRIMITIVE_TYPES:
+                    var_def.set_value(_decode_reference(objects, value_type, payload))
+                else:
+                    var_def.set_value(Value(value_type, payload))
+            part = part.super_object
+    return objects[0]
+
+
+def _decode_reference(objects, value_type, payload):
+    if type(payload) is int:
+        return Value(value_type, objects[payload])
+    index, depth = payload
+    part = objects[index]
+    for _ in range(depth):
+        part = part.super_object
+    # the part is referred to on its own, so the value must keep its object alive (see PartValue)
+    return PartValue(value_type, part, objects[index])
@@ -15,6 +15,41 @@ class Type:
         )
 
 
+# Internal representation of a string built by concatenation. Appending to a string in a loop, e.g.
+# (set s (+ s x)), would copy the whole accumulated string each time; a rope instead collects the pieces in a list
+# and only joins them into a str when the value is actually used (compared, printed, thrown, ...).
+# The pieces list is shared with the rope that was appended to: a rope owns just the first count pieces, so
+# appending to the newest rope of a chain is O(1) and older ropes in the chain stay unchanged.
+class StringRope:
+    MIN_LENGTH = 256  # concatenations shorter than this are cheaper to just copy
+
+    def __init__(self, pieces, count):
+        self.pieces = pieces
+        self.count = count
+        self.flat = None  # cached result of joining our pieces
+
+    def __str__(self):
+        if self.flat is None:
+            self.flat = "".join(self.pieces[: self.count])
+        return self.flat
+
+
+# concatenates two string values (each a str or a StringRope)
+def concat_strings(left, right):
+    if type(right) is StringRope:
+        right = str(right)
+    if type(left) is StringRope:
+        pieces = left.pieces
+        if len(pieces) != left.count:
+            # someone already appended to the shared list past our end, so we need our own copy
+            pieces = pieces[: left.count]
+        pieces.append(right)
+        return StringRope(pieces, left.count + 1)
+    if len(left) + len(right) <= StringRope.MIN_LENGTH:
+        return left + right
+    return StringRope([left, right], 2)
+
+
 # Represents a value, which has a type and its value
 class Value:
     def __init__(self, type_obj, value=None):
@@ -22,6 +57,9 @@ class Value:
         self.v = value
 
     def value(self):
+        if type(self.v) is StringRope:
+            # a string built by concatenation is being used, so flatten it
+            self.v = str(self.v)
         return self.v
 
     def set(self, other):
@@ -35,7 +73,17 @@ class Value:
         return self.v == None
 
     def __eq__(self, other):
-        return self.t == other.t and self.v == other.v
+        return self.t == other.t and self.value() == other.value()
+
+
+# A Value that refers to a superclass part of an object (e.g., the me of a method the object inherits) rather than
+# to its most derived part. Parts only hold weak references to the object they belong to, so that objects aren't
+# reference cycles; the value holds a strong one instead (anchor), which keeps the whole object alive for as long as
+# the value is referred to.
+class PartValue(Value):
+    def __init__(self, type_obj, part, anchor):
+        super().__init__(type_obj, part)
+        self.anchor = anchor
 
 
 # val is a string with the value we want to use to construct a Value object.
@@ -0,0 +1,98 @@
+"""
+Module that contains what the worker processes of batchrunner.py and rundaemon.py have in common: a cache of the
+programs they compile, a wall-time limit on each run, and a memory limit on the whole process.
+
+Each worker imports every interpreter version once (see ProgramCache) and keeps the programs it compiles in a cache
+keyed by version and source hash, so a program that is run again is only run.
+"""
+
+import hashlib
+import importlib
+import signal
+from contextlib import contextmanager
+
+from program import Program
+
+VERSIONS = (1, 2, 3)
+MAX_CACHED_PROGRAMS = 64  # compiled programs kept per worker
+
+
+class RunTimeout(Exception):
+    """Raised in a run that exceeds the seconds of its time_limit()."""
+
+
+class LoadError(Exception):
+    """Raised when the interpreter reports an error (e.g., a syntax error) while loading a program."""
+
+    def __init__(self, error_type, error_line, message):
+        super().__init__(message)
+        self.error_type = error_type
+        self.error_line = error_line
+
+
+class ProgramCache:
+    """
+    The compiled programs of a worker, at most max_programs of them; the oldest one is dropped first.
+    """
+
+    def __init__(self, max_programs=MAX_CACHED_PROGRAMS):
+        self.max_programs = max_programs
+        self.modules = {
+            version: importlib.import_module(f"interpreterv{version}")
+            for version in VERSIONS
+        }
+        self.programs = {}  # (version, source hash) -> Program
+
+    def get(self, version, source):
+        """
+        Returns the Program for source (a list of lines), compiling it if it isn't cached. Raises LoadError if the
+        interpreter reports an error while loading it; other exceptions (e.g., a RecursionError) are passed on.
+        """
+        key = (version, hashlib.sha256("\n".join(source).encode()).hexdigest())
+        program = self.programs.get(key)
+        if program is None:
+            if len(self.programs) >= self.max_programs:
+                self.programs.pop(next(iter(self.programs)))
+            program = self.__compile(version, source)
+            self.programs[key] = program
+        return program
+
+    def __compile(self, version, source):
+        interpreter = self.modules[version].Interpreter(console_output=False)
+        try:
+            interpreter.load(source)
+        except RuntimeError as err:
+            if interpreter.error_type is None:
+                raise  # not an error reported by the interpreter
+            raise LoadError(interpreter.error_type, interpreter.error_line, str(err))
+        if hasattr(interpreter, "specialize_templates"):
+            # so that processes forked from this one share the specializations too
+            interpreter.specialize_templates()
+        return Program(interpreter)
+
+
+def _raise_timeout(_signum, _frame):
+    raise RunTimeout()
+
+
+@contextmanager
+def time_limit(seconds):
+    """Raises RunTimeout in the with block once it has run for seconds (no limit if seconds is None or 0)."""
+    if not seconds:
+        yield
+        return
+    signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def limit_memory(memory_limit_mb):
+    """Limits the address space of this process to memory_limit_mb megabytes (no limit if None or 0)."""
+    if memory_limit_mb:
+        import resource
+
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))